@@ -0,0 +1,9 @@
+-- Migration for existing databases: model versions on predictions (POST /predictions/bulk?upsert=true)
+USE student_performance;
+
+-- Version of the model that produced each prediction; existing rows stay unversioned (NULL)
+ALTER TABLE predictions
+    ADD COLUMN model_version VARCHAR(64) NULL;
+
+-- One prediction per student and model version; NULL versions are not constrained
+CREATE UNIQUE INDEX ux_predictions_student_id_model_version ON predictions (student_id, model_version);
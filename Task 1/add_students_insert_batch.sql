@@ -0,0 +1,10 @@
+-- Migration for existing databases: id read-back for POST /students/bulk
+USE student_performance;
+
+-- Random key shared by the rows of one multi-row INSERT. With
+-- innodb_autoinc_lock_mode=2 concurrent inserts can interleave ids, so the
+-- API selects the new ids by this key instead of inserting one row at a time
+ALTER TABLE students
+    ADD COLUMN insert_batch CHAR(32) NULL;
+
+CREATE INDEX ix_students_insert_batch ON students (insert_batch);
@@ -0,0 +1,43 @@
+-- Migration for existing databases: change tracking used by GET /students/changes
+USE student_performance;
+
+-- Last modification time of each student, maintained by MySQL. Microsecond
+-- precision keeps the change feed order close to the commit order; consumers
+-- still re-read a lag window, because the value is taken at statement time
+ALTER TABLE students
+    ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+
+-- Existing rows count as changed when they were created
+UPDATE students SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP(6));
+
+-- Keyset of the change feed
+CREATE INDEX ix_students_updated_at_student_id ON students (updated_at, student_id);
+
+-- Trigger: a corrected exam score puts the student back on the change feed
+DELIMITER //
+CREATE TRIGGER after_exam_update_touch_student
+AFTER UPDATE ON exams
+FOR EACH ROW
+BEGIN
+    IF OLD.math_score != NEW.math_score OR
+       OLD.reading_score != NEW.reading_score OR
+       OLD.writing_score != NEW.writing_score THEN
+
+        UPDATE students SET updated_at = CURRENT_TIMESTAMP(6)
+        WHERE student_id = NEW.student_id;
+    END IF;
+END //
+DELIMITER ;
+
+-- Trigger: a changed test preparation status puts the student back on the change feed
+DELIMITER //
+CREATE TRIGGER after_test_preparation_update_touch_student
+AFTER UPDATE ON test_preparation
+FOR EACH ROW
+BEGIN
+    IF OLD.status != NEW.status THEN
+        UPDATE students SET updated_at = CURRENT_TIMESTAMP(6)
+        WHERE student_id = NEW.student_id;
+    END IF;
+END //
+DELIMITER ;
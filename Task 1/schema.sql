@@ -16,7 +16,13 @@ CREATE TABLE Students (
         'master''s degree'
     ) NOT NULL,
     lunch ENUM('standard', 'free/reduced') NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    -- Key of the bulk insert that created the row; reads the new ids back in interleaved autoinc lock mode
+    insert_batch CHAR(32) NULL,
+    -- Keyset of the change feed (GET /students/changes)
+    INDEX ix_students_updated_at_student_id (updated_at, student_id),
+    INDEX ix_students_insert_batch (insert_batch)
 );
 
 -- Table: TestPreparation (now separate)
@@ -121,6 +127,34 @@ BEGIN
 END //
 DELIMITER ;
 
+-- Triggers: corrected exam scores and test preparation changes put the student back on the change feed
+DELIMITER //
+CREATE TRIGGER after_exam_update_touch_student
+AFTER UPDATE ON Exams
+FOR EACH ROW
+BEGIN
+    IF OLD.math_score != NEW.math_score OR
+       OLD.reading_score != NEW.reading_score OR
+       OLD.writing_score != NEW.writing_score THEN
+
+        UPDATE Students SET updated_at = CURRENT_TIMESTAMP(6)
+        WHERE student_id = NEW.student_id;
+    END IF;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER after_test_preparation_update_touch_student
+AFTER UPDATE ON TestPreparation
+FOR EACH ROW
+BEGIN
+    IF OLD.status != NEW.status THEN
+        UPDATE Students SET updated_at = CURRENT_TIMESTAMP(6)
+        WHERE student_id = NEW.student_id;
+    END IF;
+END //
+DELIMITER ;
+
 -- Sample Data (3 Records)
 CALL AddStudentRecord('female', 'group B', 'bachelor''s degree', 'standard', 'none', 72, 72, 74);
 CALL AddStudentRecord('female', 'group C', 'some college', 'standard', 'completed', 69, 90, 88);
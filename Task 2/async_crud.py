@@ -0,0 +1,153 @@
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from typing import Dict, List, Optional, Tuple
+from models import Student, TestPreparation, Exam, Prediction
+from cache import student_cache, student_key, LATEST_STUDENT_KEY
+import crud
+import schemas
+
+# Async counterparts of crud.py for the AsyncSession based API (async_main.py).
+# Relationships are always loaded eagerly: lazy loads are not allowed on an AsyncSession.
+# Queries that are only built and run are shared with crud.py through run_sync; commits
+# and cache calls stay here, and the cache client (blocking with Redis) runs in the threadpool.
+
+async def cache_get(key: str):
+    return await run_in_threadpool(student_cache.get, key)
+
+async def cache_set(key: str, value):
+    await run_in_threadpool(student_cache.set, key, value)
+
+async def cache_invalidate(*keys: str):
+    await run_in_threadpool(student_cache.invalidate, *keys)
+
+def _student_query():
+    return select(Student).options(
+        joinedload(Student.test_preparation),
+        selectinload(Student.exams)
+    )
+
+async def create_student_with_exam(db: AsyncSession, student: schemas.StudentCreate):
+    db_student = Student(
+        gender=student.gender.value,
+        race_ethnicity=student.race_ethnicity.value,
+        parental_level_of_education=student.parental_level_of_education.value,
+        lunch=student.lunch.value
+    )
+    db.add(db_student)
+    await db.flush()  #Get the student_id before commit
+
+    db.add(TestPreparation(
+        student_id=db_student.student_id,
+        status=student.test_preparation_course.value
+    ))
+
+    db.add(Exam(
+        student_id=db_student.student_id,
+        math_score=student.math_score,
+        reading_score=student.reading_score,
+        writing_score=student.writing_score
+    ))
+
+    await db.commit()
+    await cache_invalidate(LATEST_STUDENT_KEY)
+    # created_at is a server default, so it has to be read back explicitly
+    await db.refresh(db_student, ["created_at"])
+
+    return {
+        "student_id": db_student.student_id,
+        "gender": db_student.gender,
+        "race_ethnicity": db_student.race_ethnicity,
+        "parental_level_of_education": db_student.parental_level_of_education,
+        "lunch": db_student.lunch,
+        "created_at": db_student.created_at,
+        "exams": [{
+            "math_score": student.math_score,
+            "reading_score": student.reading_score,
+            "writing_score": student.writing_score
+        }],
+        "test_preparation": student.test_preparation_course.value
+    }
+
+async def create_students_bulk(db: AsyncSession, students: List[schemas.StudentCreate]) -> List[int]:
+    # The bulk path is plain multi-row INSERTs, so the sync implementation is reused
+    student_ids = await db.run_sync(crud.insert_students_bulk, students)
+    await db.commit()
+    await cache_invalidate(LATEST_STUDENT_KEY)
+    return student_ids
+
+async def get_student(db: AsyncSession, student_id: int):
+    result = await db.execute(_student_query().where(Student.student_id == student_id))
+    return result.scalars().first()
+
+async def get_students(db: AsyncSession, after_id: Optional[int] = None, limit: int = 100,
+                       student_ids: Optional[List[int]] = None):
+    query = _student_query()
+    if student_ids:
+        query = query.where(Student.student_id.in_(student_ids))
+    if after_id is not None:
+        query = query.where(Student.student_id > after_id)
+    result = await db.execute(query.order_by(Student.student_id).limit(limit))
+    return result.scalars().unique().all()
+
+async def get_unscored_students(db: AsyncSession, after_id: Optional[int] = None, limit: int = 100):
+    return await db.run_sync(crud.get_unscored_students, after_id, limit)
+
+async def get_student_changes(db: AsyncSession, since: Optional[Tuple[datetime, Optional[int]]] = None,
+                              limit: int = 100):
+    return await db.run_sync(crud.get_student_changes, since, limit)
+
+async def iter_student_export(db: AsyncSession, chunk_size: int = crud.EXPORT_CHUNK_SIZE):
+    """Yield chunks of export rows from a server-side cursor, like crud.iter_student_export"""
+    result = await db.stream(crud.student_export_query(chunk_size))
+    async for partition in result.partitions():
+        yield partition
+
+async def get_latest_student(db: AsyncSession):
+    result = await db.execute(_student_query().order_by(Student.student_id.desc()).limit(1))
+    return result.scalars().first()
+
+async def delete_student(db: AsyncSession, student_id: int):
+    # The cascade to exams and test_preparation needs them loaded up front
+    student = await get_student(db, student_id)
+    if student:
+        await db.delete(student)
+        await db.commit()
+        await cache_invalidate(student_key(student_id), LATEST_STUDENT_KEY)
+        return True
+    return False
+
+async def upsert_prediction(db: AsyncSession, prediction: schemas.PredictionCreate):
+    """Insert or replace the prediction for (student_id, model_version) and return the stored row"""
+    await db.execute(crud.prediction_upsert(db), [{
+        "student_id": prediction.student_id,
+        "prediction": prediction.prediction,
+        "model_version": prediction.model_version
+    }])
+    await db.commit()
+    await cache_invalidate(student_key(prediction.student_id))
+    result = await db.execute(select(Prediction).where(
+        Prediction.student_id == prediction.student_id,
+        Prediction.model_version == prediction.model_version
+    ))
+    return result.scalars().one()
+
+async def create_prediction(db: AsyncSession, prediction: schemas.PredictionCreate):
+    db_prediction = Prediction(**prediction.model_dump())
+    db.add(db_prediction)
+    await db.commit()
+    await cache_invalidate(student_key(prediction.student_id))
+    await db.refresh(db_prediction)
+    return db_prediction
+
+async def plan_predictions_bulk(db: AsyncSession, records: List[dict], upsert: bool = False
+                                ) -> Tuple[List[Tuple[int, schemas.PredictionBase]], Dict[int, str], Dict[int, str]]:
+    return await db.run_sync(crud.plan_predictions_bulk, records, upsert)
+
+async def create_predictions_bulk(db: AsyncSession, predictions: List[schemas.PredictionBase], upsert: bool = False) -> int:
+    await db.run_sync(crud.insert_predictions_bulk, predictions, upsert)
+    await db.commit()
+    await cache_invalidate(*{student_key(prediction.student_id) for prediction in predictions})
+    return len(predictions)
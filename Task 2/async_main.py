@@ -0,0 +1,357 @@
+from fastapi import FastAPI, Depends, HTTPException, status, Body, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import init_async_engine, get_async_db, async_pool_stats
+from models import Base
+from cache import student_cache, student_key, LATEST_STUDENT_KEY
+from inference import create_batcher
+from crud import (
+    BULK_MAX_RECORDS, EXPORT_COLUMNS, STUDENT_IDS_MAX, UnsupportedDialectError, student_to_dict, encode_cursor,
+    decode_cursor, encode_watermark, decode_watermark, encode_export_rows
+)
+from schemas import *
+import async_crud
+import database
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+# Async variant of main.py: the same routes as `async def` on an AsyncSession, so
+# requests wait on database I/O in the event loop instead of holding a threadpool
+# worker. Run with: uvicorn async_main:app
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Initialize FastAPI app
+app = FastAPI(
+    title="Student Performance API (async)",
+    description="API for managing student performance data",
+    version="1.0.0"
+)
+
+# CORS configuration
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+
+# Database initialization
+@app.on_event("startup")
+async def startup_event():
+    engine = init_async_engine()
+    async with engine.begin() as conn:
+        if os.getenv("ENVIRONMENT") == "development":
+            await conn.run_sync(Base.metadata.drop_all)
+            logger.warning("Dropped all tables (development mode)")
+
+        await conn.run_sync(Base.metadata.create_all)
+    logger.info("Database tables initialized")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await init_async_engine().dispose()
+
+# Micro-batching predictor for POST /predict, created at startup
+batcher = None
+
+@app.on_event("startup")
+async def start_inference():
+    global batcher
+    batcher = create_batcher()
+    if batcher is not None:
+        batcher.start()
+        logger.info("Prediction model loaded for in-process inference")
+
+@app.on_event("shutdown")
+async def stop_inference():
+    if batcher is not None:
+        await batcher.stop()
+
+# Health check endpoint
+@app.get("/", tags=["Health Check"])
+async def health_check():
+    return {"status": "healthy", "message": "Student Performance API is running"}
+
+# Internal endpoints
+@app.get("/internal/pool", tags=["Internal"])
+async def read_pool_stats():
+    return async_pool_stats.snapshot(init_async_engine().pool)
+
+@app.get("/internal/cache", tags=["Internal"])
+async def read_cache_stats():
+    # Counting entries scans Redis, so it runs off the event loop
+    return await run_in_threadpool(student_cache.stats)
+
+@app.get("/internal/inference", tags=["Internal"])
+async def read_inference_stats():
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+# Student endpoints
+@app.post("/students/", response_model=Student, status_code=status.HTTP_201_CREATED, tags=["Students"])
+async def create_student(student: StudentCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await async_crud.create_student_with_exam(db, student)
+    except Exception as e:
+        logger.error(f"Error creating student: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@app.post("/students/bulk", response_model=BulkStudentResponse, tags=["Students"])
+async def bulk_create_students(records: List[Dict[str, Any]] = Body(...), db: AsyncSession = Depends(get_async_db)):
+    if len(records) > BULK_MAX_RECORDS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_RECORDS} records per request"
+        )
+
+    valid_indexes, valid_students, errors = validate_records(records, StudentCreate)
+
+    try:
+        student_ids = await async_crud.create_students_bulk(db, valid_students)
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error bulk creating students: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return build_bulk_student_response(len(records), valid_indexes, student_ids, errors)
+
+async def export_rows(export_format: ExportFormatEnum):
+    """Encode the export chunk by chunk as it comes off the database cursor"""
+    # The response outlives request dependencies, so the stream owns its session
+    init_async_engine()
+    async with database.AsyncSessionLocal() as db:
+        if export_format == ExportFormatEnum.csv:
+            yield encode_export_rows([EXPORT_COLUMNS], export_format)
+        async for rows in async_crud.iter_student_export(db):
+            yield encode_export_rows(rows, export_format)
+
+# Must be registered before /students/{student_id} so "changes" isn't parsed as an id
+@app.get("/students/changes", response_model=StudentChanges, tags=["Students"])
+async def read_student_changes(
+    since: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # since takes the next_watermark of the previous call, or an ISO-8601 timestamp
+    try:
+        position = decode_watermark(since) if since else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    students = await async_crud.get_student_changes(db, since=position, limit=limit)
+    next_watermark = since
+    if students:
+        next_watermark = encode_watermark(students[-1].updated_at, students[-1].student_id)
+
+    return {
+        "items": [student_to_dict(student) for student in students],
+        "next_watermark": next_watermark,
+        "has_more": len(students) == limit
+    }
+
+# Must be registered before /students/{student_id} so "unscored" isn't parsed as an id
+@app.get("/students/unscored", response_model=list[Student], tags=["Students"])
+async def read_unscored_students(
+    response: Response,
+    after_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Students without a prediction, paged like GET /students/ (X-Next-Cursor)
+    try:
+        last_id = decode_cursor(after_id) if after_id else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    students = await async_crud.get_unscored_students(db, after_id=last_id, limit=limit)
+    if len(students) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(students[-1].student_id)
+
+    return [student_to_dict(student) for student in students]
+
+# Must be registered before /students/{student_id} so "export" isn't parsed as an id
+@app.get("/students/export", tags=["Students"])
+async def export_students(format: ExportFormatEnum = ExportFormatEnum.ndjson):
+    if format == ExportFormatEnum.csv:
+        media_type = "text/csv"
+    else:
+        media_type = "application/x-ndjson"
+    return StreamingResponse(
+        export_rows(format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=students.{format.value}"}
+    )
+
+@app.get("/students/{student_id}", response_model=Student, tags=["Students"])
+async def read_student(student_id: int, db: AsyncSession = Depends(get_async_db)):
+    # Read-through cache; async_crud invalidates the entry on delete and new predictions
+    cached = await async_crud.cache_get(student_key(student_id))
+    if cached is not None:
+        return cached
+
+    db_student = await async_crud.get_student(db, student_id)
+    if not db_student:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Student not found"
+        )
+
+    student = student_to_dict(db_student)
+    await async_crud.cache_set(student_key(student_id), student)
+    return student
+
+@app.get("/students/", response_model=list[Student], tags=["Students"])
+async def read_students(
+    response: Response,
+    after_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    ids: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # after_id takes the opaque cursor returned in X-Next-Cursor by the previous page
+    try:
+        last_id = decode_cursor(after_id) if after_id else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    # ids=1&ids=2... restricts the listing to those students, fetched with one IN query
+    if ids and len(ids) > STUDENT_IDS_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {STUDENT_IDS_MAX} ids per request"
+        )
+
+    students = await async_crud.get_students(db, after_id=last_id, limit=limit, student_ids=ids)
+    if len(students) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(students[-1].student_id)
+
+    return [student_to_dict(student) for student in students]
+
+@app.delete("/students/{student_id}", tags=["Students"])
+async def delete_student(student_id: int, db: AsyncSession = Depends(get_async_db)):
+    if not await async_crud.delete_student(db, student_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Student not found"
+        )
+    return {"message": "Student deleted successfully"}
+
+@app.get("/students/latest/", response_model=StudentBase)
+async def read_latest_student(db: AsyncSession = Depends(get_async_db)):
+    # Read-through cache; async_crud invalidates the entry when students are created or deleted
+    cached = await async_crud.cache_get(LATEST_STUDENT_KEY)
+    if cached is not None:
+        return cached
+
+    student = await async_crud.get_latest_student(db)
+    if not student:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No students found"
+        )
+
+    latest = student_to_dict(student)
+    await async_crud.cache_set(LATEST_STUDENT_KEY, latest)
+    return latest
+
+# Prediction endpoints
+@app.post("/predict", response_model=PredictResponse, tags=["Predictions"])
+async def predict_score(request: PredictRequest):
+    if batcher is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Prediction model is not loaded"
+        )
+    try:
+        prediction, batch_size = await batcher.submit(request.to_student_record())
+    except Exception as e:
+        logger.error(f"Error predicting: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Prediction failed: {str(e)}"
+        )
+    return {"prediction": prediction, "batch_size": batch_size}
+
+@app.post("/predictions/bulk", response_model=BulkPredictionResponse, tags=["Predictions"])
+async def bulk_create_predictions(
+    records: List[Dict[str, Any]] = Body(...),
+    upsert: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # upsert=true keeps one prediction per (student_id, model_version): the latest replaces the stored one
+    if len(records) > BULK_MAX_RECORDS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_RECORDS} records per request"
+        )
+
+    to_insert, statuses, errors = await async_crud.plan_predictions_bulk(db, records, upsert)
+
+    try:
+        await async_crud.create_predictions_bulk(db, [prediction for _, prediction in to_insert], upsert=upsert)
+    except UnsupportedDialectError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=str(e)
+        )
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error bulk creating predictions: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid request data: {str(e)}"
+        )
+
+    return build_bulk_prediction_response(len(records), to_insert, statuses, errors)
+
+@app.post("/predictions/", response_model=Prediction, tags=["Predictions"])
+async def create_prediction(
+    prediction: PredictionCreate,
+    upsert: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        # Replace the stored prediction of the same student and model version
+        if upsert and prediction.model_version is not None:
+            return await async_crud.upsert_prediction(db, prediction)
+        return await async_crud.create_prediction(db, prediction)
+    except UnsupportedDialectError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=str(e)
+        )
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error creating prediction: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid request data: {str(e)}"
+        )
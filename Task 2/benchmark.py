@@ -0,0 +1,119 @@
+"""Benchmarks for the Student Performance API.
+
+Each benchmark runs against a throwaway SQLite database so it can run
+anywhere; aiosqlite stands in for aiomysql in async mode.
+
+Usage:
+    python benchmark.py sync-vs-async --students 1000 --requests 5000 --concurrency 40
+
+Keep --concurrency at or below the 40 threads FastAPI runs sync routes on.
+The sync app validates each response on that same threadpool while its
+session still holds a connection, so with more requests in flight, requests
+blocked on the connection pool can take every thread and main.py stalls
+until DB_POOL_TIMEOUT.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+
+# Point both engines at a scratch database before database.py is imported
+BENCH_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="student_api_bench_"), "bench.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB_PATH}")
+# Both apps cache student reads; with the cache on, repeated ids never reach the
+# database and the comparison measures the cache instead of the database I/O.
+# Set STUDENT_CACHE_BACKEND=memory to benchmark the cached path instead.
+os.environ.setdefault("STUDENT_CACHE_BACKEND", "none")
+
+import httpx
+import numpy as np
+
+from database import SessionLocal, engine
+from models import Base
+import crud
+import schemas
+
+def seed_students(count: int) -> list:
+    """Create `count` random students through the bulk path and return their ids"""
+    students = [schemas.StudentCreate(
+        student_id=0,
+        created_at="2025-01-01T00:00:00",
+        gender=random.choice(list(schemas.GenderEnum)),
+        race_ethnicity=random.choice(list(schemas.RaceEthnicityEnum)),
+        parental_level_of_education=random.choice(list(schemas.EducationEnum)),
+        lunch=random.choice(list(schemas.LunchEnum)),
+        test_preparation_course=random.choice(list(schemas.PrepStatusEnum)),
+        math_score=random.randint(0, 100),
+        reading_score=random.randint(0, 100),
+        writing_score=random.randint(0, 100)
+    ) for _ in range(count)]
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        return crud.create_students_bulk(db, students)
+    finally:
+        db.close()
+
+def summarize(name: str, latencies: list, elapsed: float):
+    latencies_ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    print(
+        f"{name:<6} {len(latencies) / elapsed:>10.0f} req/s   "
+        f"p50 {p50:7.2f} ms   p95 {p95:7.2f} ms   p99 {p99:7.2f} ms"
+    )
+
+async def run_reads(app, student_ids: list, requests: int, concurrency: int):
+    """Fire `requests` GET /students/{id} calls at `app` with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def read_one(client):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(f"/students/{random.choice(student_ids)}")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(read_one(client) for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+def bench_sync_vs_async(args):
+    student_ids = seed_students(args.students)
+    print(f"Seeded {len(student_ids)} students into {BENCH_DB_PATH}")
+    print(f"{args.requests} reads, {args.concurrency} concurrent, cache {os.environ['STUDENT_CACHE_BACKEND']}")
+
+    import main
+    import async_main
+
+    # main.py sets up INFO logging, under which httpx logs every request; keep that out of the timings
+    for logger_name in ("httpx", "httpcore"):
+        logging.getLogger(logger_name).setLevel(logging.WARNING)
+
+    for name, app in (("sync", main.app), ("async", async_main.app)):
+        latencies, elapsed = asyncio.run(run_reads(app, student_ids, args.requests, args.concurrency))
+        summarize(name, latencies, elapsed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Student Performance API benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    sync_vs_async = subparsers.add_parser("sync-vs-async", help="Compare read throughput of main.py and async_main.py")
+    sync_vs_async.add_argument("--students", type=int, default=1000)
+    sync_vs_async.add_argument("--requests", type=int, default=5000)
+    sync_vs_async.add_argument("--concurrency", type=int, default=40)
+    sync_vs_async.set_defaults(func=bench_sync_vs_async)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+from collections import OrderedDict
+from typing import Any, Optional
+import fnmatch
+import logging
+import os
+import pickle
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+CACHE_BACKEND = os.getenv("STUDENT_CACHE_BACKEND", "memory")  # memory, redis, redis-local or none
+CACHE_MAX_ENTRIES = int(os.getenv("STUDENT_CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL = float(os.getenv("STUDENT_CACHE_TTL", "300"))  # seconds
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CACHE_KEY_PREFIX = "student-api:"
+
+# Keys deleted per DEL when clearing the shared cache
+CLEAR_BATCH_SIZE = 500
+
+LATEST_STUDENT_KEY = "student:latest"
+
+def student_key(student_id: int) -> str:
+    return f"student:{student_id}"
+
+class LRUCache:
+    """In-process cache with LRU eviction and a per-entry TTL"""
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+class LocalRedis:
+    """In-process stand-in for the subset of the redis client used by SharedCache.
+
+    Lets the shared backend run in tests and local setups without a Redis server.
+    """
+
+    def __init__(self):
+        self._data = {}  # name -> (expires_at or None, value)
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name: str, value: bytes, ex: Optional[float] = None):
+        with self._lock:
+            self._data[name] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def scan_iter(self, match: str = "*", count: Optional[int] = None):
+        with self._lock:
+            names = list(self._data)
+        return (name for name in names if fnmatch.fnmatchcase(name, match))
+
+    def dbsize(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+class SharedCache:
+    """Cache shared by all API workers, stored in Redis (or a LocalRedis stand-in).
+
+    Expiry and eviction are left to the server (set maxmemory-policy to allkeys-lru);
+    hit, miss and invalidation counters are per process.
+    """
+
+    backend = "redis"
+
+    def __init__(self, client, ttl: float = CACHE_TTL, prefix: str = CACHE_KEY_PREFIX):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations = 0
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            data = self.client.get(self.prefix + key)
+        except Exception as e:
+            # An unreachable cache must not take the API down; fall through to the database
+            logger.warning(f"Shared cache get failed: {str(e)}")
+            self._count("errors")
+            data = None
+        if data is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return pickle.loads(data)
+
+    def set(self, key: str, value: Any):
+        try:
+            self.client.set(self.prefix + key, pickle.dumps(value), ex=int(self.ttl) or None)
+        except Exception as e:
+            logger.warning(f"Shared cache set failed: {str(e)}")
+            self._count("errors")
+
+    def invalidate(self, *keys: str):
+        try:
+            self._count("invalidations", self.client.delete(*(self.prefix + key for key in keys)))
+        except Exception as e:
+            logger.warning(f"Shared cache invalidate failed: {str(e)}")
+            self._count("errors")
+
+    def clear(self):
+        """Delete this cache's keys only; the database may be shared with other services"""
+        batch = []
+        for name in self.client.scan_iter(match=f"{self.prefix}*", count=CLEAR_BATCH_SIZE):
+            batch.append(name)
+            if len(batch) >= CLEAR_BATCH_SIZE:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "backend": self.backend,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "errors": self.errors,
+            }
+        try:
+            # Only this cache's keys; the database may hold other services' keys too
+            stats["entries"] = sum(1 for _ in self.client.scan_iter(match=f"{self.prefix}*", count=CLEAR_BATCH_SIZE))
+            info = self.client.info("stats") if hasattr(self.client, "info") else {}
+            stats["evictions"] = info.get("evicted_keys", 0)
+            stats["expirations"] = info.get("expired_keys", 0)
+        except Exception as e:
+            logger.warning(f"Shared cache stats failed: {str(e)}")
+        return stats
+
+class NullCache:
+    """Cache that never stores anything, for STUDENT_CACHE_BACKEND=none"""
+
+    backend = "none"
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def invalidate(self, *keys: str):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": self.backend}
+
+def create_cache(backend: str = CACHE_BACKEND):
+    if backend == "memory":
+        return LRUCache()
+    if backend == "redis":
+        import redis
+        return SharedCache(redis.Redis.from_url(REDIS_URL))
+    if backend == "redis-local":
+        return SharedCache(LocalRedis())
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown STUDENT_CACHE_BACKEND: {backend}")
+
+# Cache for student read endpoints, invalidated by the writes in crud.py
+student_cache = create_cache()
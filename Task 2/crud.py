@@ -1,7 +1,33 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, and_, or_, func, text
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import base64
+import csv
+import io
+import json
+import os
+import uuid
 from models import Student, TestPreparation, Exam, Prediction
+from cache import student_cache, student_key, LATEST_STUDENT_KEY
 import schemas
 from schemas import PrepStatusEnum
+
+# Rows per multi-row INSERT statement for bulk loads
+BULK_INSERT_CHUNK_SIZE = 1000
+# Largest number of records accepted by a single bulk request
+BULK_MAX_RECORDS = int(os.getenv("BULK_MAX_RECORDS", "10000"))
+# Most student ids accepted by one GET /students/?ids= request
+STUDENT_IDS_MAX = 1000
+# Rows fetched per round trip from the server-side cursor of an export
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+
+# Columns of a flat export row (one row per exam)
+EXPORT_COLUMNS = [
+    "student_id", "gender", "race_ethnicity", "parental_level_of_education", "lunch",
+    "created_at", "test_preparation", "math_score", "reading_score", "writing_score"
+]
+
 def create_student_with_exam(db: Session, student: schemas.StudentCreate):
     db_student = Student(
         gender=student.gender.value,
@@ -25,6 +51,7 @@ def create_student_with_exam(db: Session, student: schemas.StudentCreate):
     ))
     
     db.commit()
+    student_cache.invalidate(LATEST_STUDENT_KEY)
     test_preparation_status = "completed" if student.test_preparation_course == PrepStatusEnum.completed else "none"
     
     return {
@@ -44,17 +71,268 @@ def create_student_with_exam(db: Session, student: schemas.StudentCreate):
     db.refresh(db_student)
     return db_student
 
+def _insert_student_rows(db: Session, rows: List[dict]) -> List[int]:
+    """Insert student rows with one multi-row INSERT and return their ids in input order.
+
+    The ids come from RETURNING where the dialect has it, from the first
+    generated id in MySQL's non-interleaved lock modes, and otherwise from a
+    SELECT on a batch key written with the rows.
+    """
+    dialect = db.get_bind().dialect
+    if dialect.insert_executemany_returning:
+        result = db.execute(
+            insert(Student).returning(Student.student_id, sort_by_parameter_order=True),
+            rows
+        )
+        return list(result.scalars())
+
+    increment, lock_mode = _autoinc_settings(db)
+    if lock_mode != 2:
+        # MySQL has no RETURNING: a multi-row INSERT reports the first generated id, and in
+        # the traditional (0) and consecutive (1) lock modes InnoDB allocates the statement's
+        # ids as one block, spaced by auto_increment_increment
+        result = db.execute(insert(Student.__table__).values(rows))
+        first_id = result.lastrowid
+        return list(range(first_id, first_id + len(rows) * increment, increment))
+
+    # Interleaved mode (2, the MySQL 8 default and required by Galera): concurrent inserts
+    # can take ids from the middle of a statement's range. The rows are tagged with a random
+    # key instead; a statement's ids still increase in row order, so sorting them maps them back
+    batch = uuid.uuid4().hex
+    db.execute(insert(Student.__table__).values([{**row, "insert_batch": batch} for row in rows]))
+    ids = list(db.execute(
+        select(Student.student_id).where(Student.insert_batch == batch).order_by(Student.student_id)
+    ).scalars())
+    if len(ids) != len(rows):
+        raise RuntimeError(f"Expected {len(rows)} students in insert batch {batch}, found {len(ids)}")
+    return ids
+
+def _autoinc_settings(db: Session) -> Tuple[int, int]:
+    """(auto_increment_increment, innodb_autoinc_lock_mode) of the session's connection.
+
+    Dialects other than MySQL/MariaDB report lock mode 2, so ids are read back by batch key.
+    """
+    connection = db.connection()
+    settings = connection.info.get("autoinc_settings")
+    if settings is None:
+        if connection.dialect.name in ("mysql", "mariadb"):
+            increment, lock_mode = connection.execute(
+                text("SELECT @@auto_increment_increment, @@innodb_autoinc_lock_mode")
+            ).one()
+            settings = (int(increment), int(lock_mode))
+        else:
+            settings = (1, 2)
+        connection.info["autoinc_settings"] = settings
+    return settings
+
+def create_students_bulk(db: Session, students: List[schemas.StudentCreate]) -> List[int]:
+    """Insert many students with their exams and test preparation in one transaction.
+
+    Each chunk costs three multi-row INSERTs (students, test_preparation, exams)
+    instead of a flush and commit per student. With MySQL's interleaved
+    autoinc lock mode one more SELECT per chunk reads the new ids back.
+
+    Returns:
+        The new student ids, in the same order as ``students``
+    """
+    student_ids = insert_students_bulk(db, students)
+    db.commit()
+    student_cache.invalidate(LATEST_STUDENT_KEY)
+    return student_ids
+
+def insert_students_bulk(db: Session, students: List[schemas.StudentCreate]) -> List[int]:
+    """The INSERTs of create_students_bulk, without the commit; returns the new ids in input order"""
+    student_ids = []
+    for start in range(0, len(students), BULK_INSERT_CHUNK_SIZE):
+        chunk = students[start:start + BULK_INSERT_CHUNK_SIZE]
+        ids = _insert_student_rows(db, [{
+            "gender": student.gender.value,
+            "race_ethnicity": student.race_ethnicity.value,
+            "parental_level_of_education": student.parental_level_of_education.value,
+            "lunch": student.lunch.value
+        } for student in chunk])
+
+        db.execute(insert(TestPreparation.__table__), [{
+            "student_id": student_id,
+            "status": student.test_preparation_course.value
+        } for student_id, student in zip(ids, chunk)])
+
+        db.execute(insert(Exam.__table__), [{
+            "student_id": student_id,
+            "math_score": student.math_score,
+            "reading_score": student.reading_score,
+            "writing_score": student.writing_score
+        } for student_id, student in zip(ids, chunk)])
+
+        student_ids.extend(ids)
+    return student_ids
+
 def get_student(db: Session, student_id: int):
-    return db.query(Student).filter(Student.student_id == student_id).first()
+    return (
+        db.query(Student)
+        .options(joinedload(Student.test_preparation), selectinload(Student.exams))
+        .filter(Student.student_id == student_id)
+        .first()
+    )
+
+def student_to_dict(db_student: Student) -> dict:
+    """Build the API representation of a student from its loaded relationships"""
+    return {
+        "student_id": db_student.student_id,
+        "gender": db_student.gender,
+        "race_ethnicity": db_student.race_ethnicity,
+        "parental_level_of_education": db_student.parental_level_of_education,
+        "lunch": db_student.lunch,
+        "created_at": db_student.created_at,
+        "updated_at": db_student.updated_at,
+        "exams": [{
+            "math_score": exam.math_score,
+            "reading_score": exam.reading_score,
+            "writing_score": exam.writing_score
+        } for exam in db_student.exams],
+        "test_preparation": db_student.test_preparation.status if db_student.test_preparation else None
+    }
+
+def encode_cursor(student_id: int) -> str:
+    """Encode the last student_id of a page as an opaque pagination cursor"""
+    return base64.urlsafe_b64encode(f"id:{student_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor from encode_cursor; raises ValueError if it is malformed"""
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not decoded.startswith("id:") or not decoded[3:].isdigit():
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return int(decoded[3:])
 
-def get_students(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Student).offset(skip).limit(limit).all()
+def get_students(db: Session, after_id: Optional[int] = None, limit: int = 100,
+                 student_ids: Optional[List[int]] = None):
+    """Keyset page of students ordered by student_id, with relationships loaded in batch.
+
+    The page costs a constant number of queries however deep it is: one for the
+    students joined to test_preparation and one IN query per 500 students for exams.
+    `student_ids` restricts the page to those students with one IN query.
+    """
+    query = db.query(Student).options(
+        joinedload(Student.test_preparation),
+        selectinload(Student.exams)
+    )
+    if student_ids:
+        query = query.filter(Student.student_id.in_(student_ids))
+    if after_id is not None:
+        query = query.filter(Student.student_id > after_id)
+    return query.order_by(Student.student_id).limit(limit).all()
+
+def get_unscored_students(db: Session, after_id: Optional[int] = None, limit: int = 100):
+    """Keyset page of students that have no prediction yet, ordered by student_id"""
+    scored = select(Prediction.id).where(Prediction.student_id == Student.student_id).exists()
+    query = db.query(Student).options(
+        joinedload(Student.test_preparation),
+        selectinload(Student.exams)
+    ).filter(~scored)
+    if after_id is not None:
+        query = query.filter(Student.student_id > after_id)
+    return query.order_by(Student.student_id).limit(limit).all()
+
+def encode_watermark(updated_at: datetime, student_id: int) -> str:
+    """Encode the position of the last student returned by the change feed"""
+    return base64.urlsafe_b64encode(f"{updated_at.isoformat()}|{student_id}".encode()).decode().rstrip("=")
+
+def decode_watermark(since: str) -> Tuple[datetime, Optional[int]]:
+    """Decode a watermark from encode_watermark, or accept a plain ISO-8601 timestamp.
+
+    Returns the timestamp and the student_id to resume after, which is None for a
+    plain timestamp (every student updated strictly after it). Raises ValueError if
+    `since` is neither.
+    """
+    try:
+        return datetime.fromisoformat(since), None
+    except ValueError:
+        pass
+    try:
+        decoded = base64.urlsafe_b64decode(since + "=" * (-len(since) % 4)).decode()
+        timestamp, student_id = decoded.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(student_id)
+    except ValueError:
+        raise ValueError(f"Invalid watermark: {since}")
+
+def get_student_changes(db: Session, since: Optional[Tuple[datetime, Optional[int]]] = None, limit: int = 100):
+    """Students created or modified after `since`, in (updated_at, student_id) order.
+
+    Served by the (updated_at, student_id) index, so each call only reads the new rows.
+    updated_at is taken when a statement runs, not when its transaction commits, so a
+    slow transaction can commit rows behind a position a consumer has already passed.
+    Consumers that must not miss rows resume a lag window behind their last position
+    and skip the (student_id, updated_at) pairs they have already processed, as
+    predict.py --changes does.
+    """
+    query = db.query(Student).options(
+        joinedload(Student.test_preparation),
+        selectinload(Student.exams)
+    )
+    if since is not None:
+        updated_at, student_id = since
+        if student_id is None:
+            query = query.filter(Student.updated_at > updated_at)
+        else:
+            query = query.filter(and_(
+                Student.updated_at >= updated_at,
+                or_(Student.updated_at > updated_at, Student.student_id > student_id)
+            ))
+    return query.order_by(Student.updated_at, Student.student_id).limit(limit).all()
+
+def iter_student_export(db: Session, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Yield chunks of flat student/test_preparation/exam rows from a server-side cursor.
+
+    Only one chunk is held in memory at a time, however large the tables are.
+    """
+    for partition in db.execute(student_export_query(chunk_size)).partitions():
+        yield partition
+
+def student_export_query(chunk_size: int = EXPORT_CHUNK_SIZE):
+    """One flat row per exam (EXPORT_COLUMNS), streamed `chunk_size` rows at a time"""
+    return (
+        select(
+            Student.student_id,
+            Student.gender,
+            Student.race_ethnicity,
+            Student.parental_level_of_education,
+            Student.lunch,
+            Student.created_at,
+            TestPreparation.status.label("test_preparation"),
+            Exam.math_score,
+            Exam.reading_score,
+            Exam.writing_score
+        )
+        .outerjoin(TestPreparation, TestPreparation.student_id == Student.student_id)
+        .outerjoin(Exam, Exam.student_id == Student.student_id)
+        .execution_options(stream_results=True, yield_per=chunk_size)
+    )
+
+def encode_export_rows(rows, export_format: schemas.ExportFormatEnum) -> str:
+    """Encode export rows as CSV lines or NDJSON objects (one per line, created_at in ISO-8601)"""
+    if export_format == schemas.ExportFormatEnum.csv:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    created_at = EXPORT_COLUMNS.index("created_at")
+    lines = []
+    for row in rows:
+        values = list(row)
+        if values[created_at] is not None:
+            values[created_at] = values[created_at].isoformat()
+        lines.append(json.dumps(dict(zip(EXPORT_COLUMNS, values))))
+    lines.append("")
+    return "\n".join(lines)
 
 def delete_student(db: Session, student_id: int):
     student = db.query(Student).filter(Student.student_id == student_id).first()
     if student:
         db.delete(student)
         db.commit()
+        student_cache.invalidate(student_key(student_id), LATEST_STUDENT_KEY)
         return True
     return False
 
@@ -62,8 +340,155 @@ def create_prediction(db: Session, prediction: schemas.PredictionCreate):
     db_prediction = Prediction(**prediction.model_dump())
     db.add(db_prediction)
     db.commit()
+    student_cache.invalidate(student_key(prediction.student_id))
     db.refresh(db_prediction)
     return db_prediction
 
+def get_existing_student_ids(db: Session, student_ids: List[int]) -> set:
+    """The subset of `student_ids` that exist, looked up in one IN query per chunk"""
+    existing = set()
+    unique_ids = list(set(student_ids))
+    for start in range(0, len(unique_ids), BULK_INSERT_CHUNK_SIZE):
+        chunk = unique_ids[start:start + BULK_INSERT_CHUNK_SIZE]
+        existing.update(db.execute(select(Student.student_id).where(Student.student_id.in_(chunk))).scalars())
+    return existing
+
+def get_existing_prediction_keys(db: Session, keys: List[Tuple[int, str]]) -> set:
+    """The subset of (student_id, model_version) pairs that already have a prediction"""
+    existing = set()
+    wanted = set(keys)
+    for start in range(0, len(keys), BULK_INSERT_CHUNK_SIZE):
+        chunk = keys[start:start + BULK_INSERT_CHUNK_SIZE]
+        rows = db.execute(
+            select(Prediction.student_id, Prediction.model_version).where(
+                Prediction.student_id.in_({student_id for student_id, _ in chunk}),
+                Prediction.model_version.in_({model_version for _, model_version in chunk})
+            )
+        )
+        existing.update(key for key in map(tuple, rows) if key in wanted)
+    return existing
+
+class UnsupportedDialectError(ValueError):
+    """The database dialect has no statement for the requested operation"""
+
+def prediction_upsert(db: Session):
+    """Multi-row INSERT that replaces the prediction stored for the same student and model version.
+
+    Works with a Session or an AsyncSession. Raises UnsupportedDialectError on
+    databases other than MySQL, SQLite and PostgreSQL.
+    """
+    table = Prediction.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        statement = mysql_insert(table)
+        return statement.on_duplicate_key_update(
+            prediction=statement.inserted.prediction,
+            prediction_date=func.now()
+        )
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table)
+        return statement.on_conflict_do_update(
+            index_elements=["student_id", "model_version"],
+            set_={"prediction": statement.excluded.prediction, "prediction_date": func.now()}
+        )
+    raise UnsupportedDialectError(f"Prediction upsert is not supported on {dialect}")
+
+def upsert_prediction(db: Session, prediction: schemas.PredictionCreate):
+    """Insert or replace the prediction for (student_id, model_version) and return the stored row"""
+    db.execute(prediction_upsert(db), [{
+        "student_id": prediction.student_id,
+        "prediction": prediction.prediction,
+        "model_version": prediction.model_version
+    }])
+    db.commit()
+    student_cache.invalidate(student_key(prediction.student_id))
+    return db.query(Prediction).filter(
+        Prediction.student_id == prediction.student_id,
+        Prediction.model_version == prediction.model_version
+    ).one()
+
+def create_predictions_bulk(db: Session, predictions: List[schemas.PredictionBase], upsert: bool = False) -> int:
+    """Insert many predictions with multi-row INSERTs in one transaction.
+
+    With upsert, a prediction for a (student_id, model_version) pair that is already
+    stored replaces it instead of failing on the unique index.
+    """
+    insert_predictions_bulk(db, predictions, upsert)
+    db.commit()
+    student_cache.invalidate(*{student_key(prediction.student_id) for prediction in predictions})
+    return len(predictions)
+
+def insert_predictions_bulk(db: Session, predictions: List[schemas.PredictionBase], upsert: bool = False):
+    """The INSERTs of create_predictions_bulk, without the commit"""
+    statement = prediction_upsert(db) if upsert else insert(Prediction.__table__)
+    for start in range(0, len(predictions), BULK_INSERT_CHUNK_SIZE):
+        chunk = predictions[start:start + BULK_INSERT_CHUNK_SIZE]
+        db.execute(statement, [{
+            "student_id": prediction.student_id,
+            "prediction": prediction.prediction,
+            "model_version": prediction.model_version
+        } for prediction in chunk])
+
+def plan_predictions_bulk(db: Session, records: List[dict], upsert: bool = False
+                          ) -> Tuple[List[Tuple[int, schemas.PredictionBase]], Dict[int, str], Dict[int, str]]:
+    """Validate the records of POST /predictions/bulk and decide what each one does.
+
+    upsert=true keeps one prediction per (student_id, model_version): the latest
+    replaces the stored one.
+
+    Returns:
+        The (index, prediction) pairs to insert, a status for every index that is
+        not a plain "created" ("updated" or "superseded"), and an error message for
+        every rejected index
+    """
+    valid_indexes, valid_predictions, errors = schemas.validate_records(records, schemas.PredictionBase)
+    statuses = {}
+
+    # Unknown students would fail the whole INSERT on the foreign key, so report them per item
+    existing_ids = get_existing_student_ids(db, [p.student_id for p in valid_predictions])
+    to_insert = []
+    versioned = {}  # (student_id, model_version) -> (index, prediction), last item wins
+    for index, prediction in zip(valid_indexes, valid_predictions):
+        if prediction.student_id not in existing_ids:
+            errors[index] = f"Student {prediction.student_id} not found"
+        elif prediction.model_version is None:
+            if upsert:
+                errors[index] = "model_version is required for upsert"
+            else:
+                to_insert.append((index, prediction))
+        else:
+            key = (prediction.student_id, prediction.model_version)
+            if key not in versioned:
+                versioned[key] = (index, prediction)
+            elif upsert:
+                statuses[versioned[key][0]] = "superseded"
+                versioned[key] = (index, prediction)
+            else:
+                errors[index] = "Duplicate student_id and model_version in request"
+
+    # Pairs already stored would violate the unique index, so check them up front
+    stored = get_existing_prediction_keys(db, list(versioned))
+    for key, (index, prediction) in versioned.items():
+        if key not in stored:
+            to_insert.append((index, prediction))
+        elif upsert:
+            statuses[index] = "updated"
+            to_insert.append((index, prediction))
+        else:
+            errors[index] = (
+                f"Student {key[0]} already has a prediction for model_version {key[1]}; use upsert=true to replace it"
+            )
+    return to_insert, statuses, errors
+
 def get_latest_student(db: Session):
-    return db.query(Student).order_by(Student.student_id.desc()).first()
\ No newline at end of file
+    return (
+        db.query(Student)
+        .options(joinedload(Student.test_preparation), selectinload(Student.exams))
+        .order_by(Student.student_id.desc())
+        .first()
+    )
\ No newline at end of file
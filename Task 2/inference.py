@@ -0,0 +1,140 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+# Inference configuration
+INFERENCE_ENABLED = os.getenv("INFERENCE_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "2"))
+# The predictor lives in the prediction pipeline (Task 3/predict.py)
+PREDICT_DIR = os.getenv(
+    "PREDICT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Task 3")
+)
+
+def load_predictor():
+    """Load the NeuralNetworkPredictor artifacts (model, scaler, encoder) once"""
+    if PREDICT_DIR not in sys.path:
+        sys.path.append(PREDICT_DIR)
+    from predict import NeuralNetworkPredictor
+    return NeuralNetworkPredictor()
+
+class MicroBatcher:
+    """Gathers concurrent prediction requests into batches for one forward pass each.
+
+    A batch is closed when it reaches max_batch_size or max_wait_ms after its first
+    request arrived, whichever comes first. Forward passes run one at a time on a
+    dedicated thread so the event loop keeps accepting requests meanwhile.
+    """
+
+    def __init__(self, predict_batch: Callable[[List[Dict[str, Any]]], List[float]],
+                 max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS,
+                 cache_stats: Optional[Callable[[], dict]] = None):
+        self.predict_batch = predict_batch
+        self.cache_stats = cache_stats
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.requests = 0
+        self.batches = 0
+        self.max_seen_batch = 0
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, record: Dict[str, Any]) -> Tuple[float, int]:
+        """Queue one record; resolves to its prediction and the size of the batch it ran in"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future))
+        return await future
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Requests whose client went away are dropped before the forward pass
+            batch = [(record, future) for record, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            try:
+                predictions = await loop.run_in_executor(
+                    self._executor, self.predict_batch, [record for record, _ in batch]
+                )
+            except Exception as e:
+                logger.error(f"Batch prediction failed: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.requests += len(batch)
+            self.batches += 1
+            self.max_seen_batch = max(self.max_seen_batch, len(batch))
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result((float(prediction), len(batch)))
+
+    def stats(self) -> dict:
+        stats = {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "max_seen_batch_size": self.max_seen_batch,
+        }
+        if self.cache_stats is not None:
+            stats["prediction_cache"] = self.cache_stats()
+        return stats
+
+def create_batcher():
+    """Load the predictor and wrap it in a MicroBatcher; None if inference is unavailable"""
+    if not INFERENCE_ENABLED:
+        logger.info("In-process inference disabled")
+        return None
+    try:
+        predictor = load_predictor()
+    except Exception as e:
+        # The CRUD API stays up without the model; /predict answers 503
+        logger.error(f"Failed to load prediction model, /predict disabled: {str(e)}")
+        return None
+
+    # Repeated inputs are answered from the predictor's cache; only the rest reach the model
+    return MicroBatcher(predictor.predict_records, cache_stats=predictor.prediction_cache.stats)
@@ -1,15 +1,17 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status, Body, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from database import engine, get_db
+from database import engine, get_db, sync_pool_stats, SessionLocal
+from cache import student_cache, student_key, LATEST_STUDENT_KEY
+from inference import create_batcher
 from models import Base
 from crud import *
 from schemas import *
 import logging
 import os
 import models
-from sqlalchemy.orm import joinedload
-from requests import post
+from typing import Any, Dict, List, Optional
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -31,6 +33,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Database initialization
@@ -43,11 +46,42 @@ def startup_event():
     Base.metadata.create_all(bind=engine)
     logger.info("Database tables initialized")
 
+# Micro-batching predictor for POST /predict, created at startup
+batcher = None
+
+@app.on_event("startup")
+async def start_inference():
+    global batcher
+    batcher = create_batcher()
+    if batcher is not None:
+        batcher.start()
+        logger.info("Prediction model loaded for in-process inference")
+
+@app.on_event("shutdown")
+async def stop_inference():
+    if batcher is not None:
+        await batcher.stop()
+
 # Health check endpoint
 @app.get("/", tags=["Health Check"])
 def health_check():
     return {"status": "healthy", "message": "Student Performance API is running"}
 
+# Internal endpoints
+@app.get("/internal/pool", tags=["Internal"])
+def read_pool_stats():
+    return sync_pool_stats.snapshot(engine.pool)
+
+@app.get("/internal/cache", tags=["Internal"])
+def read_cache_stats():
+    return student_cache.stats()
+
+@app.get("/internal/inference", tags=["Internal"])
+def read_inference_stats():
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
 # Student endpoints
 @app.post("/students/", response_model=Student, status_code=status.HTTP_201_CREATED, tags=["Students"])
 def create_student(student: StudentCreate, db: Session = Depends(get_db)):
@@ -60,47 +94,153 @@ def create_student(student: StudentCreate, db: Session = Depends(get_db)):
             detail=str(e)
         )
 
+@app.post("/students/bulk", response_model=BulkStudentResponse, tags=["Students"])
+def bulk_create_students(records: List[Dict[str, Any]] = Body(...), db: Session = Depends(get_db)):
+    if len(records) > BULK_MAX_RECORDS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_RECORDS} records per request"
+        )
+
+    valid_indexes, valid_students, errors = validate_records(records, StudentCreate)
+
+    try:
+        student_ids = create_students_bulk(db, valid_students)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error bulk creating students: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return build_bulk_student_response(len(records), valid_indexes, student_ids, errors)
+
+def export_rows(export_format: ExportFormatEnum):
+    """Encode the export chunk by chunk as it comes off the database cursor"""
+    # The response outlives request dependencies, so the stream owns its session
+    db = SessionLocal()
+    try:
+        if export_format == ExportFormatEnum.csv:
+            yield encode_export_rows([EXPORT_COLUMNS], export_format)
+        for rows in iter_student_export(db):
+            yield encode_export_rows(rows, export_format)
+    finally:
+        db.close()
+
+# Must be registered before /students/{student_id} so "changes" isn't parsed as an id
+@app.get("/students/changes", response_model=StudentChanges, tags=["Students"])
+def read_student_changes(
+    since: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    # since takes the next_watermark of the previous call, or an ISO-8601 timestamp
+    try:
+        position = decode_watermark(since) if since else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    students = get_student_changes(db, since=position, limit=limit)
+    next_watermark = since
+    if students:
+        next_watermark = encode_watermark(students[-1].updated_at, students[-1].student_id)
+
+    return {
+        "items": [student_to_dict(student) for student in students],
+        "next_watermark": next_watermark,
+        "has_more": len(students) == limit
+    }
+
+# Must be registered before /students/{student_id} so "unscored" isn't parsed as an id
+@app.get("/students/unscored", response_model=list[Student], tags=["Students"])
+def read_unscored_students(
+    response: Response,
+    after_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    # Students without a prediction, paged like GET /students/ (X-Next-Cursor)
+    try:
+        last_id = decode_cursor(after_id) if after_id else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    students = get_unscored_students(db, after_id=last_id, limit=limit)
+    if len(students) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(students[-1].student_id)
+
+    return [student_to_dict(student) for student in students]
+
+# Must be registered before /students/{student_id} so "export" isn't parsed as an id
+@app.get("/students/export", tags=["Students"])
+def export_students(format: ExportFormatEnum = ExportFormatEnum.ndjson):
+    if format == ExportFormatEnum.csv:
+        media_type = "text/csv"
+    else:
+        media_type = "application/x-ndjson"
+    return StreamingResponse(
+        export_rows(format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=students.{format.value}"}
+    )
+
 @app.get("/students/{student_id}", response_model=Student, tags=["Students"])
 def read_student(student_id: int, db: Session = Depends(get_db)):
+    # Read-through cache; crud invalidates the entry on delete and new predictions
+    cached = student_cache.get(student_key(student_id))
+    if cached is not None:
+        return cached
+
     # Get student with all relationships
-    db_student = (
-        db.query(models.Student)
-        .options(
-            joinedload(models.Student.exams),
-            joinedload(models.Student.test_preparation)
-        )
-        .filter(models.Student.student_id == student_id)
-        .first()
-    )
-    
+    db_student = get_student(db, student_id)
     if not db_student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Student not found"
         )
-    
-    # Prepare the test preparation status
-    prep_status = None
-    if db_student.test_preparation:
-        prep_status = "completed" if db_student.test_preparation else "none"
-    
-    return {
-        "student_id": db_student.student_id,
-        "gender": db_student.gender,
-        "race_ethnicity": db_student.race_ethnicity,
-        "parental_level_of_education": db_student.parental_level_of_education,
-        "lunch": db_student.lunch,
-        "created_at": db_student.created_at,
-        "exams": db_student.exams,  # This will be a list
-        "test_preparation": prep_status  # Single value
-    }
+
+    student = student_to_dict(db_student)
+    student_cache.set(student_key(student_id), student)
+    return student
 
 @app.get("/students/", response_model=list[Student], tags=["Students"])
-def read_students(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_students(db, skip=skip, limit=limit)
+def read_students(
+    response: Response,
+    after_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    ids: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    # after_id takes the opaque cursor returned in X-Next-Cursor by the previous page
+    try:
+        last_id = decode_cursor(after_id) if after_id else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    # ids=1&ids=2... restricts the listing to those students, fetched with one IN query
+    if ids and len(ids) > STUDENT_IDS_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {STUDENT_IDS_MAX} ids per request"
+        )
+
+    students = get_students(db, after_id=last_id, limit=limit, student_ids=ids)
+    if len(students) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(students[-1].student_id)
+
+    return [student_to_dict(student) for student in students]
 
 @app.delete("/students/{student_id}", tags=["Students"])
-def delete_student(student_id: int, db: Session = Depends(get_db)):
+def remove_student(student_id: int, db: Session = Depends(get_db)):
     if not delete_student(db, student_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -110,6 +250,11 @@ def delete_student(student_id: int, db: Session = Depends(get_db)):
 
 @app.get("/students/latest/", response_model=StudentBase)
 def read_latest_student(db: Session = Depends(get_db)):
+    # Read-through cache; crud invalidates the entry when students are created or deleted
+    cached = student_cache.get(LATEST_STUDENT_KEY)
+    if cached is not None:
+        return cached
+
     student = get_latest_student(db)
     if not student:
         raise HTTPException(
@@ -117,42 +262,92 @@ def read_latest_student(db: Session = Depends(get_db)):
             detail="No students found"
         )
 
-    # Get the exams and test preparation status
-    exams = [{"math_score": exam.math_score, "reading_score": exam.reading_score, "writing_score": exam.writing_score} for exam in student.exams]
-    test_preparation_status = student.test_preparation.status if student.test_preparation else None
+    latest = student_to_dict(student)
+    student_cache.set(LATEST_STUDENT_KEY, latest)
+    return latest
+# Prediction endpoints
+@app.post("/predict", response_model=PredictResponse, tags=["Predictions"])
+async def predict_score(request: PredictRequest):
+    if batcher is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Prediction model is not loaded"
+        )
+    try:
+        prediction, batch_size = await batcher.submit(request.to_student_record())
+    except Exception as e:
+        logger.error(f"Error predicting: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Prediction failed: {str(e)}"
+        )
+    return {"prediction": prediction, "batch_size": batch_size}
+
+@app.post("/predictions/bulk", response_model=BulkPredictionResponse, tags=["Predictions"])
+def bulk_create_predictions(
+    records: List[Dict[str, Any]] = Body(...),
+    upsert: bool = False,
+    db: Session = Depends(get_db)
+):
+    # upsert=true keeps one prediction per (student_id, model_version): the latest replaces the stored one
+    if len(records) > BULK_MAX_RECORDS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_RECORDS} records per request"
+        )
 
+    to_insert, statuses, errors = plan_predictions_bulk(db, records, upsert)
+
+    try:
+        create_predictions_bulk(db, [prediction for _, prediction in to_insert], upsert=upsert)
+    except UnsupportedDialectError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=str(e)
+        )
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error bulk creating predictions: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid request data: {str(e)}"
+        )
+
+    return build_bulk_prediction_response(len(records), to_insert, statuses, errors)
 
-    # Return the student data with additional fields
-    return {
-        "student_id": student.student_id,
-        "gender": student.gender,
-        "race_ethnicity": student.race_ethnicity,
-        "parental_level_of_education": student.parental_level_of_education,
-        "lunch": student.lunch,
-        "created_at": student.created_at,
-        "exams": exams,
-        "test_preparation": test_preparation_status
-    }
-# Prediction endpoints
 @app.post("/predictions/", response_model=Prediction, tags=["Predictions"])
 def create_prediction(
     prediction: PredictionCreate, 
+    upsert: bool = False,
     db: Session = Depends(get_db)
 ):
     try:
+        # Replace the stored prediction of the same student and model version
+        if upsert and prediction.model_version is not None:
+            return upsert_prediction(db, prediction)
+
         # Create and save the prediction directly
         db_prediction = models.Prediction(
             student_id=prediction.student_id,
             prediction=prediction.prediction,
-            prediction_date=datetime.utcnow()
+            prediction_date=datetime.utcnow(),
+            model_version=prediction.model_version
         )
         
         db.add(db_prediction)
         db.commit()
+        student_cache.invalidate(student_key(prediction.student_id))
         db.refresh(db_prediction)
         
         return db_prediction
         
+    except UnsupportedDialectError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=str(e)
+        )
     except Exception as e:
         db.rollback()
         logger.error(f"Error creating prediction: {str(e)}")
@@ -1,7 +1,29 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Float, DateTime, CheckConstraint  # Added CheckConstraint
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Float, DateTime, CheckConstraint, Index  # Added CheckConstraint
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.sql import func
+from sqlalchemy.sql.expression import FunctionElement
 from sqlalchemy.orm import relationship
 from database import Base
+
+class precise_now(FunctionElement):
+    """CURRENT_TIMESTAMP, with sub-second precision on MySQL and SQLite (whose defaults have whole seconds)"""
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+@compiles(precise_now)
+def _compile_precise_now(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+@compiles(precise_now, "mysql")
+def _compile_precise_now_mysql(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP(6)"
+
+@compiles(precise_now, "sqlite")
+def _compile_precise_now_sqlite(element, compiler, **kw):
+    # SQLite compares datetimes as text, so use SQLAlchemy's storage format (microseconds, milliseconds precise)
+    return "STRFTIME('%Y-%m-%d %H:%M:%f000', 'now')"
+
 class Student(Base):
     __tablename__ = "students"
     
@@ -15,6 +37,20 @@ class Student(Base):
     ), nullable=False)
     lunch = Column(Enum('standard', 'free/reduced', name='lunch_enum'), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Microsecond precision, so changes within the same second keep their order in the change feed
+    updated_at = Column(
+        DateTime(timezone=True).with_variant(mysql.TIMESTAMP(fsp=6), "mysql"),
+        server_default=precise_now(), onupdate=precise_now(), nullable=False
+    )
+    # Random key shared by the rows of one bulk INSERT, used to read their ids back when the
+    # database can neither return them nor guarantee a contiguous range (crud._insert_student_rows)
+    insert_batch = Column(String(32), nullable=True)
+
+    # Change feed order: (updated_at, student_id) is the keyset of GET /students/changes
+    __table_args__ = (
+        Index("ix_students_updated_at_student_id", "updated_at", "student_id"),
+        Index("ix_students_insert_batch", "insert_batch"),
+    )
 
     test_preparation = relationship("TestPreparation", back_populates="student", uselist=False, cascade="all, delete")
     exams = relationship("Exam", back_populates="student", cascade="all, delete")
@@ -47,5 +83,12 @@ class Prediction(Base):
     student_id = Column(Integer, ForeignKey("students.student_id"))
     prediction = Column(Float)
     prediction_date = Column(DateTime(timezone=True), server_default=func.now())
+    # Version of the model that produced the prediction; NULL for unversioned predictions
+    model_version = Column(String(64), nullable=True)
+
+    # At most one prediction per student and model version (upserted by POST /predictions/bulk)
+    __table_args__ = (
+        Index("ux_predictions_student_id_model_version", "student_id", "model_version", unique=True),
+    )
     
     student = relationship("Student", back_populates="predictions")
\ No newline at end of file
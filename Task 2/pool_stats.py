@@ -0,0 +1,103 @@
+from sqlalchemy import exc
+import threading
+import time
+
+# Upper bounds in milliseconds of the checkout latency histogram buckets
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, float("inf"))
+
+class PoolStats:
+    """Thread-safe counters for connection checkouts from one engine's pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.errors = 0
+            self.waiting = 0
+            self.max_waiting = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+
+    def start_wait(self):
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def finish_wait(self, seconds: float, outcome: str = "ok"):
+        """Record one checkout attempt; outcome is one of ok, timeout or error"""
+        with self._lock:
+            self.waiting -= 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if outcome == "timeout":
+                self.timeouts += 1
+                return
+            if outcome == "error":
+                self.errors += 1
+                return
+            self.checkouts += 1
+            elapsed_ms = seconds * 1000
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    self.buckets[i] += 1
+                    break
+
+    def snapshot(self, pool) -> dict:
+        """Live pool state plus the checkout counters recorded so far"""
+        with self._lock:
+            attempts = self.checkouts + self.timeouts + self.errors
+            stats = {
+                "pool_class": type(pool).__name__,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "total_wait_ms": round(self.total_wait * 1000, 3),
+                "avg_wait_ms": round(self.total_wait * 1000 / attempts, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "checkout_latency_ms": {
+                    ("+Inf" if bound == float("inf") else str(bound)): count
+                    for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)
+                },
+            }
+
+        # QueuePool and its async adaptation expose live sizing; other pools may not
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, name, None)
+            if callable(method):
+                stats[name] = method()
+        timeout = getattr(pool, "timeout", None)
+        if callable(timeout):
+            stats["timeout_s"] = timeout()
+        return stats
+
+def instrumented(pool_class, stats: PoolStats):
+    """Subclass `pool_class` so every checkout is timed into `stats`.
+
+    The stats object is bound to the class rather than the instance because
+    SQLAlchemy builds a fresh pool of the same class on engine.dispose().
+    """
+    class InstrumentedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            stats.start_wait()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                stats.finish_wait(time.perf_counter() - start, "timeout")
+                raise
+            except Exception:
+                stats.finish_wait(time.perf_counter() - start, "error")
+                raise
+            stats.finish_wait(time.perf_counter() - start)
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    InstrumentedPool.stats = stats
+    return InstrumentedPool
@@ -1,8 +1,8 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from enum import Enum
 from typing import Optional
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Any, Dict, Tuple, Type
 class GenderEnum(str, Enum):
     male = "male"
     female = "female"
@@ -30,6 +30,10 @@ class PrepStatusEnum(str, Enum):
     completed = "completed"
     none = "none"
 
+class ExportFormatEnum(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
 class ExamBase(BaseModel):
     math_score: int = Field(..., ge=0, le=100)
     reading_score: int = Field(..., ge=0, le=100)
@@ -57,24 +61,124 @@ class StudentCreate(StudentBase):
 class Student(StudentBase):
     student_id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
     exams: List[ExamBase] = []
     test_preparation: Optional[PrepStatusEnum] = None
 
     class Config:
         from_attributes = True
 
+class StudentChanges(BaseModel):
+    items: List[Student]
+    next_watermark: Optional[str] = None
+    has_more: bool
+
+class BulkStudentResult(BaseModel):
+    index: int
+    student_id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkStudentResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkStudentResult]
+
+class PredictRequest(BaseModel):
+    gender: GenderEnum
+    race_ethnicity: RaceEthnicityEnum
+    parental_level_of_education: EducationEnum
+    lunch: LunchEnum
+    test_preparation_course: PrepStatusEnum
+    math_score: int = Field(..., ge=0, le=100)
+    reading_score: int = Field(..., ge=0, le=100)
+    writing_score: int = Field(..., ge=0, le=100)
+
+    def to_student_record(self) -> Dict[str, Any]:
+        """Shape the request like a student record from the API, as the predictor expects"""
+        return {
+            "gender": self.gender.value,
+            "race_ethnicity": self.race_ethnicity.value,
+            "parental_level_of_education": self.parental_level_of_education.value,
+            "lunch": self.lunch.value,
+            "test_preparation": self.test_preparation_course.value,
+            "exams": [{
+                "math_score": self.math_score,
+                "reading_score": self.reading_score,
+                "writing_score": self.writing_score
+            }]
+        }
+
+class PredictResponse(BaseModel):
+    prediction: float
+    batch_size: int
+
 class PredictionBase(BaseModel):
     student_id: int
     prediction: float
+    model_version: Optional[str] = Field(None, max_length=64)
 
 class PredictionCreate(BaseModel):
     student_id: int
     prediction: float
     prediction_date: datetime
+    model_version: Optional[str] = Field(None, max_length=64)
 
 class Prediction(PredictionBase):
     id: int
     prediction_date: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class BulkPredictionResult(BaseModel):
+    index: int
+    # "created", "updated" (upsert replaced a stored prediction), "superseded"
+    # (a later item in the same request has the same student and model version) or "error"
+    status: str
+    error: Optional[str] = None
+
+class BulkPredictionResponse(BaseModel):
+    created: int
+    updated: int = 0
+    failed: int
+    results: List[BulkPredictionResult]
+
+def format_validation_error(error: ValidationError) -> str:
+    """Flatten a pydantic ValidationError into a single line per field"""
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+def validate_records(records: List[Dict[str, Any]], model: Type[BaseModel]) -> Tuple[List[int], List[BaseModel], Dict[int, str]]:
+    """Validate each raw record on its own so one bad record doesn't fail a whole batch.
+
+    Returns:
+        The indexes of the valid records, the validated models in the same order,
+        and an error message for every invalid index
+    """
+    valid_indexes = []
+    valid_items = []
+    errors = {}
+    for index, record in enumerate(records):
+        try:
+            valid_items.append(model.model_validate(record))
+            valid_indexes.append(index)
+        except ValidationError as e:
+            errors[index] = format_validation_error(e)
+    return valid_indexes, valid_items, errors
+
+def build_bulk_student_response(total: int, valid_indexes: List[int], student_ids: List[int], errors: Dict[int, str]) -> BulkStudentResponse:
+    results = [BulkStudentResult(index=index, error=errors.get(index)) for index in range(total)]
+    for index, student_id in zip(valid_indexes, student_ids):
+        results[index].student_id = student_id
+    return BulkStudentResponse(created=len(student_ids), failed=total - len(student_ids), results=results)
+
+def build_bulk_prediction_response(total: int, to_insert: List[Tuple[int, PredictionBase]], statuses: Dict[int, str],
+                                   errors: Dict[int, str]) -> BulkPredictionResponse:
+    results = [
+        BulkPredictionResult(index=index, status="error", error=errors[index]) if index in errors
+        else BulkPredictionResult(index=index, status=statuses.get(index, "created"))
+        for index in range(total)
+    ]
+    updated = sum(item_status == "updated" for item_status in statuses.values())
+    return BulkPredictionResponse(created=len(to_insert) - updated, updated=updated, failed=len(errors), results=results)
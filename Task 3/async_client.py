@@ -0,0 +1,115 @@
+"""Asyncio client that saves predictions concurrently.
+
+One httpx.AsyncClient keeps a pool of keep-alive connections to the API. A
+semaphore bounds the requests in flight, and it is released while a request
+sleeps before a retry, so one slow or failing prediction never holds up the
+others. Every HTTP attempt's latency is recorded for reporting.
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional, Tuple
+
+import httpx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Requests in flight at once (also the connection pool size)
+SAVE_CONCURRENCY = 32
+MAX_RETRIES = 3
+# Backoff before retry n is uniform in [0, min(BACKOFF_CAP, BACKOFF_BASE * 2**n)] seconds
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 10.0
+
+class SaveResult(NamedTuple):
+    student_id: int
+    ok: bool
+    attempts: int
+    error: Optional[str]
+
+class AsyncPredictionClient:
+    def __init__(self, base_url: str, concurrency: int = SAVE_CONCURRENCY, max_retries: int = MAX_RETRIES,
+                 timeout: httpx.Timeout = httpx.Timeout(10.0, connect=3.05)):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.latencies = []  # seconds, one per HTTP attempt
+        self._client = None
+        self._semaphore = None
+
+    async def __aenter__(self) -> "AsyncPredictionClient":
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            headers={"Content-Type": "application/json"},
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+
+    async def save_prediction(self, student_id: int, prediction: float,
+                              model_version: Optional[str] = None) -> SaveResult:
+        """POST one prediction, retrying 429s, 5xxs and network errors with jittered backoff"""
+        payload = {
+            'student_id': int(student_id),
+            'prediction': float(prediction),
+            'prediction_date': datetime.now(timezone.utc).isoformat(),
+            'model_version': model_version
+        }
+        last_error = None
+        for attempt in range(self.max_retries):
+            async with self._semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await self._client.post(
+                        "/predictions/", json=payload,
+                        # Versioned predictions replace an earlier one for the same student and model
+                        params={"upsert": "true"} if model_version is not None else None
+                    )
+                except httpx.HTTPError as e:
+                    response = None
+                    last_error = f"Request failed: {str(e)}"
+                self.latencies.append(time.perf_counter() - start)
+
+            if response is not None:
+                if response.status_code in (200, 201):
+                    return SaveResult(student_id, True, attempt + 1, None)
+                last_error = f"HTTP {response.status_code}: {response.text[:500]}"
+                # Don't retry on client errors (4xx) except 429 (Too Many Requests)
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    break
+            logger.warning(f"Saving prediction for student {student_id} failed (attempt {attempt + 1}): {last_error}")
+
+            if attempt < self.max_retries - 1:
+                # Sleep outside the semaphore so other saves keep the connections busy
+                await asyncio.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+
+        logger.error(f"Failed to save prediction for student {student_id}: {last_error}")
+        return SaveResult(student_id, False, attempt + 1, last_error)
+
+    async def save_predictions(self, predictions: List[Tuple[int, float]],
+                               model_version: Optional[str] = None) -> List[SaveResult]:
+        """Save (student_id, prediction) pairs concurrently; results are in input order"""
+        return await asyncio.gather(*(
+            self.save_prediction(student_id, prediction, model_version) for student_id, prediction in predictions
+        ))
+
+    def latency_summary(self) -> dict:
+        """Request count and latency percentiles (ms) over every attempt so far"""
+        if not self.latencies:
+            return {"requests": 0}
+        p50, p95, p99 = np.percentile(np.array(self.latencies) * 1000, [50, 95, 99])
+        return {
+            "requests": len(self.latencies),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(max(self.latencies) * 1000, 2),
+        }
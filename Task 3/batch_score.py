@@ -0,0 +1,206 @@
+"""Offline batch scoring of CSV extracts in the StudentsPerformance.csv format.
+
+The input is read in fixed-size chunks and the chunks are scored by a pool of
+worker processes, each loading the model artifacts once. Results are written
+in input order to CSV or Parquet, with a `predicted_score` column appended to
+the input columns. At most `workers * CHUNKS_PER_WORKER` chunks are in flight,
+so memory stays bounded by the chunk size however large the input is.
+
+The CSV columns are the model's input columns, so rows go straight to the
+encoder without the API record normalization.
+
+Usage:
+    python batch_score.py StudentsPerformance.csv scored.csv
+    python batch_score.py extract.csv scored.parquet --chunk-size 50000 --workers 8
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import predict
+from pipeline_logging import configure_logging, LOG_LEVEL
+
+logger = logging.getLogger(__name__)
+
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "10000"))
+# Chunks queued per worker; keeps every worker busy while the writer catches up
+CHUNKS_PER_WORKER = 2
+PREDICTION_COLUMN = "predicted_score"
+
+MODEL_COLUMNS = predict.CATEGORICAL_COLUMNS + predict.NUMERICAL_COLUMNS
+# Missing values get the same defaults as predict's feature_row
+FEATURE_DEFAULTS = {
+    'gender': 'unknown',
+    'race/ethnicity': 'unknown',
+    'parental level of education': 'unknown',
+    'lunch': 'standard',
+    'test preparation course': 'none',
+    'math score': 0.0,
+    'reading score': 0.0,
+    'writing score': 0.0
+}
+COLUMN_DTYPES = {
+    **{column: str for column in predict.CATEGORICAL_COLUMNS},
+    **{column: np.float64 for column in predict.NUMERICAL_COLUMNS}
+}
+
+# Set in each worker process by init_worker
+_predictor = None
+
+def init_worker(engine: str, log_level: str):
+    """Load the model artifacts once per worker process"""
+    global _predictor
+    # Workers log to the console only; the parent owns the log file
+    configure_logging(level=log_level, log_file=None)
+    _predictor = predict.NeuralNetworkPredictor(engine=engine)
+
+def score_chunk(features: pd.DataFrame) -> np.ndarray:
+    """Predict one chunk of model input columns in a worker"""
+    return _predictor.predict_rows(features.to_dict("records"))
+
+def read_chunks(path: str, chunk_size: int):
+    """Yield DataFrames of `chunk_size` rows with the model columns typed and defaulted"""
+    header = pd.read_csv(path, nrows=0).columns
+    missing = [column for column in MODEL_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=COLUMN_DTYPES):
+        chunk[MODEL_COLUMNS] = chunk[MODEL_COLUMNS].fillna(FEATURE_DEFAULTS)
+        yield chunk
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file, written under a temporary name until closed"""
+
+    def __init__(self, path: str, output_format: str):
+        self.path = path
+        self.output_format = output_format
+        self.tmp_path = f"{path}.tmp"
+        self._file = None
+        self._parquet = None
+
+    def write(self, chunk: pd.DataFrame):
+        if self.output_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._parquet is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                self._parquet = pq.ParquetWriter(self.tmp_path, table.schema)
+            else:
+                # Later chunks must match the first chunk's schema (e.g. an all-empty text column)
+                table = pa.Table.from_pandas(chunk, schema=self._parquet.schema, preserve_index=False)
+            self._parquet.write_table(table)
+        else:
+            header = self._file is None
+            if header:
+                self._file = open(self.tmp_path, "w", newline="")
+            chunk.to_csv(self._file, header=header, index=False)
+
+    def close(self, commit: bool = True):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._file is not None:
+            self._file.close()
+        if not os.path.exists(self.tmp_path):
+            return
+        if commit:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+
+def score_file(input_path: str, output_path: str, output_format: str, chunk_size: int = BATCH_CHUNK_SIZE,
+               workers: int = None, engine: str = predict.INFERENCE_ENGINE, log_level: str = LOG_LEVEL) -> int:
+    """Score every row of `input_path` into `output_path`; returns the number of rows scored"""
+    workers = workers or os.cpu_count() or 1
+    writer = ChunkWriter(output_path, output_format)
+    scored = 0
+    start = time.perf_counter()
+    # spawn, not fork: TensorFlow and the BLAS thread pools are not fork-safe
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(engine, log_level)
+    ) as pool:
+        in_flight = deque()  # (chunk, future) in input order
+
+        def write_oldest():
+            nonlocal scored
+            chunk, future = in_flight.popleft()
+            chunk[PREDICTION_COLUMN] = future.result()
+            writer.write(chunk)
+            scored += len(chunk)
+            elapsed = time.perf_counter() - start
+            logger.info(f"Scored {scored} rows ({scored / elapsed:.0f} rows/s)")
+
+        try:
+            for chunk in read_chunks(input_path, chunk_size):
+                in_flight.append((chunk, pool.submit(score_chunk, chunk[MODEL_COLUMNS])))
+                if len(in_flight) >= workers * CHUNKS_PER_WORKER:
+                    write_oldest()
+            while in_flight:
+                write_oldest()
+        except BaseException:
+            for _, future in in_flight:
+                future.cancel()
+            writer.close(commit=False)
+            raise
+    writer.close()
+    return scored
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score a StudentsPerformance-format CSV offline")
+    parser.add_argument("input", help="CSV with the StudentsPerformance.csv columns")
+    parser.add_argument("output", help="Output file; the format follows the extension unless --format is given")
+    parser.add_argument(
+        "--format", choices=["csv", "parquet"],
+        help="Output format (Parquet needs pyarrow)"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=BATCH_CHUNK_SIZE,
+        help="Rows per chunk handed to a worker (BATCH_CHUNK_SIZE)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="Worker processes, each with its own copy of the model (default: one per core)"
+    )
+    parser.add_argument(
+        "--engine", choices=predict.ENGINES, default=predict.INFERENCE_ENGINE,
+        help="Inference engine, as in predict.py"
+    )
+    parser.add_argument(
+        "--log-level", default=LOG_LEVEL, type=str.upper,
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"]
+    )
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    configure_logging(level=args.log_level)
+    output_format = args.format or ("parquet" if args.output.endswith((".parquet", ".pq")) else "csv")
+
+    # One worker per core already; keep each worker's math libraries single-threaded.
+    # Workers are spawned, so they pick these up before importing NumPy or TensorFlow.
+    for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                     "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS"):
+        os.environ.setdefault(variable, "1")
+
+    start = time.perf_counter()
+    scored = score_file(args.input, args.output, output_format, args.chunk_size, args.workers,
+                        args.engine, args.log_level)
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Wrote {scored} predictions to {args.output} in {elapsed:.2f} s "
+        f"({scored / elapsed:.0f} rows/s, {args.workers} workers)"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""Benchmarks for the prediction pipeline.
+
+The save benchmarks run against a local stand-in for POST /predictions/ that
+answers after a fixed delay (and optionally fails a share of requests with
+503), so the clients can be compared without a database.
+
+The source benchmark scores every unscored student end to end, once through
+the real API (served by uvicorn in this process) and once straight from the
+database, both on a throwaway SQLite database. It needs the trained model
+artifacts.
+
+The logging benchmark measures the per-row cost of the hot-path log calls:
+the old setup (f-strings, a FileHandler written on the scoring thread) against
+pipeline_logging's queue with lazy, sampled records. Both make the same calls
+at the same levels, so only formatting, the handler and sampling differ.
+
+The engine benchmark scores StudentsPerformance.csv with each inference
+engine. For each one it reports accuracy against the true average score and
+batch and single-row speed. Use it to choose between the MLP and the
+closed-form linear model.
+
+Usage:
+    python benchmark.py saves --predictions 2000 --latency-ms 20 --concurrency 32
+    python benchmark.py sources --students 20000
+    python benchmark.py logging --rows 20000
+    python benchmark.py engines --engines bundle linear keras
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import socket
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import QueueListener
+
+import numpy as np
+
+import predict
+from async_client import AsyncPredictionClient
+from pipeline_logging import JsonFormatter, SAMPLED, create_queue_handler
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    error_rate = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            self.reply(503, {"detail": "stand-in failure"})
+        else:
+            self.reply(201, {"id": 1})
+
+    def reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stand_in(latency_ms: float, error_rate: float) -> ThreadingHTTPServer:
+    StandInHandler.latency = latency_ms / 1000
+    StandInHandler.error_rate = error_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def summarize(name: str, latencies: list, elapsed: float, saved: int):
+    latencies_ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    print(
+        f"{name:<6} {saved / elapsed:>10.0f} saves/s   "
+        f"p50 {p50:7.2f} ms   p95 {p95:7.2f} ms   p99 {p99:7.2f} ms   ({saved} saved in {elapsed:.2f} s)"
+    )
+
+def bench_sync(predictions: list):
+    client = predict.PredictionClient()
+    latencies = []
+    saved = 0
+    start = time.perf_counter()
+    for student_id, prediction in predictions:
+        request_start = time.perf_counter()
+        saved += client.save_prediction(student_id, prediction)
+        latencies.append(time.perf_counter() - request_start)
+    return latencies, time.perf_counter() - start, saved
+
+async def bench_async(base_url: str, predictions: list, concurrency: int):
+    async with AsyncPredictionClient(base_url, concurrency=concurrency) as client:
+        start = time.perf_counter()
+        results = await client.save_predictions(predictions)
+        elapsed = time.perf_counter() - start
+    return client.latencies, elapsed, sum(result.ok for result in results)
+
+def bench_saves(args):
+    server = start_stand_in(args.latency_ms, args.error_rate)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    # PredictionClient reads the module-level API_BASE_URL on every call
+    predict.API_BASE_URL = base_url
+    print(f"Stand-in API at {base_url}: {args.latency_ms} ms per request, {args.error_rate:.0%} errors")
+
+    predictions = [(i + 1, random.uniform(0, 100)) for i in range(args.predictions)]
+    summarize("sync", *bench_sync(predictions[:args.sync_predictions]))
+    summarize("async", *asyncio.run(bench_async(base_url, predictions, args.concurrency)))
+    server.shutdown()
+
+def seed_students(count: int):
+    """Recreate the scratch schema and insert `count` random students through the API's bulk path"""
+    import crud
+    import schemas
+    from database import SessionLocal, engine
+    from models import Base
+
+    students = [schemas.StudentCreate(
+        student_id=0,
+        created_at="2025-01-01T00:00:00",
+        gender=random.choice(list(schemas.GenderEnum)),
+        race_ethnicity=random.choice(list(schemas.RaceEthnicityEnum)),
+        parental_level_of_education=random.choice(list(schemas.EducationEnum)),
+        lunch=random.choice(list(schemas.LunchEnum)),
+        test_preparation_course=random.choice(list(schemas.PrepStatusEnum)),
+        math_score=random.randint(0, 100),
+        reading_score=random.randint(0, 100),
+        writing_score=random.randint(0, 100)
+    ) for _ in range(count)]
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        crud.create_students_bulk(db, students)
+    finally:
+        db.close()
+
+def clear_predictions():
+    from database import engine
+    from models import Prediction
+    with engine.begin() as connection:
+        connection.execute(Prediction.__table__.delete())
+
+def start_api(app):
+    """Serve `app` with uvicorn on a free local port from a background thread"""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+def timed_run(name: str, predictor, client, batches):
+    predictor.prediction_cache.clear()
+    start = time.perf_counter()
+    scored, saved = predict.score_batches(client, predictor, batches)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<6} {scored / elapsed:>10.0f} rows/s   {scored} scored, {saved} saved in {elapsed:.2f} s")
+
+def bench_sources(args):
+    # Always a scratch database: seeding drops every table
+    db_path = os.path.join(tempfile.mkdtemp(prefix="predict_bench_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    # The API under test only serves CRUD; scoring happens in this process
+    os.environ["INFERENCE_ENABLED"] = "false"
+
+    from direct_db import DatabaseStore  # puts Task 2 on sys.path
+    import main as api
+
+    seed_students(args.students)
+    print(f"Seeded {args.students} students into {db_path}")
+
+    server, base_url = start_api(api.app)
+    predict.API_BASE_URL = base_url
+    client = predict.PredictionClient()
+    predictor = predict.NeuralNetworkPredictor(client)
+
+    timed_run("api", predictor, client, client.iter_unscored_pages())
+    clear_predictions()
+    store = DatabaseStore()
+    timed_run("db", predictor, store, store.iter_unscored_pages())
+    server.should_exit = True
+
+SAMPLE_STUDENT = {
+    'student_id': 1,
+    'gender': 'female',
+    'race_ethnicity': 'group B',
+    'parental_level_of_education': "bachelor's degree",
+    'lunch': 'standard',
+    'test_preparation': {'status': 'none'},
+    'exams': {'math_score': 72, 'reading_score': 72, 'writing_score': 74}
+}
+
+def log_rows_eager(logger: logging.Logger, rows: int):
+    """The per-row calls predict.py used to make: every message built up front"""
+    for student_id in range(rows):
+        logger.info(f"Processing student ID: {student_id}")
+        logger.debug(f"Raw student record: {SAMPLE_STUDENT}")
+        logger.debug(f"Normalized data: {SAMPLE_STUDENT}")
+        logger.info(f"Prediction result: {random.random() * 100:.2f}")
+
+def log_rows_lazy(logger: logging.Logger, rows: int):
+    """The same calls at the same levels, with %-arguments and the debug detail marked for sampling"""
+    for student_id in range(rows):
+        logger.info("Processing student ID: %s", student_id)
+        logger.debug("Raw student record: %s", SAMPLE_STUDENT, extra=SAMPLED)
+        logger.debug("Normalized data: %s", SAMPLE_STUDENT, extra=SAMPLED)
+        logger.info("Prediction result: %.2f", random.random() * 100)
+
+def bench_logging(args):
+    log_dir = tempfile.mkdtemp(prefix="predict_log_bench_")
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def run(name: str, level: int, log_rows, queued: bool):
+        logger = logging.getLogger(f"bench.{name}")
+        logger.propagate = False
+        logger.setLevel(level)
+        file_handler = logging.FileHandler(os.path.join(log_dir, f"{name}.log"))
+        listener = None
+        if queued:
+            file_handler.setFormatter(JsonFormatter())
+            records = queue.SimpleQueue()
+            handler = create_queue_handler(records, args.sample_rate)
+            listener = QueueListener(records, file_handler)
+            listener.start()
+        else:
+            file_handler.setFormatter(formatter)
+            handler = file_handler
+        logger.handlers = [handler]
+
+        start = time.perf_counter()
+        log_rows(logger, args.rows)
+        elapsed = time.perf_counter() - start
+        if listener is not None:
+            listener.stop()
+        file_handler.close()
+        size = os.path.getsize(file_handler.baseFilename) / 1024
+        print(f"{name:<12} {elapsed / args.rows * 1e6:>8.2f} us/row   {size:>10.0f} KB logged")
+
+    print(f"{args.rows} rows, per-row debug events sampled at {args.sample_rate:.1%}; logs in {log_dir}")
+    run("eager-debug", logging.DEBUG, log_rows_eager, queued=False)
+    run("eager-info", logging.INFO, log_rows_eager, queued=False)
+    run("lazy-debug", logging.DEBUG, log_rows_lazy, queued=True)
+    run("lazy-info", logging.INFO, log_rows_lazy, queued=True)
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "StudentsPerformance.csv")
+
+def bench_engines(args):
+    import pandas as pd
+
+    df = pd.read_csv(args.data)
+    rows = df[predict.CATEGORICAL_COLUMNS + predict.NUMERICAL_COLUMNS].to_dict("records")
+    for row in rows:
+        for column in predict.NUMERICAL_COLUMNS:
+            row[column] = float(row[column])
+    # The model's target, as in models/train_model.load_and_preprocess_data
+    target = df[predict.NUMERICAL_COLUMNS].mean(axis=1).to_numpy()
+    print(f"{len(rows)} rows from {args.data}")
+
+    for engine in args.engines:
+        try:
+            predictor = predict.NeuralNetworkPredictor(engine=engine)
+        except Exception as e:
+            print(f"{engine:<8} skipped: {str(e)}")
+            continue
+
+        # Straight through the encoder and model; the prediction cache would hide the engine's cost
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            predictions = predictor.predict_batch(predictor.encode_feature_rows(rows))
+        batch = (time.perf_counter() - start) / args.repeat
+
+        features = predictor.encode_feature_rows(rows[:1])
+        start = time.perf_counter()
+        for _ in range(args.single_row_repeat):
+            predictor.model.predict_on_batch(features)
+        single_row = (time.perf_counter() - start) / args.single_row_repeat
+
+        errors = predictions - target
+        print(
+            f"{engine:<8} MAE {np.mean(np.abs(errors)):8.4f}   RMSE {np.sqrt(np.mean(errors ** 2)):8.4f}   "
+            f"max {np.max(np.abs(errors)):8.4f}   {len(rows) / batch:>10.0f} rows/s batched   "
+            f"{single_row * 1e6:8.2f} us/row single   (model {predictor.model_version})"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Prediction pipeline benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    saves = subparsers.add_parser("saves", help="Sync vs async prediction saves against a stand-in API")
+    saves.add_argument("--predictions", type=int, default=2000)
+    saves.add_argument("--sync-predictions", type=int, default=500,
+                       help="The sync client is slow; it saves only this many")
+    saves.add_argument("--latency-ms", type=float, default=20)
+    saves.add_argument("--error-rate", type=float, default=0.0)
+    saves.add_argument("--concurrency", type=int, default=32)
+    saves.set_defaults(func=bench_saves)
+
+    sources = subparsers.add_parser("sources", help="End-to-end rows/s reading through the API vs the database")
+    sources.add_argument("--students", type=int, default=20000)
+    sources.set_defaults(func=bench_sources)
+
+    log = subparsers.add_parser("logging", help="Per-row cost of hot-path logging, old setup vs the queued one")
+    log.add_argument("--rows", type=int, default=20000)
+    log.add_argument("--sample-rate", type=float, default=0.01)
+    log.set_defaults(func=bench_logging)
+
+    engines = subparsers.add_parser("engines", help="Accuracy and speed of each inference engine on the dataset")
+    engines.add_argument("--engines", nargs="+", choices=predict.ENGINES[1:], default=["bundle", "linear"])
+    engines.add_argument("--data", default=DATA_PATH)
+    engines.add_argument("--repeat", type=int, default=20)
+    engines.add_argument("--single-row-repeat", type=int, default=2000)
+    engines.set_defaults(func=bench_engines)
+
+    args = parser.parse_args()
+    # predict.py logs every save at INFO/DEBUG; keep the benchmark output readable
+    logging.getLogger().setLevel(logging.ERROR)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
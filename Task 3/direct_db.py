@@ -0,0 +1,132 @@
+"""Direct database access for the prediction pipeline.
+
+Reads and writes go straight through the API's SQLAlchemy models
+(Task 2/models.py) instead of HTTP, for jobs that run next to the database.
+DatabaseStore has PredictionClient's iter_unscored_pages and
+save_predictions_bulk, so the batch scoring loop works with either.
+"""
+import logging
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+
+# The SQLAlchemy models and engine live with the API (Task 2)
+API_DIR = os.getenv(
+    "API_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Task 2")
+)
+if API_DIR not in sys.path:
+    sys.path.append(API_DIR)
+
+from database import SessionLocal
+from models import Student, TestPreparation, Exam, Prediction
+from crud import prediction_upsert
+from stage_timer import timings
+
+logger = logging.getLogger(__name__)
+
+# Students fetched per page
+DIRECT_CHUNK_SIZE = int(os.getenv("DIRECT_CHUNK_SIZE", "5000"))
+# Rows per multi-row INSERT
+DIRECT_INSERT_SIZE = 1000
+
+class DatabaseStore:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def iter_unscored_pages(self, limit: int = DIRECT_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Yield students without a prediction, `limit` students per page.
+
+        Pages are keyset-paginated on student_id. Each page is two queries: the next
+        `limit` unscored ids, then their students, test preparation and exams in one
+        joined SELECT. Both are read in full and the session is closed before the page
+        is yielded, so no cursor is open while the caller saves predictions (SQLite
+        would report "database is locked"). Records have the shape
+        normalize_student_data expects.
+        """
+        scored = select(Prediction.id).where(Prediction.student_id == Student.student_id).exists()
+        last_id = 0
+        while True:
+            with timings.stage("fetch") as stage:
+                with self.session_factory() as db:
+                    ids = db.execute(
+                        select(Student.student_id)
+                        .where(~scored, Student.student_id > last_id)
+                        .order_by(Student.student_id)
+                        .limit(limit)
+                    ).scalars().all()
+                    rows = db.execute(
+                        select(
+                            Student.student_id,
+                            Student.gender,
+                            Student.race_ethnicity,
+                            Student.parental_level_of_education,
+                            Student.lunch,
+                            TestPreparation.status,
+                            Exam.math_score,
+                            Exam.reading_score,
+                            Exam.writing_score
+                        )
+                        .outerjoin(TestPreparation, TestPreparation.student_id == Student.student_id)
+                        .outerjoin(Exam, Exam.student_id == Student.student_id)
+                        .where(Student.student_id.in_(ids))
+                        .order_by(Student.student_id, Exam.exam_id)
+                    ).all() if ids else []
+                stage.rows = len(rows)
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            students = []
+            previous_id = None
+            for row in rows:
+                # Like the API, a student with several exams is scored on the first one
+                if row.student_id == previous_id:
+                    continue
+                previous_id = row.student_id
+                students.append({
+                    'student_id': row.student_id,
+                    'gender': row.gender,
+                    'race_ethnicity': row.race_ethnicity,
+                    'parental_level_of_education': row.parental_level_of_education,
+                    'lunch': row.lunch,
+                    'test_preparation': row.status,
+                    'exams': {
+                        'math_score': row.math_score,
+                        'reading_score': row.reading_score,
+                        'writing_score': row.writing_score
+                    } if row.math_score is not None else {}
+                })
+            yield students
+
+    @timings.timed("save", rows=int)
+    def save_predictions_bulk(self, predictions: List[Tuple[int, float]],
+                              model_version: Optional[str] = None, upsert: bool = False) -> int:
+        """Insert predictions with multi-row INSERTs in one transaction; returns how many were written.
+
+        A failed transaction is rolled back and the error re-raised.
+        """
+        db = self.session_factory()
+        try:
+            if upsert and model_version is not None:
+                statement = prediction_upsert(db)
+            else:
+                statement = insert(Prediction.__table__)
+            for start in range(0, len(predictions), DIRECT_INSERT_SIZE):
+                chunk = predictions[start:start + DIRECT_INSERT_SIZE]
+                db.execute(statement, [{
+                    'student_id': int(student_id),
+                    'prediction': float(prediction),
+                    'model_version': model_version
+                } for student_id, prediction in chunk])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Bulk insert of {len(predictions)} predictions failed: {str(e)}")
+            raise
+        finally:
+            db.close()
+        logger.info(f"Saved {len(predictions)} predictions in bulk")
+        return len(predictions)
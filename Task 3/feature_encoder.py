@@ -0,0 +1,124 @@
+"""Compiled feature encoder for the student performance model.
+
+Replaces the per-call pandas DataFrame + StandardScaler.transform +
+OneHotEncoder.transform + np.concatenate chain with lookup tables taken from
+the fitted preprocessors: the scaler's mean/scale vectors and, for every
+categorical feature, a category -> output column index table. Features are
+written straight into a preallocated float32 matrix.
+
+The arithmetic is the scaler's own ((x - mean) / scale in float64), so the
+output is bit-for-bit equal to the sklearn path cast to float32;
+verify_against_sklearn checks that.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+class CompiledFeatureEncoder:
+    def __init__(self, mean: np.ndarray, scale: np.ndarray, categories: Sequence[Sequence[str]],
+                 numerical_features: Sequence[str], categorical_features: Sequence[str]):
+        self.numerical_features = list(numerical_features)
+        self.categorical_features = list(categorical_features)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.categories = [[str(value) for value in values] for values in categories]
+
+        # Output layout: scaled numerical columns, then one block of one-hot columns per feature
+        self.offsets = []
+        offset = len(self.numerical_features)
+        for values in self.categories:
+            self.offsets.append(offset)
+            offset += len(values)
+        self.n_features = offset
+        self.lookups = [
+            {value: start + i for i, value in enumerate(values)}
+            for start, values in zip(self.offsets, self.categories)
+        ]
+        # Vocabulary indexes for encode_frame
+        self.indexes = [pd.Index(values) for values in self.categories]
+
+    @classmethod
+    def from_sklearn(cls, scaler, encoder, numerical_features: Sequence[str],
+                     categorical_features: Sequence[str]) -> "CompiledFeatureEncoder":
+        """Build the lookup tables from a fitted StandardScaler and OneHotEncoder"""
+        if getattr(encoder, "drop_idx_", None) is not None:
+            raise ValueError("OneHotEncoder with drop is not supported")
+        numerical_features = list(getattr(scaler, "feature_names_in_", numerical_features))
+        categorical_features = list(getattr(encoder, "feature_names_in_", categorical_features))
+        n = len(numerical_features)
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n)
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n)
+        return cls(mean, scale, encoder.categories_, numerical_features, categorical_features)
+
+    def _output(self, n_rows: int, out: Optional[np.ndarray]) -> np.ndarray:
+        if out is None:
+            return np.zeros((n_rows, self.n_features), dtype=np.float32)
+        if out.shape != (n_rows, self.n_features) or out.dtype != np.float32:
+            raise ValueError(f"Output buffer must be float32 of shape {(n_rows, self.n_features)}")
+        out.fill(0)
+        return out
+
+    def encode_rows(self, rows: List[Dict[str, Any]], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Encode rows keyed by training column names; unknown categories encode as all zeros"""
+        out = self._output(len(rows), out)
+        numerical = np.array(
+            [[row[name] for name in self.numerical_features] for row in rows], dtype=np.float64
+        ).reshape(len(rows), len(self.numerical_features))
+        out[:, :len(self.numerical_features)] = (numerical - self.mean) / self.scale
+
+        for i, row in enumerate(rows):
+            for name, lookup in zip(self.categorical_features, self.lookups):
+                column = lookup.get(row[name])
+                if column is not None:
+                    out[i, column] = 1.0
+        return out
+
+    def encode_row(self, row: Dict[str, Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Encode a single row into a (1, n_features) matrix"""
+        return self.encode_rows([row], out)
+
+    def encode_frame(self, df: pd.DataFrame, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Vectorized encoding of a DataFrame with the training column names"""
+        n_rows = len(df)
+        out = self._output(n_rows, out)
+        numerical = df[self.numerical_features].to_numpy(dtype=np.float64)
+        out[:, :len(self.numerical_features)] = (numerical - self.mean) / self.scale
+
+        rows = np.arange(n_rows)
+        for name, index, start in zip(self.categorical_features, self.indexes, self.offsets):
+            # -1 for values outside the vocabulary
+            codes = index.get_indexer(df[name].astype(str))
+            known = codes >= 0
+            out[rows[known], start + codes[known]] = 1.0
+        return out
+
+def sklearn_encode(compiled: CompiledFeatureEncoder, scaler, encoder, df: pd.DataFrame) -> np.ndarray:
+    """The reference sklearn transform the compiled encoder must reproduce"""
+    scaled = scaler.transform(df[compiled.numerical_features])
+    encoded = encoder.transform(df[compiled.categorical_features])
+    if hasattr(encoded, "toarray"):
+        encoded = encoded.toarray()
+    return np.concatenate([scaled, encoded], axis=1)
+
+def probe_rows(compiled: CompiledFeatureEncoder) -> List[Dict[str, Any]]:
+    """Rows covering every category of every feature, an unknown category and the score range"""
+    longest = max(len(values) for values in compiled.categories) + 1
+    rows = []
+    for i in range(max(longest, 101)):
+        row = {name: float((i * (7 + j)) % 101) for j, name in enumerate(compiled.numerical_features)}
+        for name, values in zip(compiled.categorical_features, compiled.categories):
+            row[name] = values[i % len(values)] if i % longest < len(values) else "unknown"
+        rows.append(row)
+    return rows
+
+def verify_against_sklearn(compiled: CompiledFeatureEncoder, scaler, encoder,
+                           rows: Optional[List[Dict[str, Any]]] = None) -> bool:
+    """True if every compiled encoding is bit-for-bit equal to the sklearn one cast to float32"""
+    rows = rows if rows is not None else probe_rows(compiled)
+    df = pd.DataFrame(rows)
+    expected = sklearn_encode(compiled, scaler, encoder, df).astype(np.float32)
+    return (
+        np.array_equal(compiled.encode_rows(rows), expected)
+        and np.array_equal(compiled.encode_frame(df), expected)
+    )
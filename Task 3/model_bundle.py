@@ -0,0 +1,268 @@
+"""Single-file, memory-mappable bundle of everything the predictor needs.
+
+Replaces the .h5 model plus the scaler/encoder/feature_names pickles with one
+versioned file:
+
+    magic (8 bytes) | format version (uint32) | header length (uint64)
+    JSON header, padded to ALIGNMENT
+    arrays, each starting on an ALIGNMENT boundary
+
+The header lists every array's dtype, shape, offset and sha256, plus the
+feature layout and layer activations. Arrays are never copied on load: they
+are read-only views into an mmap of the file, so worker processes share one
+page-cache copy and loading takes the same time whatever the model size.
+Loading checks the header and the feature layout only; the sha256 checksums
+are verified when a bundle is saved, by `inspect`, or with verify=True, since
+hashing reads every page of the file.
+
+Usage:
+    python model_bundle.py build --model-dir ../models/models
+    python model_bundle.py inspect ../models/models/student_performance_nn.bundle
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"SPMBNDL\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+PREAMBLE = struct.Struct("<8sIQ")  # magic, format version, header length
+
+class BundleError(ValueError):
+    """The bundle is corrupt, truncated, from another format version or internally inconsistent"""
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def write_bundle(path: str, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> str:
+    """Write arrays and metadata to `path` atomically; returns the bundle's model version"""
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    for name, array in arrays.items():
+        if array.dtype.hasobject:
+            raise BundleError(f"Array {name} has object dtype and cannot be memory-mapped")
+
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        entries[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+            "nbytes": array.nbytes,
+            "sha256": hashlib.sha256(array.tobytes()).hexdigest(),
+        }
+        offset += array.nbytes
+
+    # The version identifies the contents, so identical retrains get the same version
+    digest = hashlib.sha256()
+    for name in sorted(entries):
+        digest.update(f"{name}:{entries[name]['sha256']};".encode())
+    digest.update(json.dumps(metadata, sort_keys=True).encode())
+    model_version = digest.hexdigest()[:16]
+
+    header = json.dumps({
+        "model_version": model_version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "metadata": metadata,
+        "arrays": entries,
+    }).encode("utf-8")
+    data_start = _aligned(PREAMBLE.size + len(header))
+
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+            f.write(header)
+            for name, array in arrays.items():
+                f.write(b"\0" * (data_start + entries[name]["offset"] - f.tell()))
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return model_version
+
+class ModelBundle:
+    """A loaded bundle: read-only array views into the mapped file plus its header.
+
+    verify=True also checks every array's sha256, which reads the whole file.
+    """
+
+    def __init__(self, path: str, verify: bool = False):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse(verify)
+        except Exception:
+            self.arrays = {}
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A view is still referenced by the traceback; the mapping closes when it is collected
+                pass
+            raise
+
+    def _parse(self, verify: bool):
+        if len(self._mmap) < PREAMBLE.size:
+            raise BundleError(f"{self.path} is too short to be a model bundle")
+        magic, version, header_length = PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise BundleError(f"{self.path} is not a model bundle")
+        if version != FORMAT_VERSION:
+            raise BundleError(f"{self.path} has bundle format {version}, expected {FORMAT_VERSION}")
+
+        try:
+            header = json.loads(self._mmap[PREAMBLE.size:PREAMBLE.size + header_length].decode("utf-8"))
+            self.model_version = header["model_version"]
+            self.created_at = header["created_at"]
+            self.metadata = header["metadata"]
+        except (ValueError, KeyError) as e:
+            raise BundleError(f"{self.path} has an unreadable header: {str(e)}")
+
+        data_start = _aligned(PREAMBLE.size + header_length)
+        self.arrays = {}
+        for name, entry in header["arrays"].items():
+            start = data_start + entry["offset"]
+            if start + entry["nbytes"] > len(self._mmap):
+                raise BundleError(f"{self.path} is truncated: array {name} runs past the end of the file")
+            if verify:
+                actual = hashlib.sha256(memoryview(self._mmap)[start:start + entry["nbytes"]]).hexdigest()
+                if actual != entry["sha256"]:
+                    raise BundleError(f"{self.path} is corrupt: checksum mismatch for array {name}")
+            dtype = np.dtype(entry["dtype"])
+            count = entry["nbytes"] // dtype.itemsize
+            self.arrays[name] = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=start).reshape(entry["shape"])
+        self.validate()
+
+    @property
+    def layers(self) -> List[Tuple[np.ndarray, np.ndarray, str]]:
+        return [
+            (self.arrays[f"kernel_{i}"], self.arrays[f"bias_{i}"], activation)
+            for i, activation in enumerate(self.metadata["activations"])
+        ]
+
+    @property
+    def categories(self) -> List[List[str]]:
+        return [self.arrays[f"categories_{i}"].tolist() for i in range(len(self.metadata["categorical_features"]))]
+
+    def validate(self):
+        """Check that the scaler, vocabularies and network all agree on the feature layout"""
+        numerical = self.metadata["numerical_features"]
+        categorical = self.metadata["categorical_features"]
+        missing = [
+            name for name in ["scaler_mean", "scaler_scale"]
+            + [f"categories_{i}" for i in range(len(categorical))]
+            + [f"{kind}_{i}" for i in range(len(self.metadata["activations"])) for kind in ("kernel", "bias")]
+            if name not in self.arrays
+        ]
+        if missing:
+            raise BundleError(f"{self.path} is missing arrays: {', '.join(missing)}")
+
+        for name in ("scaler_mean", "scaler_scale"):
+            if self.arrays[name].shape != (len(numerical),):
+                raise BundleError(
+                    f"{name} has shape {self.arrays[name].shape}, expected ({len(numerical)},) for {numerical}"
+                )
+        if sorted(self.metadata["feature_names"]) != sorted(numerical + categorical):
+            raise BundleError("feature_names do not match the numerical and categorical features")
+
+        expected = len(numerical) + sum(len(values) for values in self.categories)
+        for i, (kernel, bias, _) in enumerate(self.layers):
+            if kernel.ndim != 2 or kernel.shape[0] != expected:
+                raise BundleError(f"kernel_{i} has shape {kernel.shape}, expected {expected} inputs")
+            if bias.shape != (kernel.shape[1],):
+                raise BundleError(f"bias_{i} has shape {bias.shape}, expected ({kernel.shape[1]},)")
+            expected = kernel.shape[1]
+        if expected != 1:
+            raise BundleError(f"The network has {expected} outputs, expected 1")
+
+    def close(self):
+        # Views must be dropped before the mapping can be closed
+        self.arrays = {}
+        self._mmap.close()
+
+def save_model_bundle(path: str, layers: Sequence[Tuple[np.ndarray, np.ndarray, str]], scaler, encoder,
+                      numerical_features: Sequence[str], categorical_features: Sequence[str],
+                      feature_names: Sequence[str]) -> str:
+    """Bundle Dense layers with a fitted StandardScaler and OneHotEncoder; returns the model version"""
+    arrays = {
+        "scaler_mean": np.asarray(scaler.mean_, dtype=np.float64),
+        "scaler_scale": np.asarray(scaler.scale_, dtype=np.float64),
+    }
+    for i, values in enumerate(encoder.categories_):
+        arrays[f"categories_{i}"] = np.array([str(value) for value in values], dtype=np.str_)
+    for i, (kernel, bias, _) in enumerate(layers):
+        arrays[f"kernel_{i}"] = np.asarray(kernel, dtype=np.float32)
+        arrays[f"bias_{i}"] = np.asarray(bias, dtype=np.float32)
+    metadata = {
+        "numerical_features": list(getattr(scaler, "feature_names_in_", numerical_features)),
+        "categorical_features": list(getattr(encoder, "feature_names_in_", categorical_features)),
+        "feature_names": list(feature_names),
+        "activations": [activation for _, _, activation in layers],
+    }
+    model_version = write_bundle(path, arrays, metadata)
+    # Fail at save time rather than in the first worker that loads it
+    ModelBundle(path, verify=True).close()
+    return model_version
+
+def build(args):
+    import joblib
+    from numpy_engine import NumpyMLP
+
+    model_dir = args.model_dir
+    output = args.output or os.path.join(model_dir, "student_performance_nn.bundle")
+    model_version = save_model_bundle(
+        output,
+        NumpyMLP.load(os.path.join(model_dir, args.weights)).layers,
+        joblib.load(os.path.join(model_dir, "scaler.pkl")),
+        joblib.load(os.path.join(model_dir, "encoder.pkl")),
+        args.numerical_features,
+        args.categorical_features,
+        joblib.load(os.path.join(model_dir, "feature_names.pkl")),
+    )
+    print(f"Wrote {output} (model version {model_version})")
+
+def inspect(args):
+    bundle = ModelBundle(args.path, verify=True)
+    print(f"Model version: {bundle.model_version}")
+    print(f"Created at:    {bundle.created_at}")
+    print(json.dumps(bundle.metadata, indent=2))
+    for name, array in bundle.arrays.items():
+        print(f"  {name:<16} {array.dtype.str:<6} {tuple(array.shape)}")
+    bundle.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Model bundle tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Bundle existing .npz weights and .pkl preprocessors")
+    build_parser.add_argument("--model-dir", required=True)
+    build_parser.add_argument("--output")
+    build_parser.add_argument("--weights", default="student_performance_nn_weights.npz",
+                              help="Weights file in --model-dir, e.g. student_performance_linear.npz")
+    build_parser.add_argument("--numerical-features", nargs="+",
+                              default=['math score', 'reading score', 'writing score'])
+    build_parser.add_argument("--categorical-features", nargs="+",
+                              default=['gender', 'race/ethnicity', 'parental level of education',
+                                       'lunch', 'test preparation course'])
+    build_parser.set_defaults(func=build)
+
+    inspect_parser = subparsers.add_parser("inspect", help="Verify a bundle and print its header")
+    inspect_parser.add_argument("path")
+    inspect_parser.set_defaults(func=inspect)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""NumPy inference engine for the student performance MLP.
+
+The Keras model built by models/train_model.build_model is a stack of Dense
+layers (64-32-16-1, ReLU) with Dropout in between, which is a no-op at
+inference. Its weights are exported once to a plain .npz file and the forward
+pass is run with NumPy matmuls, so serving needs neither TensorFlow nor its
+multi-second import.
+
+The same format holds the closed-form linear model that train_model.py fits
+next to the MLP: one Dense layer with a linear activation.
+
+Usage:
+    python numpy_engine.py export --model student_performance_nn_model.h5 --output student_performance_nn_weights.npz
+    python numpy_engine.py verify --model student_performance_nn_model.h5 --weights student_performance_nn_weights.npz
+"""
+import argparse
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+ACTIVATIONS = {
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "linear": lambda x: x,
+}
+
+class NumpyMLP:
+    """Dense-layer forward pass with the same predict interface as a Keras model"""
+
+    def __init__(self, layers: List[Tuple[np.ndarray, np.ndarray, str]]):
+        for _, _, activation in layers:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {activation}")
+        self.layers = [
+            (np.ascontiguousarray(kernel, dtype=np.float32), np.asarray(bias, dtype=np.float32), activation)
+            for kernel, bias, activation in layers
+        ]
+
+    @property
+    def input_dim(self) -> int:
+        return self.layers[0][0].shape[0]
+
+    @classmethod
+    def from_keras(cls, model) -> "NumpyMLP":
+        """Extract the Dense layers of a Keras model; other layers must be inference no-ops"""
+        layers = []
+        for layer in model.layers:
+            config = layer.get_config()
+            if type(layer).__name__ == "Dense":
+                kernel, bias = layer.get_weights()
+                layers.append((kernel, bias, config["activation"]))
+            elif type(layer).__name__ not in ("Dropout", "InputLayer"):
+                raise ValueError(f"Unsupported layer type: {type(layer).__name__}")
+        return cls(layers)
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyMLP":
+        with np.load(path, allow_pickle=False) as arrays:
+            activations = [str(a) for a in arrays["activations"]]
+            return cls([
+                (arrays[f"kernel_{i}"], arrays[f"bias_{i}"], activation)
+                for i, activation in enumerate(activations)
+            ])
+
+    @classmethod
+    def fit_linear(cls, features: np.ndarray, targets: np.ndarray) -> "NumpyMLP":
+        """Least-squares fit of targets on features, as a single linear Dense layer"""
+        x = np.asarray(features, dtype=np.float64)
+        # Intercept column; one-hot groups make the design rank-deficient, lstsq takes the min-norm solution
+        design = np.hstack([x, np.ones((len(x), 1))])
+        coef, *_ = np.linalg.lstsq(design, np.asarray(targets, dtype=np.float64).reshape(-1), rcond=None)
+        return cls([(coef[:-1].reshape(-1, 1), coef[-1:], "linear")])
+
+    def save(self, path: str):
+        arrays = {"activations": np.array([activation for _, _, activation in self.layers])}
+        for i, (kernel, bias, _) in enumerate(self.layers):
+            arrays[f"kernel_{i}"] = kernel
+            arrays[f"bias_{i}"] = bias
+        np.savez(path, **arrays)
+
+    def predict(self, features: np.ndarray, batch_size: int = None, verbose: int = 0) -> np.ndarray:
+        """Forward pass over a (n, input_dim) matrix; returns (n, 1) like Keras"""
+        x = np.asarray(features, dtype=np.float32)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        for kernel, bias, activation in self.layers:
+            x = x @ kernel
+            x += bias
+            x = ACTIVATIONS[activation](x)
+        return x
+
+    # Keras exposes both; with NumPy there is no per-call setup to skip
+    predict_on_batch = predict
+
+def load_keras_model(path: str):
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.losses import MeanSquaredError
+    return load_model(path, custom_objects={'mse': MeanSquaredError()})
+
+def export(args):
+    NumpyMLP.from_keras(load_keras_model(args.model)).save(args.output)
+    print(f"Wrote {args.output}")
+
+def verify(args):
+    start = time.perf_counter()
+    engine = NumpyMLP.load(args.weights)
+    numpy_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = load_keras_model(args.model)
+    keras_load = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    features = rng.standard_normal((args.samples, engine.input_dim)).astype(np.float32)
+
+    expected = model.predict(features, verbose=0)
+    actual = engine.predict(features)
+    max_diff = float(np.max(np.abs(expected - actual)))
+
+    row = features[:1]
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        model.predict_on_batch(row)
+    keras_row = (time.perf_counter() - start) / args.repeat
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        engine.predict(row)
+    numpy_row = (time.perf_counter() - start) / args.repeat
+
+    print(f"Max abs difference over {args.samples} rows: {max_diff:.3g}")
+    print(f"Load time:       keras {keras_load * 1000:10.1f} ms   numpy {numpy_load * 1000:8.3f} ms")
+    print(f"Single-row call: keras {keras_row * 1e6:10.1f} us   numpy {numpy_row * 1e6:8.1f} us")
+    if not np.allclose(expected, actual, rtol=1e-4, atol=1e-4):
+        raise SystemExit("NumPy engine output does not match the Keras model")
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy inference engine tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Extract Dense weights from a Keras .h5 model")
+    export_parser.add_argument("--model", required=True)
+    export_parser.add_argument("--output", required=True)
+    export_parser.set_defaults(func=export)
+
+    verify_parser = subparsers.add_parser("verify", help="Compare the NumPy engine against the Keras model")
+    verify_parser.add_argument("--model", required=True)
+    verify_parser.add_argument("--weights", required=True)
+    verify_parser.add_argument("--samples", type=int, default=10000)
+    verify_parser.add_argument("--repeat", type=int, default=200)
+    verify_parser.set_defaults(func=verify)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Logging setup for the prediction pipeline.
+
+Records are handed to a QueueHandler; a QueueListener thread does the
+formatting and the console/file I/O, so the scoring loop never waits on disk.
+The file gets one JSON object per line, including any fields passed with
+`extra=`. Per-row debug events are logged with `extra=SAMPLED` and only a
+sample of them (PREDICT_LOG_SAMPLE_RATE) is kept.
+
+Hot-path calls use %-style arguments (logger.debug("row %s", row)) so that
+nothing is formatted unless the level is enabled and the record survives
+sampling.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("PREDICT_LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("PREDICT_LOG_FILE", "prediction_pipeline.log")
+# Share of per-row debug events that are kept
+LOG_SAMPLE_RATE = float(os.getenv("PREDICT_LOG_SAMPLE_RATE", "0.01"))
+
+# Mark a per-row event for sampling: logger.debug("...", value, extra=SAMPLED)
+SAMPLED = {"sampled": True}
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != "sampled":
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keep a `rate` share of records logged with extra=SAMPLED; other records always pass"""
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "sampled", False):
+            return random.random() < self.rate
+        return True
+
+class _LazyQueueHandler(QueueHandler):
+    """QueueHandler that leaves the layout and I/O to the listener thread.
+
+    The stock prepare() runs the full formatter on the calling thread. Here only
+    the message arguments are resolved (so mutable objects are captured as they
+    are now); timestamps, layout, JSON encoding and writes happen in the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks can't cross the queue; render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def create_queue_handler(records: queue.SimpleQueue, sample_rate: float = LOG_SAMPLE_RATE) -> QueueHandler:
+    """Handler that samples SAMPLED records and puts the rest on `records` for a QueueListener"""
+    handler = _LazyQueueHandler(records)
+    handler.addFilter(SamplingFilter(sample_rate))
+    return handler
+
+_listener = None
+
+def configure_logging(level: str = LOG_LEVEL, log_file: str = LOG_FILE,
+                      sample_rate: float = LOG_SAMPLE_RATE) -> QueueListener:
+    """Route the root logger through a queue to the console and a JSON lines file; idempotent"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    handlers = [console]
+    if log_file:
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    records = queue.SimpleQueue()
+    queue_handler = create_queue_handler(records, sample_rate)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.handlers = [queue_handler]
+
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(_listener.stop)
+    return _listener
@@ -3,32 +3,245 @@ import pandas as pd
 import numpy as np
 import joblib
 from datetime import datetime
-from tensorflow.keras.models import load_model
 import logging
-from typing import Optional, Dict, Any, List, Union
-from tensorflow.keras.losses import MeanSquaredError
+from typing import Optional, Dict, Any, List, Union, Iterator, Tuple
 import time
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import random
+import argparse
+import json
+import os
+import hashlib
+import cProfile
+import asyncio
+import signal
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from numpy_engine import NumpyMLP, load_keras_model
+from feature_encoder import CompiledFeatureEncoder, verify_against_sklearn
+from model_bundle import ModelBundle
+from async_client import AsyncPredictionClient, SAVE_CONCURRENCY
+from stage_timer import timings
+from pipeline_logging import configure_logging, LOG_LEVEL, SAMPLED
 
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('prediction_pipeline.log')
-    ]
-)
 logger = logging.getLogger(__name__)
 
 #Configuration
 API_BASE_URL = "http://localhost:8000"
-MODEL_DIR = "C:/Users/HP/Database-Prediction-Pipeline/models/models"
-MODEL_PATH = f"{MODEL_DIR}/student_performance_nn_model.h5"
-SCALER_PATH = f"{MODEL_DIR}/scaler.pkl"
-ENCODER_PATH = f"{MODEL_DIR}/encoder.pkl"
-FEATURE_NAMES_PATH = f"{MODEL_DIR}/feature_names.pkl"
+MODEL_ROOT = os.getenv(
+    "MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models", "models")
+)
+
+def current_model_dir(root: str) -> str:
+    """The version named in root/CURRENT (published by incremental training), else root itself"""
+    try:
+        with open(os.path.join(root, "CURRENT")) as f:
+            return os.path.join(root, "versions", f.read().strip())
+    except FileNotFoundError:
+        return root
+
+def current_stamp(root: str) -> Optional[Tuple[int, int]]:
+    """(inode, mtime) of root/CURRENT, None if absent; changes whenever a version is published or removed"""
+    try:
+        stat = os.stat(os.path.join(root, "CURRENT"))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+def artifact_paths(model_dir: str) -> Dict[str, str]:
+    """Paths of the artifacts in `model_dir`; MODEL_BUNDLE_PATH and LINEAR_BUNDLE_PATH pin the bundles"""
+    return {
+        "model": f"{model_dir}/student_performance_nn_model.h5",
+        "scaler": f"{model_dir}/scaler.pkl",
+        "encoder": f"{model_dir}/encoder.pkl",
+        "feature_names": f"{model_dir}/feature_names.pkl",
+        "numpy_weights": f"{model_dir}/student_performance_nn_weights.npz",
+        "bundle": os.getenv("MODEL_BUNDLE_PATH", f"{model_dir}/student_performance_nn.bundle"),
+        "linear_bundle": os.getenv("LINEAR_BUNDLE_PATH", f"{model_dir}/student_performance_linear.bundle"),
+    }
+
+# Hash every bundle array on load; off by default because it reads the whole file
+BUNDLE_VERIFY = os.getenv("MODEL_BUNDLE_VERIFY", "false").lower() == "true"
+# "keras" runs the .h5 model with TensorFlow; "numpy" runs the exported weights without it;
+# "bundle" memory-maps weights and preprocessing from one file; "linear" is the bundle of the
+# closed-form least-squares model; "auto" picks bundle if present, else keras
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "auto")
+ENGINES = ["auto", "bundle", "keras", "numpy", "linear"]
+# "compiled" encodes features with lookup tables built from the fitted scaler/encoder,
+# "sklearn" calls scaler.transform/encoder.transform on a DataFrame
+FEATURE_ENCODER = os.getenv("FEATURE_ENCODER", "compiled")
+WATERMARK_PATH = os.getenv("PREDICT_WATERMARK_PATH", "prediction_watermark.json")
+CHANGES_PAGE_SIZE = 500
+# Seconds of the change feed re-read behind the last position on every run. updated_at is
+# set at statement time, so a transaction committing up to this long after its statement
+# is still picked up; students already scored at the same updated_at are skipped.
+CHANGES_LAG_SECONDS = float(os.getenv("CHANGES_LAG_SECONDS", "60"))
+# Rows per forward pass when predicting in batches
+PREDICT_BATCH_SIZE = int(os.getenv("PREDICT_BATCH_SIZE", "1024"))
+# Students per page fetched in batch mode (the API caps pages at 1000)
+FETCH_PAGE_SIZE = 1000
+# Student ids per GET /students/?ids= request (the API accepts up to 1000; 500 keeps the URL short)
+IDS_PER_REQUEST = 500
+# Predictions per POST /predictions/bulk request
+BULK_SAVE_SIZE = 1000
+# Distinct inputs remembered by the prediction cache (0 disables it)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "65536"))
+# Exam scores are integers in [0, MAX_SCORE]; other values bypass the prediction cache
+MAX_SCORE = 100
+# Worker mode: seconds between polls for unscored students, doubled while idle up to the maximum
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "5"))
+WORKER_MAX_POLL_INTERVAL = float(os.getenv("WORKER_MAX_POLL_INTERVAL", "60"))
+# Worker mode: bulk save requests allowed in flight before scoring pauses
+WORKER_MAX_IN_FLIGHT = int(os.getenv("WORKER_MAX_IN_FLIGHT", "4"))
+# Worker mode: failed saves after which a student is skipped until the worker restarts
+WORKER_MAX_SAVE_ATTEMPTS = int(os.getenv("WORKER_MAX_SAVE_ATTEMPTS", "3"))
+
+NUMERICAL_COLUMNS = ['math score', 'reading score', 'writing score']
+CATEGORICAL_COLUMNS = ['gender', 'race/ethnicity', 'parental level of education',
+                       'lunch', 'test preparation course']
+
+class WatermarkStore:
+    """Persists the change feed position between runs in a small JSON file.
+
+    The state holds the API's watermark, the updated_at of the last student
+    processed, and the (student_id -> updated_at) pairs processed within the lag
+    window before it.
+    """
+
+    def __init__(self, path: str = WATERMARK_PATH):
+        self.path = path
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (ValueError, OSError) as e:
+            logger.warning(f"Ignoring unreadable watermark file {self.path}: {str(e)}")
+            return {}
+
+    def save(self, watermark: str, updated_at: Optional[str] = None, recent: Optional[Dict[str, str]] = None):
+        # Write to a temp file and rename so a crash never leaves a torn watermark
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "watermark": watermark,
+                "updated_at": updated_at,
+                "recent": recent or {},
+                "saved_at": datetime.now(timezone.utc).isoformat()
+            }, f)
+        os.replace(tmp_path, self.path)
+
+def lag_window_start(updated_at: str, lag: float = CHANGES_LAG_SECONDS) -> str:
+    """ISO timestamp `lag` seconds before `updated_at`, a change feed position to re-read from"""
+    return (datetime.fromisoformat(updated_at) - timedelta(seconds=lag)).isoformat()
+
+def file_version(paths: List[str]) -> str:
+    """Content hash identifying a set of separately stored artifacts"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+class PredictionCache:
+    """LRU cache of predictions keyed on a packed feature key.
+
+    The key packs each categorical's vocabulary index and each integer score into
+    one int (mixed radix), so equal inputs share an entry whatever the string
+    objects or float types they arrived with. Values outside every vocabulary pack
+    to one shared index, matching the encoder, which encodes all of them as zeros.
+    Entries belong to one model version; binding another version empties the cache.
+    """
+
+    def __init__(self, max_entries: int = PREDICTION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.model_version = None
+        self._lookups = []
+        self._numerical = []
+        self._categorical = []
+        self._entries = OrderedDict()  # packed key -> prediction
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.evictions = 0
+
+    def bind(self, model_version: str, categories: List[List[str]],
+             numerical_features: List[str], categorical_features: List[str]):
+        """Attach the cache to a model; entries from any other model version are dropped"""
+        with self._lock:
+            if model_version != self.model_version:
+                self._entries.clear()
+            self.model_version = model_version
+            self._lookups = [{value: i for i, value in enumerate(values)} for values in categories]
+            self._numerical = list(numerical_features)
+            self._categorical = list(categorical_features)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.model_version is not None
+
+    def key(self, row: Dict[str, Any]) -> Optional[int]:
+        """Packed key of a feature row, or None if the row cannot be cached"""
+        key = 0
+        for name, lookup in zip(self._categorical, self._lookups):
+            key = key * (len(lookup) + 1) + lookup.get(row[name], len(lookup))
+        for name in self._numerical:
+            score = row[name]
+            if not (0 <= score <= MAX_SCORE) or score != int(score):
+                return None
+            key = key * (MAX_SCORE + 1) + int(score)
+        return key
+
+    def get_many(self, keys: List[Optional[int]]) -> List[Optional[float]]:
+        with self._lock:
+            results = []
+            for key in keys:
+                if key is None:
+                    self.uncacheable += 1
+                    results.append(None)
+                    continue
+                prediction = self._entries.get(key)
+                if prediction is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                results.append(prediction)
+            return results
+
+    def set_many(self, items: List[Tuple[int, float]]):
+        with self._lock:
+            for key, prediction in items:
+                self._entries[key] = prediction
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_version": self.model_version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "uncacheable": self.uncacheable,
+                "evictions": self.evictions,
+            }
 
 class PredictionClient:
     def __init__(self):
@@ -36,6 +249,7 @@ class PredictionClient:
         self.session.headers.update({"Content-Type": "application/json"})
         logger.debug("PredictionClient initialized")
 
+    @timings.timed("fetch", rows=lambda student: 1 if student else 0)
     def fetch_latest_student(self) -> Optional[Dict[str, Any]]:
         """Fetch the most recent student record with robust error handling"""
         try:
@@ -75,7 +289,7 @@ class PredictionClient:
             
             latest_student = valid_students[0]
             logger.info(f"Selected student ID: {latest_student.get('student_id')}")
-            logger.debug(f"Student data: {latest_student}")
+            logger.debug("Student data: %s", latest_student)
             
             return latest_student
         
@@ -86,9 +300,98 @@ class PredictionClient:
             logger.error(f"Unexpected error fetching student: {str(e)}")
             return None
 
+    @timings.timed("fetch", rows=lambda page: len(page["items"]) if page else 0)
+    def fetch_changes(self, since: Optional[str] = None, limit: int = CHANGES_PAGE_SIZE) -> Optional[Dict[str, Any]]:
+        """Fetch one page of students created or modified after the `since` watermark.
+
+        Returns:
+            The change feed page ({"items", "next_watermark", "has_more"}), or None on error
+        """
+        params = {"limit": limit}
+        if since:
+            params["since"] = since
+        try:
+            logger.debug(f"Fetching student changes since {since}")
+            response = self.session.get(f"{API_BASE_URL}/students/changes", params=params, timeout=(3.05, 30))
+            response.raise_for_status()
+            page = response.json()
+            logger.info(f"Received {len(page['items'])} changed student records")
+            return page
+        except requests.exceptions.RequestException as e:
+            logger.error(f"API request failed: {str(e)}")
+            return None
+        except (ValueError, KeyError) as e:
+            logger.error(f"Malformed change feed response: {str(e)}")
+            return None
+
+    def iter_student_pages(self, limit: int = FETCH_PAGE_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Yield every student a page at a time, following the X-Next-Cursor header"""
+        return self.iter_cursor_pages("/students/", limit)
+
+    def iter_unscored_pages(self, limit: int = FETCH_PAGE_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the students that have no prediction yet a page at a time"""
+        return self.iter_cursor_pages("/students/unscored", limit)
+
+    def iter_cursor_pages(self, path: str, limit: int) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the pages of a keyset-paginated student listing"""
+        cursor = None
+        while True:
+            params = {"limit": limit}
+            if cursor:
+                params["after_id"] = cursor
+            with timings.stage("fetch") as stage:
+                response = self.session.get(f"{API_BASE_URL}{path}", params=params, timeout=(3.05, 30))
+                response.raise_for_status()
+                students = response.json()
+                stage.rows = len(students)
+            logger.debug(f"Received page of {len(students)} student records")
+            if students:
+                yield students
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+    def iter_change_pages(self, since: str, limit: int = FETCH_PAGE_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Yield students changed after `since` (a watermark or ISO timestamp) a page at a time"""
+        while True:
+            page = self.fetch_changes(since=since, limit=limit)
+            if page is None:
+                raise RuntimeError("Change feed unavailable")
+            if page["items"]:
+                yield page["items"]
+            if not page["has_more"]:
+                break
+            since = page["next_watermark"]
+
+    def iter_students_by_id(self, student_ids: List[int], chunk_size: int = IDS_PER_REQUEST) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the given students in chunks, one GET /students/?ids= call each; unknown ids are logged and skipped"""
+        student_ids = list(dict.fromkeys(student_ids))
+        for start in range(0, len(student_ids), chunk_size):
+            chunk = student_ids[start:start + chunk_size]
+            with timings.stage("fetch") as stage:
+                response = self.session.get(
+                    f"{API_BASE_URL}/students/",
+                    params={"ids": chunk, "limit": len(chunk)},
+                    timeout=(3.05, 30)
+                )
+                response.raise_for_status()
+                students = response.json()
+                stage.rows = len(students)
+            found = {student.get('student_id') for student in students if isinstance(student, dict)}
+            missing = [student_id for student_id in chunk if student_id not in found]
+            if missing:
+                logger.warning(f"Students not found: {missing}")
+            if students:
+                yield students
+
+    @timings.timed("normalize", rows=len)
+    def normalize_students(self, students: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """normalize_student_data for a batch, timed as one stage call rather than per row"""
+        return [self.normalize_student_data(student) for student in students]
+
     def normalize_student_data(self, student_data: Dict[str, Any]) -> Dict[str, Any]:
         """Normalize student data structure with defaults and validation"""
-        logger.debug("Normalizing student data")
+        logger.debug("Normalizing student data", extra=SAMPLED)
         
         if not student_data:
             logger.warning("Received empty student data")
@@ -113,6 +416,9 @@ class PredictionClient:
                 normalized['test_preparation'] = {
                     'status': student_data['test_preparation'].get('status', 'none')
                 }
+            elif isinstance(student_data['test_preparation'], str):
+                # The API serializes test_preparation as the bare status value
+                normalized['test_preparation'] = {'status': student_data['test_preparation']}
         
         # Handle exam data
         if 'exams' in student_data:
@@ -122,16 +428,19 @@ class PredictionClient:
             elif isinstance(exams, dict):
                 normalized['exams'] = exams
         
-        logger.debug(f"Normalized data: {normalized}")
+        logger.debug("Normalized data: %s", normalized, extra=SAMPLED)
         return normalized
 
-def save_prediction(self, student_id: int, prediction: float, max_retries: int = 3) -> bool:
+    @timings.timed("save", rows=int)
+    def save_prediction(self, student_id: int, prediction: float, max_retries: int = 3,
+                        model_version: Optional[str] = None) -> bool:
         """Save prediction to API with robust retry logic and comprehensive error handling.
         
         Args:
             student_id: ID of the student being predicted
             prediction: The prediction value to save
             max_retries: Maximum number of retry attempts
+            model_version: Version of the model that made the prediction
             
         Returns:
             bool: True if successful, False if all attempts failed
@@ -139,29 +448,30 @@ def save_prediction(self, student_id: int, prediction: float, max_retries: int =
         payload = {
             'student_id': student_id,
             'prediction': float(prediction),
-            'prediction_date': datetime.now(timezone.utc).isoformat()  # Use UTC timezone
+            'prediction_date': datetime.now(timezone.utc).isoformat(),  # Use UTC timezone
+            'model_version': model_version
         }
         
         last_error = None  # Track the last error for final reporting
         
         for attempt in range(max_retries):
             try:
-                logger.debug(f"Attempt {attempt + 1}/{max_retries}: Saving prediction for student {student_id}")
+                logger.debug("Attempt %d/%d: Saving prediction for student %s", attempt + 1, max_retries, student_id,
+                             extra=SAMPLED)
                 
                 response = self.session.post(
                     f"{API_BASE_URL}/predictions/",
                     json=payload,
+                    # Versioned predictions replace an earlier one for the same student and model
+                    params={'upsert': 'true'} if model_version is not None else None,
                     timeout=(3.05, 10)  # Connect timeout 3.05s, read timeout 10s
                 )
                 
                 # Successful creation (201) or update (200)
                 if response.status_code in (200, 201):
-                    logger.info(f"Successfully saved prediction for student {student_id}")
-                    try:
-                        response_data = response.json()
-                        logger.debug(f"API response: {response_data}")
-                    except ValueError:
-                        logger.debug("API returned no JSON content")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Saved prediction for student %s: %s", student_id, response.text[:500],
+                                     extra={**SAMPLED, 'student_id': student_id})
                     return True
                 
                 # Handle specific error cases
@@ -192,46 +502,88 @@ def save_prediction(self, student_id: int, prediction: float, max_retries: int =
             # Exponential backoff with jitter
             if attempt < max_retries - 1:
                 sleep_time = min((2 ** attempt) + random.uniform(0, 1), 10)  # Max 10 seconds
-                logger.debug(f"Waiting {sleep_time:.2f} seconds before retry...")
+                logger.debug("Waiting %.2f seconds before retry...", sleep_time)
                 time.sleep(sleep_time)
         
         logger.error(f"Failed to save prediction after {max_retries} attempts. Last error: {last_error}")
         return False
 
+    @timings.timed("save", rows=int)
+    def save_predictions_bulk(self, predictions: List[Tuple[int, float]], max_retries: int = 3,
+                              model_version: Optional[str] = None, upsert: bool = False,
+                              failed_ids: Optional[List[int]] = None) -> int:
+        """Save many predictions through POST /predictions/bulk.
+
+        Args:
+            predictions: (student_id, prediction) pairs
+            max_retries: Maximum number of attempts per request
+            model_version: Version of the model that made the predictions
+            upsert: Replace the stored prediction of the same student and model version
+            failed_ids: If given, the ids of students whose prediction was not stored are appended to it
+
+        Returns:
+            int: Number of predictions the API stored (created or updated)
+        """
+        saved = 0
+        for start in range(0, len(predictions), BULK_SAVE_SIZE):
+            chunk = predictions[start:start + BULK_SAVE_SIZE]
+            payload = [{'student_id': int(student_id), 'prediction': float(prediction), 'model_version': model_version}
+                       for student_id, prediction in chunk]
+
+            stored = False
+            for attempt in range(max_retries):
+                try:
+                    response = self.session.post(
+                        f"{API_BASE_URL}/predictions/bulk",
+                        json=payload,
+                        params={'upsert': 'true'} if upsert else None,
+                        timeout=(3.05, 60)
+                    )
+                    if response.status_code == 200:
+                        body = response.json()
+                        saved += body['created'] + body.get('updated', 0)
+                        for result in body['results']:
+                            if result['status'] == 'error':
+                                student_id = payload[result['index']]['student_id']
+                                logger.error(f"Prediction for student {student_id} rejected: {result['error']}")
+                                if failed_ids is not None:
+                                    failed_ids.append(student_id)
+                        stored = True
+                        break
+                    logger.error(f"Bulk save failed ({response.status_code}): {response.text[:500]}")
+                    # Don't retry on client errors (4xx) except 429 (Too Many Requests)
+                    if 400 <= response.status_code < 500 and response.status_code != 429:
+                        break
+                except requests.exceptions.RequestException as e:
+                    logger.error(f"Network error (attempt {attempt + 1}): {str(e)}")
+
+                # Exponential backoff with jitter
+                if attempt < max_retries - 1:
+                    time.sleep(min((2 ** attempt) + random.uniform(0, 1), 10))
+            if not stored and failed_ids is not None:
+                failed_ids.extend(item['student_id'] for item in payload)
+
+        logger.info(f"Saved {saved}/{len(predictions)} predictions in bulk")
+        return saved
 
-def save_prediction(self, student_id: int, prediction: float) -> bool:
-    try:
-        # Create the prediction payload
-        payload = {
-            'student_id': student_id,
-            'prediction': prediction,
-            'prediction_date': datetime.now().isoformat()
-        }
-        
-        # Print out the request payload and headers
-        print("Request Payload:", payload)
-        print("Request Headers:", self.session.headers)
-        
-        # Send the request to the endpoint
-        response = self.session.post(f"{API_BASE_URL}/predictions/", json=payload)
-        
-        # Check the response status code
-        if response.status_code == 201:
-            return True
-        else:
-            return False
-    
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Failed to save prediction: {str(e)}")
-        return False
 
 class NeuralNetworkPredictor:
-    def __init__(self, api_client: PredictionClient):
+    def __init__(self, api_client: Optional[PredictionClient] = None, engine: str = INFERENCE_ENGINE):
+        self.engine = engine
+        # "auto" is resolved on load; a reload of a newly published version resolves it again
+        self.requested_engine = engine
+        self.model_dir = None
+        self.current_stamp = None
         self.model = None
         self.scaler = None
         self.encoder = None
         self.feature_names = None
-        self.api_client = api_client  # Store reference to API client
+        self.feature_encoder = None
+        self.model_version = None
+        self.bundle = None
+        self.prediction_cache = PredictionCache()
+        # Store reference to API client (only its normalize_student_data is needed offline)
+        self.api_client = api_client or PredictionClient()
         self.load_artifacts()
         logger.debug("NeuralNetworkPredictor initialized")
 
@@ -239,21 +591,47 @@ class NeuralNetworkPredictor:
         """Load all required model artifacts with validation"""
         try:
             logger.info("Loading model artifacts")
+            # Stamp first: a version published while loading is picked up on the next check
+            self.current_stamp = current_stamp(MODEL_ROOT)
+            self.model_dir = current_model_dir(MODEL_ROOT)
+            paths = artifact_paths(self.model_dir)
+            
+            if self.engine == "auto":
+                self.engine = "bundle" if os.path.exists(paths["bundle"]) else "keras"
+            if self.engine in ("bundle", "linear"):
+                self.load_bundle(paths["linear_bundle"] if self.engine == "linear" else paths["bundle"])
+                self.bind_prediction_cache()
+                logger.info(f"Model bundle {self.model_version} loaded successfully")
+                return
             
-            logger.debug(f"Loading model from {MODEL_PATH}")
-            self.model = load_model(MODEL_PATH, custom_objects={'mse': MeanSquaredError()})
+            if self.engine == "numpy":
+                model_path = paths["numpy_weights"]
+                logger.debug("Loading NumPy engine weights from %s", model_path)
+                self.model = NumpyMLP.load(model_path)
+            elif self.engine == "keras":
+                model_path = paths["model"]
+                logger.debug("Loading model from %s", model_path)
+                self.model = load_keras_model(model_path)
+            else:
+                raise ValueError(f"Unknown inference engine: {self.engine}")
             
-            logger.debug(f"Loading scaler from {SCALER_PATH}")
-            self.scaler = joblib.load(SCALER_PATH)
+            logger.debug("Loading scaler from %s", paths["scaler"])
+            self.scaler = joblib.load(paths["scaler"])
             
-            logger.debug(f"Loading encoder from {ENCODER_PATH}")
-            self.encoder = joblib.load(ENCODER_PATH)
+            logger.debug("Loading encoder from %s", paths["encoder"])
+            self.encoder = joblib.load(paths["encoder"])
             
-            logger.debug(f"Loading feature names from {FEATURE_NAMES_PATH}")
-            self.feature_names = joblib.load(FEATURE_NAMES_PATH)
+            logger.debug("Loading feature names from %s", paths["feature_names"])
+            self.feature_names = joblib.load(paths["feature_names"])
             
             if None in [self.model, self.scaler, self.encoder, self.feature_names]:
                 raise ValueError("One or more artifacts failed to load")
+            
+            if FEATURE_ENCODER == "compiled":
+                self.feature_encoder = self.compile_feature_encoder()
+            
+            self.model_version = file_version([model_path, paths["scaler"], paths["encoder"]])
+            self.bind_prediction_cache()
                 
             logger.info("All model artifacts loaded successfully")
             
@@ -261,10 +639,61 @@ class NeuralNetworkPredictor:
             logger.error(f"Failed to load model artifacts: {str(e)}")
             raise
 
+    def published_model_dir(self) -> Optional[str]:
+        """The newly published model directory if CURRENT changed since the artifacts were loaded, else None.
+
+        Costs one stat() while nothing changes, so it can be called before every batch.
+        """
+        stamp = current_stamp(MODEL_ROOT)
+        if stamp == self.current_stamp:
+            return None
+        self.current_stamp = stamp
+        model_dir = current_model_dir(MODEL_ROOT)
+        return model_dir if model_dir != self.model_dir else None
+
+    def load_bundle(self, path: str):
+        """Map the single-file bundle; feature dimensions (and checksums with MODEL_BUNDLE_VERIFY) are checked before use"""
+        logger.debug(f"Loading model bundle from {path}")
+        bundle = ModelBundle(path, verify=BUNDLE_VERIFY)
+        metadata = bundle.metadata
+        # Both wrap the mapped arrays without copying them
+        self.model = NumpyMLP(bundle.layers)
+        self.feature_encoder = CompiledFeatureEncoder(
+            bundle.arrays["scaler_mean"], bundle.arrays["scaler_scale"], bundle.categories,
+            metadata["numerical_features"], metadata["categorical_features"]
+        )
+        self.feature_names = metadata["feature_names"]
+        self.model_version = bundle.model_version
+        self.bundle = bundle
+
+    def bind_prediction_cache(self):
+        """Point the prediction cache at the loaded model, dropping entries of any previous one"""
+        if self.feature_encoder is not None:
+            categories = self.feature_encoder.categories
+            numerical, categorical = self.feature_encoder.numerical_features, self.feature_encoder.categorical_features
+        else:
+            categories = [[str(value) for value in values] for values in self.encoder.categories_]
+            numerical, categorical = NUMERICAL_COLUMNS, CATEGORICAL_COLUMNS
+        self.prediction_cache.bind(self.model_version, categories, numerical, categorical)
+
+    def compile_feature_encoder(self) -> Optional[CompiledFeatureEncoder]:
+        """Build the lookup-table encoder; None (sklearn path) unless it matches sklearn bit for bit"""
+        try:
+            compiled = CompiledFeatureEncoder.from_sklearn(
+                self.scaler, self.encoder, NUMERICAL_COLUMNS, CATEGORICAL_COLUMNS
+            )
+            if verify_against_sklearn(compiled, self.scaler, self.encoder):
+                logger.debug("Compiled feature encoder verified against sklearn")
+                return compiled
+            logger.warning("Compiled feature encoder differs from sklearn; using sklearn transforms")
+        except Exception as e:
+            logger.warning(f"Could not compile feature encoder, using sklearn transforms: {str(e)}")
+        return None
+
+    @timings.timed("prepare_features")
     def prepare_features(self, student_data: Dict[str, Any]) -> np.ndarray:
         """Prepare student data for prediction with robust error handling"""
-        logger.info("Preparing features for prediction")
-        logger.debug(f"Input student data: {student_data}")
+        logger.debug("Preparing features for student data: %s", student_data, extra=SAMPLED)
         
         try:
             if not student_data:
@@ -273,32 +702,20 @@ class NeuralNetworkPredictor:
             # Normalize the data structure first using the API client's method
             student_data = self.api_client.normalize_student_data(student_data)
             
-            # Extract nested data with defaults
-            exam_data = student_data.get('exams', {})
-            prep_data = student_data.get('test_preparation', {})
+            if self.feature_encoder is not None:
+                return self.feature_encoder.encode_row(self.feature_row(student_data))
             
             # Create DataFrame with expected feature names
-            data = {
-                'gender': [student_data.get('gender', 'unknown')],
-                'race/ethnicity': [student_data.get('race_ethnicity', 'unknown')],
-                'parental level of education': [student_data.get('parental_level_of_education', 'unknown')],
-                'lunch': [student_data.get('lunch', 'standard')],
-                'test preparation course': [prep_data.get('status', 'none')],
-                'math score': [float(exam_data.get('math_score', 0))],
-                'reading score': [float(exam_data.get('reading_score', 0))],
-                'writing score': [float(exam_data.get('writing_score', 0))]
-            }
-            
-            logger.debug(f"Constructed feature dict: {data}")
+            data = {column: [value] for column, value in self.feature_row(student_data).items()}
             
             # Create DataFrame ensuring correct column order
             df = pd.DataFrame(data, columns=self.feature_names)
-            logger.debug(f"Feature DataFrame:\n{df}")
+            logger.debug("Feature DataFrame:\n%s", df, extra=SAMPLED)
             
             # Preprocess numerical features
             numerical_cols = ['math score', 'reading score', 'writing score']
             scaled_numerical = self.scaler.transform(df[numerical_cols])
-            logger.debug(f"Scaled numerical features: {scaled_numerical}")
+            logger.debug("Scaled numerical features: %s", scaled_numerical, extra=SAMPLED)
             
             # Preprocess categorical features
             categorical_cols = ['gender', 'race/ethnicity', 'parental level of education', 
@@ -308,18 +725,108 @@ class NeuralNetworkPredictor:
             if hasattr(encoded_categorical, 'toarray'):
                 encoded_categorical = encoded_categorical.toarray()
             
-            logger.debug(f"Encoded categorical features shape: {encoded_categorical.shape}")
-            
             # Combine features
-            features = np.concatenate([scaled_numerical, encoded_categorical], axis=1)
-            logger.debug(f"Final feature array shape: {features.shape}")
-            
-            return features
+            return np.concatenate([scaled_numerical, encoded_categorical], axis=1)
             
         except Exception as e:
             logger.error(f"Feature preparation failed: {str(e)}", exc_info=True)
             raise
 
+    def feature_row(self, student_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a normalized student record to one value per model input column"""
+        # Extract nested data with defaults
+        exam_data = student_data.get('exams', {})
+        prep_data = student_data.get('test_preparation', {})
+
+        return {
+            'gender': student_data.get('gender', 'unknown'),
+            'race/ethnicity': student_data.get('race_ethnicity', 'unknown'),
+            'parental level of education': student_data.get('parental_level_of_education', 'unknown'),
+            'lunch': student_data.get('lunch', 'standard'),
+            'test preparation course': prep_data.get('status', 'none'),
+            'math score': float(exam_data.get('math_score', 0)),
+            'reading score': float(exam_data.get('reading_score', 0)),
+            'writing score': float(exam_data.get('writing_score', 0))
+        }
+
+    def prepare_feature_matrix(self, students: List[Dict[str, Any]]) -> np.ndarray:
+        """Prepare features for many students with a single scaler/encoder pass"""
+        if not students:
+            raise ValueError("Empty student data provided")
+
+        rows = [self.feature_row(student) for student in self.api_client.normalize_students(students)]
+        return self.encode_feature_rows(rows)
+
+    @timings.timed("prepare_features", rows=len)
+    def encode_feature_rows(self, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Encode rows produced by feature_row into the model's input matrix"""
+        if self.feature_encoder is not None:
+            return self.feature_encoder.encode_rows(rows)
+
+        df = pd.DataFrame(rows, columns=self.feature_names)
+
+        scaled_numerical = self.scaler.transform(df[NUMERICAL_COLUMNS])
+        encoded_categorical = self.encoder.transform(df[CATEGORICAL_COLUMNS])
+        if hasattr(encoded_categorical, 'toarray'):
+            encoded_categorical = encoded_categorical.toarray()
+
+        features = np.concatenate([scaled_numerical, encoded_categorical], axis=1)
+        logger.debug("Prepared feature matrix of shape %s", features.shape)
+        return features
+
+    @timings.timed("predict", rows=len)
+    def predict_batch(self, features: np.ndarray, batch_size: int = PREDICT_BATCH_SIZE) -> np.ndarray:
+        """Predict every row of `features`, one forward pass per `batch_size` rows"""
+        if features is None or features.size == 0:
+            raise ValueError("Empty feature array provided")
+
+        # predict_on_batch skips the per-call setup of model.predict, which dominates small batches
+        if len(features) <= batch_size:
+            predictions = self.model.predict_on_batch(features)
+        else:
+            predictions = self.model.predict(features, batch_size=batch_size, verbose=0)
+        return np.asarray(predictions, dtype=np.float64).reshape(-1)
+
+    def predict_records(self, students: List[Dict[str, Any]]) -> np.ndarray:
+        """Predict raw student records, serving repeated inputs from the prediction cache"""
+        if not students:
+            raise ValueError("Empty student data provided")
+
+        return self.predict_rows([
+            self.feature_row(student) for student in self.api_client.normalize_students(students)
+        ])
+
+    def predict_rows(self, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Predict rows shaped like feature_row's output, serving repeated inputs from the prediction cache.
+
+        Only rows whose packed key is not cached are encoded and run through the
+        model, and identical inputs within one call share a single model row.
+        """
+        cache = self.prediction_cache
+        if not cache.enabled:
+            return self.predict_batch(self.encode_feature_rows(rows))
+
+        keys = [cache.key(row) for row in rows]
+        predictions = np.empty(len(rows), dtype=np.float64)
+        pending = {}  # packed key (or row index if uncacheable) -> row indexes needing it
+        for i, (key, cached) in enumerate(zip(keys, cache.get_many(keys))):
+            if cached is None:
+                pending.setdefault(key if key is not None else ("row", i), []).append(i)
+            else:
+                predictions[i] = cached
+
+        if pending:
+            model_rows = [rows[indexes[0]] for indexes in pending.values()]
+            results = self.predict_batch(self.encode_feature_rows(model_rows))
+            for indexes, prediction in zip(pending.values(), results):
+                predictions[indexes] = prediction
+            cache.set_many([
+                (key, float(prediction)) for key, prediction in zip(pending, results) if isinstance(key, int)
+            ])
+        logger.debug("Predicted %d records, %d through the model", len(rows), len(pending))
+        return predictions
+
+    @timings.timed("predict")
     def predict(self, features: np.ndarray) -> float:
         """Make prediction with validation and debugging"""
         try:
@@ -328,61 +835,450 @@ class NeuralNetworkPredictor:
             if features.size == 0:
                 raise ValueError("Empty feature array provided")
                 
-            logger.info("Making prediction")
-            logger.debug(f"Input features shape: {features.shape}")
-            
             prediction = self.model.predict(features)
-            logger.debug(f"Raw prediction output: {prediction}")
+            logger.debug("Raw prediction output for features of shape %s: %s", features.shape, prediction,
+                         extra=SAMPLED)
             
             if prediction is None or len(prediction) == 0:
                 raise ValueError("Model returned empty prediction")
                 
-            result = float(prediction[0][0])
-            logger.info(f"Prediction result: {result:.2f}")
-            
-            return result
+            return float(prediction[0][0])
             
         except Exception as e:
             logger.error(f"Prediction failed: {str(e)}", exc_info=True)
             raise
 
-def main():
+def score_student(api_client: PredictionClient, predictor: "NeuralNetworkPredictor", student: Dict[str, Any]) -> bool:
+    """Predict one student and save the result; returns True if it was saved"""
+    student_id = student.get('student_id')
+    logger.debug("Raw student record: %s", student, extra={'student_id': student_id})
+
+    # Repeated inputs are answered from the prediction cache without a forward pass
+    prediction = float(predictor.predict_records([student])[0])
+    logger.info("Prediction for student %s: %.2f", student_id, prediction,
+                extra={'student_id': student_id, 'prediction': prediction})
+
+    if not api_client.save_prediction(student['student_id'], prediction, model_version=predictor.model_version):
+        logger.error("Failed to save prediction to database")
+        return False
+    return True
+
+def run_latest(api_client: PredictionClient, predictor: "NeuralNetworkPredictor"):
+    """Score the most recent student"""
+    # Fetch latest student
+    logger.debug("Fetching latest student record")
+    student = api_client.fetch_latest_student()
+    if not student:
+        logger.error("No valid student data available for prediction")
+        return
+
+    if score_student(api_client, predictor, student):
+        logger.info("Prediction pipeline completed successfully")
+
+def run_changes(api_client: PredictionClient, predictor: "NeuralNetworkPredictor", store: WatermarkStore,
+                save_concurrency: int = SAVE_CONCURRENCY):
+    """Score only the students created or modified since the stored watermark"""
+    asyncio.run(run_changes_async(api_client, predictor, store, save_concurrency))
+
+async def run_changes_async(api_client: PredictionClient, predictor: "NeuralNetworkPredictor",
+                            store: WatermarkStore, save_concurrency: int, lag: float = CHANGES_LAG_SECONDS):
+    """Change feed loop; each page's predictions are saved concurrently over pooled connections.
+
+    Each run resumes `lag` seconds behind the last updated_at it processed, so rows
+    whose transactions committed after the feed had passed them are not lost. Students
+    already processed at the same updated_at are skipped instead of re-scored.
+    """
+    state = store.load()
+    watermark = state.get("watermark")
+    position = state.get("updated_at")
+    # str(student_id) -> updated_at of the students processed within the lag window
+    recent = state.get("recent", {})
+    since = lag_window_start(position, lag) if position else watermark
+    logger.info(f"Resuming change feed from {since} (watermark {watermark}, last change {position})")
+    scored = 0
+    skipped = 0
+
+    async with AsyncPredictionClient(API_BASE_URL, concurrency=save_concurrency) as saver:
+        while True:
+            page = await asyncio.to_thread(api_client.fetch_changes, since=since)
+            if page is None:
+                logger.error("Stopping: change feed unavailable")
+                break
+
+            items = [student for student in page["items"] if isinstance(student, dict) and 'student_id' in student]
+            students = [
+                student for student in items
+                if student.get('updated_at') is None
+                or recent.get(str(student['student_id'])) != student['updated_at']
+            ]
+            skipped += len(items) - len(students)
+            if students:
+                predictions = predictor.predict_records(students)
+                with timings.stage("save", rows=len(students)):
+                    results = await saver.save_predictions([
+                        (student['student_id'], prediction) for student, prediction in zip(students, predictions)
+                    ], model_version=predictor.model_version)
+                # The watermark only moves past a page once every student on it is saved,
+                # so a failed save is retried on the next run
+                failed = [result for result in results if not result.ok]
+                scored += len(results) - len(failed)
+                if failed:
+                    logger.error(f"Stopping: {len(failed)} predictions failed to save")
+                    break
+
+            for student in items:
+                if student.get('updated_at') is not None:
+                    recent[str(student['student_id'])] = student['updated_at']
+                    position = student['updated_at']
+            if position:
+                window_start = datetime.fromisoformat(lag_window_start(position, lag))
+                recent = {
+                    student_id: updated_at for student_id, updated_at in recent.items()
+                    if datetime.fromisoformat(updated_at) > window_start
+                }
+            if page["next_watermark"] and page["next_watermark"] != since:
+                since = watermark = page["next_watermark"]
+                store.save(watermark, position, recent)
+            if not page["has_more"]:
+                break
+
+    logger.info(
+        f"Change feed run completed: {scored} students scored, {skipped} already scored in the lag window, "
+        f"watermark {watermark}"
+    )
+    logger.info(f"Save latency: {saver.latency_summary()}")
+
+def score_batches(api_client: PredictionClient, predictor: "NeuralNetworkPredictor",
+                  batches: Iterator[List[Dict[str, Any]]]) -> Tuple[int, int]:
+    """Score students a batch at a time: one feature pass, one forward pass, bulk saves.
+
+    `api_client` only needs save_predictions_bulk, so a direct_db.DatabaseStore works too.
+
+    Returns:
+        The number of students scored and the number of predictions saved
+    """
+    scored = 0
+    saved = 0
+    for students in batches:
+        students = [student for student in students if isinstance(student, dict) and 'student_id' in student]
+        if not students:
+            continue
+
+        predictions = predictor.predict_records(students)
+        scored += len(students)
+        # Re-scoring with the same model replaces the stored prediction instead of adding a row
+        saved += api_client.save_predictions_bulk(
+            [(student['student_id'], prediction) for student, prediction in zip(students, predictions)],
+            model_version=predictor.model_version, upsert=True
+        )
+        logger.info(f"Scored {scored} students so far")
+
+    logger.info(f"Batch run completed: {scored} students scored, {saved} predictions saved")
+    logger.info(f"Prediction cache: {predictor.prediction_cache.stats()}")
+    return scored, saved
+
+class PredictionWorker:
+    """Long-running scorer: keeps the model loaded and polls the API for unscored students.
+
+    Each poll walks GET /students/unscored page by page and scores every page in one
+    pass. Saves run on a small thread pool; once `max_in_flight` of them are pending,
+    scoring blocks until one finishes, so a slow API throttles the worker instead of
+    piling up memory. Polls back off exponentially (with jitter) unless the worker
+    made progress since the last poll: saves succeeded, or new students were scored
+    without any save failing. An idle worker, an unreachable API and a save endpoint
+    that rejects everything all back off the same way. A student whose save fails
+    `max_save_attempts` times is skipped until the worker restarts. When training
+    publishes a new version (models/CURRENT), it is loaded before the next batch.
+    SIGTERM/SIGINT stop polling and drain the in-flight saves before exiting.
+    """
+
+    def __init__(self, api_client: PredictionClient, predictor: NeuralNetworkPredictor,
+                 poll_interval: float = WORKER_POLL_INTERVAL,
+                 max_poll_interval: float = WORKER_MAX_POLL_INTERVAL,
+                 max_in_flight: int = WORKER_MAX_IN_FLIGHT,
+                 page_size: int = FETCH_PAGE_SIZE,
+                 max_save_attempts: int = WORKER_MAX_SAVE_ATTEMPTS):
+        self.api_client = api_client
+        self.predictor = predictor
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.page_size = page_size
+        self.max_save_attempts = max_save_attempts
+        self._stop = threading.Event()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._saves = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="save")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Scored students whose save has not finished; skipped by later polls
+        self._pending = set()
+        # Failed saves per student, and the students that ran out of attempts
+        self._save_failures = {}
+        self._skipped = set()
+        self.polls = 0
+        self.scored = 0
+        self.saved = 0
+        self.failed = 0
+
+    def stop(self, signum=None, frame=None):
+        if not self._stop.is_set():
+            logger.info("Stop requested; draining in-flight saves")
+        self._stop.set()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info(f"Worker started (model {self.predictor.model_version})")
+
+        interval = self.poll_interval
+        saved_before, failed_before = self.saved, self.failed
+        while not self._stop.is_set():
+            try:
+                found = self.poll_once()
+            except Exception as e:
+                logger.error(f"Poll failed: {str(e)}", exc_info=True)
+                found = 0
+            self.polls += 1
+
+            # Progress is judged on saves, not on scoring: students whose saves fail
+            # come back unscored on the next poll, so `found` alone would hot-loop
+            with self._lock:
+                saved, failed = self.saved - saved_before, self.failed - failed_before
+                saved_before, failed_before = self.saved, self.failed
+            if saved or (found and not failed):
+                interval = self.poll_interval
+                continue
+            # Idle or failing: wait longer each time, jittered so workers don't poll in lockstep
+            self._stop.wait(interval * random.uniform(0.8, 1.2))
+            interval = min(interval * 2, self.max_poll_interval)
+
+        self._saves.shutdown(wait=True)
+        logger.info(
+            f"Worker stopped after {self.polls} polls: {self.scored} scored, "
+            f"{self.saved} saved, {self.failed} failed, {len(self._skipped)} skipped"
+        )
+
+    def poll_once(self) -> int:
+        """Score every unscored student not already awaiting a save; returns how many"""
+        found = 0
+        for students in self.api_client.iter_unscored_pages(self.page_size):
+            if self._stop.is_set():
+                break
+            with self._lock:
+                students = [
+                    student for student in students
+                    if isinstance(student, dict) and 'student_id' in student
+                    and student['student_id'] not in self._pending
+                    and student['student_id'] not in self._skipped
+                ]
+                self._pending.update(student['student_id'] for student in students)
+            if not students:
+                continue
+
+            try:
+                self.reload_published_model()
+                predictor = self.predictor
+                predictions = predictor.predict_records(students)
+            except Exception:
+                with self._lock:
+                    self._pending.difference_update(student['student_id'] for student in students)
+                raise
+            found += len(students)
+            self.scored += len(students)
+            batch = [(student['student_id'], prediction) for student, prediction in zip(students, predictions)]
+
+            # Blocks while max_in_flight saves are outstanding
+            self._slots.acquire()
+            # The version that made the predictions, even if a newer one is loaded before the save runs
+            self._saves.submit(self._save, batch, predictor.model_version)
+        if found:
+            logger.info(f"Scored {found} students this poll ({self.scored} total)")
+        return found
+
+    def reload_published_model(self):
+        """Switch to a newly published model version; on failure keep scoring with the loaded one"""
+        model_dir = self.predictor.published_model_dir()
+        if model_dir is None:
+            return
+        logger.info(f"New model version published in {model_dir}; loading it")
+        try:
+            self.predictor = NeuralNetworkPredictor(self.predictor.api_client, engine=self.predictor.requested_engine)
+        except Exception as e:
+            logger.error(f"Keeping model {self.predictor.model_version}; the new version failed to load: {str(e)}")
+            return
+        logger.info(f"Now scoring with model {self.predictor.model_version}")
+
+    def _save(self, batch: List[Tuple[int, float]], model_version: Optional[str]):
+        failed_ids = []
+        try:
+            # requests sessions are not thread-safe; each save thread keeps its own
+            client = getattr(self._local, "client", None)
+            if client is None:
+                client = self._local.client = PredictionClient()
+            client.save_predictions_bulk(
+                batch, model_version=model_version, upsert=True, failed_ids=failed_ids
+            )
+        except Exception as e:
+            logger.error(f"Bulk save failed: {str(e)}")
+            failed_ids = [student_id for student_id, _ in batch]
+        finally:
+            self._slots.release()
+        failed_ids = set(failed_ids)
+        with self._lock:
+            # Unsaved students are still unscored in the API, so the next poll retries them
+            self._pending.difference_update(student_id for student_id, _ in batch)
+            for student_id, _ in batch:
+                if student_id not in failed_ids:
+                    self._save_failures.pop(student_id, None)
+                    continue
+                attempts = self._save_failures.get(student_id, 0) + 1
+                if attempts < self.max_save_attempts:
+                    self._save_failures[student_id] = attempts
+                    continue
+                del self._save_failures[student_id]
+                self._skipped.add(student_id)
+                logger.warning(f"Skipping student {student_id} after {attempts} failed saves")
+            self.saved += len(batch) - len(failed_ids)
+            self.failed += len(failed_ids)
+
+def parse_ids(value: str) -> List[int]:
+    try:
+        return [int(student_id) for student_id in value.split(",") if student_id.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected comma-separated student ids, got {value!r}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Student performance prediction pipeline")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--changes", action="store_true",
+        help="Score students created or modified since the last run (watermark kept locally)"
+    )
+    mode.add_argument(
+        "--all", action="store_true",
+        help="Re-score every student in batches"
+    )
+    mode.add_argument(
+        "--since", metavar="WATERMARK",
+        help="Score students changed after a change feed watermark or ISO-8601 timestamp, in batches"
+    )
+    mode.add_argument(
+        "--ids", type=parse_ids, metavar="ID,ID,...",
+        help="Score the given students in batches"
+    )
+    mode.add_argument(
+        "--unscored", action="store_true",
+        help="Score every student that has no prediction yet, in batches"
+    )
+    mode.add_argument(
+        "--worker", action="store_true",
+        help="Run until SIGTERM, polling for unscored students and scoring them in batches"
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=WORKER_POLL_INTERVAL,
+        help="Worker mode: seconds to wait after a poll finds nothing (doubles while idle)"
+    )
+    parser.add_argument(
+        "--max-poll-interval", type=float, default=WORKER_MAX_POLL_INTERVAL,
+        help="Worker mode: upper bound of the idle backoff"
+    )
+    parser.add_argument(
+        "--max-in-flight", type=int, default=WORKER_MAX_IN_FLIGHT,
+        help="Worker mode: bulk save requests allowed in flight before scoring pauses"
+    )
+    parser.add_argument(
+        "--max-save-attempts", type=int, default=WORKER_MAX_SAVE_ATTEMPTS,
+        help="Worker mode: failed saves after which a student is skipped until the worker restarts"
+    )
+    parser.add_argument(
+        "--source", choices=["api", "db"], default="api",
+        help="--unscored: read and write through the REST API or directly through the database "
+             "(DATABASE_URL, SQLAlchemy models from Task 2)"
+    )
+    parser.add_argument(
+        "--watermark-file", default=WATERMARK_PATH,
+        help="Where --changes stores its watermark"
+    )
+    parser.add_argument(
+        "--save-concurrency", type=int, default=SAVE_CONCURRENCY,
+        help="--changes: predictions saved concurrently"
+    )
+    parser.add_argument(
+        "--engine", choices=ENGINES, default=INFERENCE_ENGINE,
+        help="Inference engine: the model bundle, the Keras .h5 model, its NumPy export or the "
+             "closed-form linear model; auto uses the bundle when it exists"
+    )
+    parser.add_argument(
+        "--timings-json", metavar="PATH",
+        help="Write per-stage timings (calls, rows, p50/p95/p99, peak RSS) as JSON"
+    )
+    parser.add_argument(
+        "--profile", metavar="PATH",
+        help="Run under cProfile and write the profile to PATH (load with pstats)"
+    )
+    parser.add_argument(
+        "--log-level", default=LOG_LEVEL, type=str.upper,
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Log level (PREDICT_LOG_LEVEL); per-row DEBUG events are sampled at PREDICT_LOG_SAMPLE_RATE"
+    )
+    return parser.parse_args()
+
+def run(args):
     try:
         logger.info("Starting prediction pipeline")
         
         # Initialize clients and predictor
         logger.debug("Initializing components")
         api_client = PredictionClient()
-        predictor = NeuralNetworkPredictor(api_client) 
+        with timings.stage("load_model", rows=0):
+            predictor = NeuralNetworkPredictor(api_client, engine=args.engine)
 
-            # Fetch latest student
-        logger.debug("Fetching latest student record")
-        student = api_client.fetch_latest_student()
-        if not student:
-            logger.error("No valid student data available for prediction")
-            return
-        
-        logger.info(f"Processing student ID: {student.get('student_id')}")
-        logger.debug(f"Raw student record: {student}")
-    
-        # Prepare and predict
-        logger.debug("Preparing features")
-        features = predictor.prepare_features(student)
-        
-        logger.debug("Making prediction")
-        prediction = predictor.predict(features)
-        
-        # Save prediction
-        logger.debug("Saving prediction results")
-        if not api_client.save_prediction(student['student_id'], prediction):
-            logger.error("Failed to save prediction to database")
+        if args.changes:
+            run_changes(api_client, predictor, WatermarkStore(args.watermark_file), args.save_concurrency)
+        elif args.all:
+            score_batches(api_client, predictor, api_client.iter_student_pages())
+        elif args.since:
+            score_batches(api_client, predictor, api_client.iter_change_pages(args.since))
+        elif args.ids:
+            score_batches(api_client, predictor, api_client.iter_students_by_id(args.ids))
+        elif args.unscored and args.source == "db":
+            # Imported here so the HTTP modes don't need SQLAlchemy or database settings
+            from direct_db import DatabaseStore
+            store = DatabaseStore()
+            score_batches(store, predictor, store.iter_unscored_pages())
+        elif args.unscored:
+            score_batches(api_client, predictor, api_client.iter_unscored_pages())
+        elif args.worker:
+            PredictionWorker(
+                api_client, predictor,
+                poll_interval=args.poll_interval,
+                max_poll_interval=args.max_poll_interval,
+                max_in_flight=args.max_in_flight,
+                max_save_attempts=args.max_save_attempts
+            ).run()
         else:
-            logger.info("Prediction pipeline completed successfully")
+            run_latest(api_client, predictor)
             
     except Exception as e:
         logger.error(f"Prediction pipeline failed: {str(e)}", exc_info=True)
         # Consider adding notification/alerting here
 
+def main():
+    args = parse_args()
+    configure_logging(level=args.log_level)
+    if args.profile:
+        # Load later with pstats.Stats(path) or snakeviz
+        profiler = cProfile.Profile()
+        profiler.runcall(run, args)
+        profiler.dump_stats(args.profile)
+        logger.info(f"Profile written to {args.profile}")
+    else:
+        run(args)
+
+    logger.info(f"Stage timings:\n{timings.format_summary()}")
+    if args.timings_json:
+        timings.dump_json(args.timings_json)
+        logger.info(f"Stage timings written to {args.timings_json}")
+
 if __name__ == "__main__":
     main()
  
@@ -0,0 +1,170 @@
+"""Per-stage timing for the prediction pipeline.
+
+Each stage (fetch, normalize, prepare_features, predict, save) records call
+count, rows, total time, a latency sample for percentiles and the process's
+peak RSS as of the end of each call. Because peak RSS only grows, the first
+stage whose peak jumps is the one that allocated the memory.
+
+The module-level `timings` is shared by predict.py and the modules it uses,
+and is safe to use from worker threads. Each thread records into its own
+stats without taking a lock; summary() merges them. Stages are meant to wrap
+whole batches (a page, a matrix, a bulk save), not single rows, so the
+getrusage call per record stays off the per-row path.
+"""
+import json
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Latencies kept per stage for percentiles; beyond this a uniform reservoir sample is kept
+SAMPLE_SIZE = 10000
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it isn't available"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class StageStats:
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+        self.peak_rss_mb = None
+
+    def record(self, seconds: float, rows: int, rss):
+        self.calls += 1
+        self.rows += rows
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if len(self.samples) < SAMPLE_SIZE:
+            self.samples.append(seconds)
+        else:
+            slot = random.randrange(self.calls)
+            if slot < SAMPLE_SIZE:
+                self.samples[slot] = seconds
+        if rss is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0.0, rss)
+
+    def merge(self, other: "StageStats"):
+        self.calls += other.calls
+        self.rows += other.rows
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.samples.extend(other.samples)
+        if len(self.samples) > SAMPLE_SIZE:
+            self.samples = random.sample(self.samples, SAMPLE_SIZE)
+        if other.peak_rss_mb is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0.0, other.peak_rss_mb)
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "calls": self.calls,
+            "rows": self.rows,
+            "total_s": round(self.total, 4),
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "rows_per_s": round(self.rows / self.total, 1) if self.total else 0.0,
+            "peak_rss_mb": round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None,
+        }
+
+class StageTimings:
+    def __init__(self):
+        # Guards _threads and adding stages; recording into an existing stage takes no lock
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._threads = []  # every recording thread's {stage: StageStats}
+
+    def _thread_stages(self) -> dict:
+        stages = getattr(self._local, "stages", None)
+        if stages is None:
+            stages = self._local.stages = {}
+            with self._lock:
+                self._threads.append(stages)
+        return stages
+
+    def record(self, stage: str, seconds: float, rows: int = 1):
+        stages = self._thread_stages()
+        stats = stages.get(stage)
+        if stats is None:
+            with self._lock:
+                stats = stages[stage] = StageStats()
+        stats.record(seconds, rows, peak_rss_mb())
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 1):
+        """Time the block; set `.rows` on the yielded object when the count is only known inside"""
+        counter = _Rows(rows)
+        start = time.perf_counter()
+        try:
+            yield counter
+        finally:
+            self.record(name, time.perf_counter() - start, counter.rows)
+
+    def timed(self, name: str, rows=None):
+        """Decorator form of stage(); `rows(result)` gives the row count of a call (default 1)"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                result = func(*args, **kwargs)
+                self.record(name, time.perf_counter() - start, rows(result) if rows else 1)
+                return result
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            for stages in self._threads:
+                stages.clear()
+
+    def summary(self) -> dict:
+        merged = {}
+        with self._lock:
+            for stages in self._threads:
+                for name, stats in stages.items():
+                    merged.setdefault(name, StageStats()).merge(stats)
+        return {name: stats.summary() for name, stats in merged.items()}
+
+    def format_summary(self) -> str:
+        lines = [
+            f"{'stage':<18}{'calls':>8}{'rows':>10}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'p99 ms':>10}{'rows/s':>12}{'peak RSS MB':>13}"
+        ]
+        for name, stats in self.summary().items():
+            rss = f"{stats['peak_rss_mb']:.1f}" if stats["peak_rss_mb"] is not None else "n/a"
+            lines.append(
+                f"{name:<18}{stats['calls']:>8}{stats['rows']:>10}{stats['total_s']:>10.3f}"
+                f"{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+                f"{stats['rows_per_s']:>12.1f}{rss:>13}"
+            )
+        return "\n".join(lines)
+
+    def dump_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+class _Rows:
+    def __init__(self, rows: int):
+        self.rows = rows
+
+# Shared by every module of the pipeline
+timings = StageTimings()
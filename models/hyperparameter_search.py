@@ -0,0 +1,166 @@
+"""Parallel hyperparameter search over build_model configurations.
+
+The data is preprocessed once and written as .npy files that every worker
+memory-maps read-only. Trials read the matrices from the page cache instead
+of receiving a pickled copy each. Each worker process trains one configuration
+at a time with early stopping, using a fixed number of TensorFlow threads so
+the pool does not oversubscribe the CPU.
+
+Results are appended to the leaderboard as trials finish. At the end the
+leaderboard is rewritten ranked by validation loss, and the best model is
+saved through train_model.save_artifacts.
+
+Usage (from models/):
+    python train_model.py --search grid
+    python train_model.py --search random --trials 20 --workers 4 --threads-per-worker 2
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+import train_model
+from numpy_engine import load_keras_model
+
+logger = logging.getLogger(__name__)
+
+SEARCH_SPACE = {
+    "units": [(64, 32, 16), (128, 64, 32), (64, 32), (32, 16)],
+    "dropout": [0.0, 0.1, 0.2, 0.3],
+    "learning_rate": [3e-4, 1e-3, 3e-3],
+    "batch_size": [32, 64, 128],
+}
+LEADERBOARD_PATH = os.path.join(train_model.MODEL_DIR, "search_leaderboard.csv")
+
+def grid_configs(space: Dict[str, List[Any]] = SEARCH_SPACE) -> List[Dict[str, Any]]:
+    """Every combination of the search space"""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+def random_configs(trials: int, space: Dict[str, List[Any]] = SEARCH_SPACE,
+                   seed: int = train_model.RANDOM_STATE) -> List[Dict[str, Any]]:
+    """`trials` distinct combinations drawn at random from the grid"""
+    grid = grid_configs(space)
+    return random.Random(seed).sample(grid, min(trials, len(grid)))
+
+# Set in each worker process by init_worker
+_data = None
+
+def init_worker(data_dir: str, threads: int):
+    """Limit TensorFlow's thread pools and map the shared matrices, once per worker"""
+    global _data
+    import tensorflow as tf
+
+    # Must run before the worker's first TensorFlow op
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    _data = {
+        name: np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode="r")
+        for name in ("X_train", "y_train", "X_test", "y_test")
+    }
+
+def train_trial(trial: int, config: Dict[str, Any], output_dir: str) -> Dict[str, Any]:
+    """Train one configuration in a worker; returns its leaderboard row"""
+    import tensorflow as tf
+
+    start = time.perf_counter()
+    tf.keras.utils.set_random_seed(train_model.RANDOM_STATE)
+    model = train_model.build_model(
+        _data["X_train"].shape[1], config["units"], config["dropout"], config["learning_rate"]
+    )
+    early_stopping = train_model.EarlyStopping(
+        monitor='val_loss',
+        patience=train_model.EARLY_STOPPING_PATIENCE,
+        restore_best_weights=True
+    )
+    history = model.fit(
+        _data["X_train"], _data["y_train"],
+        validation_data=(_data["X_test"], _data["y_test"]),
+        epochs=train_model.EPOCHS,
+        batch_size=config["batch_size"],
+        callbacks=[early_stopping],
+        verbose=0
+    )
+    val_loss, val_mae = model.evaluate(_data["X_test"], _data["y_test"], verbose=0)
+    model_path = os.path.join(output_dir, f"trial_{trial}.h5")
+    model.save(model_path)
+    return {
+        "trial": trial,
+        "val_loss": float(val_loss),
+        "val_mae": float(val_mae),
+        "epochs": len(history.history["loss"]),
+        "seconds": round(time.perf_counter() - start, 2),
+        "units": "-".join(str(width) for width in config["units"]),
+        "dropout": config["dropout"],
+        "learning_rate": config["learning_rate"],
+        "batch_size": config["batch_size"],
+        "model_path": model_path,
+    }
+
+def run_search(configs: List[Dict[str, Any]], data_path: str = train_model.DATA_PATH, workers: int = None,
+               threads_per_worker: int = 1, leaderboard_path: str = LEADERBOARD_PATH,
+               use_cache: bool = True) -> Dict[str, Any]:
+    """Train `configs` in parallel, write the leaderboard and save the best model; returns its row"""
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    (X_train, X_test, y_train, y_test, preprocessor,
+     feature_names, categorical_features, numerical_features) = train_model.preprocess_splits(data_path, use_cache)
+
+    work_dir = tempfile.mkdtemp(prefix="train_search_")
+    try:
+        for name, array in (("X_train", X_train), ("y_train", y_train), ("X_test", X_test), ("y_test", y_test)):
+            np.save(os.path.join(work_dir, f"{name}.npy"), np.ascontiguousarray(array, dtype=np.float32))
+        logger.info(f"Searching {len(configs)} configurations on {workers} workers x {threads_per_worker} threads")
+
+        results = []
+        os.makedirs(os.path.dirname(leaderboard_path) or ".", exist_ok=True)
+        # spawn, not fork: TensorFlow is not fork-safe
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(work_dir, threads_per_worker)
+        ) as pool:
+            futures = {pool.submit(train_trial, trial, config, work_dir): config for trial, config in enumerate(configs)}
+            for future in as_completed(futures):
+                try:
+                    row = future.result()
+                except Exception as e:
+                    logger.error(f"Trial {futures[future]} failed: {str(e)}")
+                    continue
+                results.append(row)
+                # Append as trials finish so an interrupted search still leaves its results
+                pd.DataFrame([row]).drop(columns="model_path").to_csv(
+                    leaderboard_path, mode="a" if len(results) > 1 else "w", header=len(results) == 1, index=False
+                )
+                logger.info(
+                    f"Trial {row['trial']} ({len(results)}/{len(configs)}): val_loss {row['val_loss']:.4f}, "
+                    f"val_mae {row['val_mae']:.4f}, {row['epochs']} epochs in {row['seconds']} s"
+                )
+        if not results:
+            raise RuntimeError("Every trial failed")
+
+        leaderboard = pd.DataFrame(results).sort_values("val_loss").reset_index(drop=True)
+        leaderboard.insert(0, "rank", range(1, len(leaderboard) + 1))
+        leaderboard.drop(columns="model_path").to_csv(leaderboard_path, index=False)
+        logger.info(f"Leaderboard written to {leaderboard_path}:\n{leaderboard.drop(columns='model_path').head(10)}")
+
+        best = leaderboard.iloc[0].to_dict()
+        scaler, encoder = train_model.fitted_transformers(preprocessor)
+        train_model.save_artifacts(
+            load_keras_model(best["model_path"]), train_model.fit_linear_model(X_train, y_train),
+            scaler, encoder, feature_names, categorical_features, numerical_features
+        )
+        logger.info(f"Saved trial {best['trial']} as the model")
+    finally:
+        # Remove the .npy copies and trial models even when the search fails or is interrupted
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return best
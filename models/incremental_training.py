@@ -0,0 +1,221 @@
+"""Incremental warm-start retraining from new database rows.
+
+Each run starts from the published model (the version named in
+models/CURRENT, or the flat models/ artifacts before the first run). It pulls
+only the exam rows whose exam_id is above that model's watermark. The rows
+are fine-tuned on for a few epochs together with a replay sample of older
+rows, and the result is published as a new version. Run time follows the
+number of new rows, not the size of the database:
+
+- The scaler statistics are updated with partial_fit on the new rows. The
+  encoder vocabularies stay fixed, because the network's input width
+  depends on them; unseen categories encode to zeros, as they do when
+  predicting.
+- Older data is represented by a bounded reservoir sample (replay.csv) that
+  every version carries forward. It is updated with the new rows.
+- Artifacts go to models/versions/<version>/ along with training_state.json
+  (watermark, parent version, row counts). CURRENT is switched only after
+  everything is written, so the predictor never sees a partial version.
+- A full retrain removes CURRENT and records the database's max exam_id in
+  models/training_state.json, so the next incremental run starts from there.
+
+Usage (from models/):
+    python train_model.py --incremental
+"""
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+from tensorflow.keras.optimizers import Adam
+
+import train_model
+import training_data
+from numpy_engine import load_keras_model
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "training_state.json"
+REPLAY_FILE = "replay.csv"
+FINE_TUNE_EPOCHS = 5
+FINE_TUNE_LEARNING_RATE = 1e-4
+# Rows kept in the replay reservoir
+REPLAY_SIZE = 20000
+# Replay rows mixed in per new row
+REPLAY_RATIO = 1.0
+
+def current_version_dir():
+    """Directory of the published artifacts: the CURRENT version, else the flat MODEL_DIR"""
+    if os.path.exists(train_model.CURRENT_PATH):
+        with open(train_model.CURRENT_PATH) as f:
+            return os.path.join(train_model.VERSIONS_DIR, f.read().strip())
+    return train_model.MODEL_DIR
+
+def load_state(version_dir):
+    path = os.path.join(version_dir, STATE_FILE)
+    if not os.path.exists(path):
+        logger.warning(f"No {STATE_FILE} in {version_dir}; treating every database row as new")
+        return {"version": None, "watermark_exam_id": 0, "rows_seen": 0}
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(version_dir, state):
+    with open(os.path.join(version_dir, STATE_FILE), "w") as f:
+        json.dump(state, f, indent=2)
+
+def database_watermark():
+    """The database's current max exam_id, or None if the database can't be reached"""
+    try:
+        return training_data.max_exam_id()
+    except Exception as e:
+        logger.warning(f"Could not read the database watermark: {str(e)}")
+        return None
+
+def record_full_retrain(watermark):
+    """Write the state of the flat MODEL_DIR after a full retrain.
+
+    `watermark` is the max exam_id read before training started, so the next
+    incremental run only pulls rows added since. Without one (database
+    unreachable) any old state is removed and that run treats every row as new.
+    """
+    path = os.path.join(train_model.MODEL_DIR, STATE_FILE)
+    if watermark is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    save_state(train_model.MODEL_DIR, {
+        "version": None,
+        "parent": None,
+        "watermark_exam_id": int(watermark),
+        "rows_seen": 0,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+    logger.info(f"Recorded watermark exam_id {watermark} for incremental training")
+
+def load_replay(version_dir):
+    path = os.path.join(version_dir, REPLAY_FILE)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=training_data.FEATURES)
+    return training_data.prepare_chunk(pd.read_csv(path, dtype={c: str for c in training_data.CATEGORICAL_FEATURES}))
+
+def update_reservoir(replay, new_rows, rows_seen, rng):
+    """Reservoir sample (Algorithm R) of every row seen so far, after adding `new_rows`"""
+    new_rows = new_rows[training_data.FEATURES].reset_index(drop=True)
+    free = max(0, REPLAY_SIZE - len(replay))
+    replay = pd.concat([replay, new_rows.iloc[:free]], ignore_index=True)
+    rest = new_rows.iloc[free:]
+    if len(rest):
+        # Row k of the stream replaces a random slot with probability REPLAY_SIZE / (k + 1)
+        stream_index = rows_seen + free + np.arange(len(rest))
+        slots = rng.integers(0, stream_index + 1)
+        keep = slots < REPLAY_SIZE
+        replay.iloc[slots[keep]] = rest[keep].to_numpy()
+    return replay
+
+def transform(scaler, encoder, rows):
+    """Model inputs and targets for rows, like the fitted ColumnTransformer"""
+    encoded = encoder.transform(rows[training_data.CATEGORICAL_FEATURES])
+    if hasattr(encoded, 'toarray'):
+        encoded = encoded.toarray()
+    scores = rows[training_data.NUMERICAL_FEATURES]
+    features = np.hstack([scaler.transform(scores), encoded]).astype(np.float32)
+    return features, scores.mean(axis=1).to_numpy(dtype=np.float64)
+
+def new_version():
+    """Sortable, unique version name: UTC time to the microsecond plus a random suffix"""
+    return f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')}-{uuid.uuid4().hex[:8]}"
+
+def publish(version):
+    """Point CURRENT at `version` atomically"""
+    tmp_path = f"{train_model.CURRENT_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, train_model.CURRENT_PATH)
+
+def run_incremental(chunk_size=training_data.CHUNK_SIZE):
+    """Fine-tune the published model on rows added since its watermark and publish the result"""
+    base_dir = current_version_dir()
+    state = load_state(base_dir)
+    watermark = state["watermark_exam_id"]
+    logger.info(f"Warm-starting from {base_dir} (watermark exam_id {watermark})")
+
+    new_rows = [chunk for _, chunk in training_data.iter_db_chunks(chunk_size, after_exam_id=watermark)]
+    if not new_rows:
+        logger.info("No new rows since the last training run; nothing to publish")
+        return None
+    new_rows = pd.concat(new_rows, ignore_index=True)
+    logger.info(f"Pulled {len(new_rows)} new rows")
+
+    model = load_keras_model(train_model.artifact_path(train_model.MODEL_PATH, base_dir))
+    scaler = joblib.load(train_model.artifact_path(train_model.SCALER_PATH, base_dir))
+    encoder = joblib.load(train_model.artifact_path(train_model.ENCODER_PATH, base_dir))
+    feature_names = joblib.load(train_model.artifact_path(train_model.FEATURE_NAMES_PATH, base_dir))
+
+    validation_every = round(1 / train_model.TEST_SIZE)
+    is_train = training_data.is_training_row(0, len(new_rows), validation_every)
+    train_rows, validation_rows = new_rows[is_train], new_rows[~is_train]
+    if train_rows.empty:
+        logger.info("Too few new rows to fine-tune on; waiting for more")
+        return None
+
+    for values, column in zip(encoder.categories_, training_data.CATEGORICAL_FEATURES):
+        unseen = set(train_rows[column]) - set(values)
+        if unseen:
+            logger.warning(f"Unseen {column} values encode to zeros until a full retrain: {sorted(unseen)}")
+    scaler.partial_fit(train_rows[training_data.NUMERICAL_FEATURES])
+
+    rng = np.random.default_rng(train_model.RANDOM_STATE + watermark)
+    replay = load_replay(base_dir)
+    replay_count = min(len(replay), int(REPLAY_RATIO * len(train_rows)))
+    replay_sample = replay.sample(n=replay_count, random_state=rng.integers(2 ** 31)) if replay_count else replay
+    fit_rows = pd.concat([train_rows[training_data.FEATURES], replay_sample], ignore_index=True)
+    logger.info(f"Fine-tuning on {len(train_rows)} new and {len(replay_sample)} replayed rows")
+
+    X_fit, y_fit = transform(scaler, encoder, fit_rows)
+    # Every fifth new row (starting with the first) is held out, so this is never empty
+    validation = transform(scaler, encoder, validation_rows)
+
+    model.compile(optimizer=Adam(learning_rate=FINE_TUNE_LEARNING_RATE), loss='mse', metrics=['mae'])
+    before = model.evaluate(*validation, verbose=0)[1]
+    model.fit(
+        X_fit, y_fit,
+        validation_data=validation,
+        epochs=FINE_TUNE_EPOCHS,
+        batch_size=train_model.BATCH_SIZE,
+        verbose=1
+    )
+    after = model.evaluate(*validation, verbose=0)[1]
+    logger.info(f"Validation MAE on new rows: {before:.4f} before, {after:.4f} after")
+
+    # The linear model is exact on the target, so refitting it on the same rows loses nothing
+    linear_model = train_model.fit_linear_model(X_fit, y_fit)
+
+    version = new_version()
+    version_dir = os.path.join(train_model.VERSIONS_DIR, version)
+    # Claim the directory before writing into it; a concurrent run cannot get the same name
+    os.makedirs(version_dir)
+    train_model.save_artifacts(
+        model, linear_model, scaler, encoder, feature_names,
+        training_data.CATEGORICAL_FEATURES, training_data.NUMERICAL_FEATURES, model_dir=version_dir
+    )
+    update_reservoir(replay, train_rows, state["rows_seen"], rng).to_csv(
+        os.path.join(version_dir, REPLAY_FILE), index=False
+    )
+    new_state = {
+        "version": version,
+        "parent": state["version"],
+        "watermark_exam_id": int(new_rows["exam_id"].max()),
+        "rows_seen": state["rows_seen"] + len(train_rows),
+        "new_rows": len(new_rows),
+        "replay_rows": len(replay_sample),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    save_state(version_dir, new_state)
+
+    publish(version)
+    logger.info(f"Published model version {version} (watermark exam_id {new_state['watermark_exam_id']})")
+    return version
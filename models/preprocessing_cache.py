@@ -0,0 +1,109 @@
+"""Content-addressed cache of preprocessed training matrices.
+
+An entry is keyed by a hash of everything that determines the output of
+train_model.preprocess_splits:
+- the bytes of the input CSV;
+- the feature lists;
+- the split parameters (TEST_SIZE, RANDOM_STATE);
+- PREPROCESS_VERSION;
+- the NumPy, pandas and scikit-learn versions.
+
+Repeat runs, CI runs and hyperparameter sweeps on unchanged data therefore skip
+straight to model.fit.
+
+Each entry is a directory holding:
+- the train/test matrices and targets as .npy files, loaded memory-mapped;
+- the fitted ColumnTransformer;
+- meta.json with the feature names and the key's inputs.
+
+Entries are written under a temporary name and renamed into place, so a
+concurrent or interrupted run never reads a partial entry. Delete the cache
+directory to clear it.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv(
+    "PREPROCESS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".preprocess_cache")
+)
+# Bump when create_preprocessor or load_and_preprocess_data change what they produce
+PREPROCESS_VERSION = 1
+ARRAYS = ("X_train", "X_test", "y_train", "y_test")
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """sha256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_key(data_path: str, categorical_features: Sequence[str], numerical_features: Sequence[str],
+              test_size: float, random_state: int) -> Tuple[str, dict]:
+    """(key, the inputs it was computed from)"""
+    inputs = {
+        "data_sha256": file_digest(data_path),
+        "categorical_features": list(categorical_features),
+        "numerical_features": list(numerical_features),
+        "test_size": test_size,
+        "random_state": random_state,
+        "preprocess_version": PREPROCESS_VERSION,
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+    key = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()[:32]
+    return key, inputs
+
+def load(key: str, cache_dir: str = CACHE_DIR) -> Optional[tuple]:
+    """The cached preprocess_splits result for `key` with memory-mapped matrices, or None"""
+    entry = os.path.join(cache_dir, key)
+    if not os.path.isdir(entry):
+        return None
+    with open(os.path.join(entry, "meta.json")) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+    preprocessor = joblib.load(os.path.join(entry, "preprocessor.joblib"))
+    return (
+        arrays["X_train"], arrays["X_test"], arrays["y_train"], arrays["y_test"], preprocessor,
+        meta["feature_names"], meta["inputs"]["categorical_features"], meta["inputs"]["numerical_features"]
+    )
+
+def store(key: str, inputs: dict, result: tuple, cache_dir: str = CACHE_DIR):
+    """Write a preprocess_splits result as the entry for `key`"""
+    X_train, X_test, y_train, y_test, preprocessor, feature_names, _, _ = result
+    entry = os.path.join(cache_dir, key)
+    tmp_entry = os.path.join(cache_dir, f".{key}.{uuid.uuid4().hex}.tmp")
+    os.makedirs(tmp_entry)
+    try:
+        for name, array in zip(ARRAYS, (X_train, X_test, y_train, y_test)):
+            np.save(os.path.join(tmp_entry, f"{name}.npy"), np.ascontiguousarray(array))
+        joblib.dump(preprocessor, os.path.join(tmp_entry, "preprocessor.joblib"))
+        with open(os.path.join(tmp_entry, "meta.json"), "w") as f:
+            json.dump({
+                "feature_names": list(feature_names),
+                "inputs": inputs,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }, f, indent=2)
+        os.rename(tmp_entry, entry)
+    except OSError:
+        # Another run stored the same key first; its entry is identical
+        if not os.path.isdir(entry):
+            raise
+    finally:
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+    logger.info(f"Cached preprocessed matrices in {entry}")
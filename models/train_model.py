@@ -9,7 +9,9 @@ from tensorflow.keras.layers import Dense, Dropout
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping
 import joblib
+import argparse
 import os
+import sys
 import logging
 
 # Configure logging
@@ -25,19 +27,43 @@ MODEL_DIR = "models"
 MODEL_PATH = os.path.join(MODEL_DIR, "student_performance_nn_model.h5")
 SCALER_PATH = os.path.join(MODEL_DIR, "scaler.pkl")
 ENCODER_PATH = os.path.join(MODEL_DIR, "encoder.pkl")
+FEATURE_NAMES_PATH = os.path.join(MODEL_DIR, "feature_names.pkl")
+NUMPY_WEIGHTS_PATH = os.path.join(MODEL_DIR, "student_performance_nn_weights.npz")
+BUNDLE_PATH = os.path.join(MODEL_DIR, "student_performance_nn.bundle")
+LINEAR_WEIGHTS_PATH = os.path.join(MODEL_DIR, "student_performance_linear.npz")
+LINEAR_BUNDLE_PATH = os.path.join(MODEL_DIR, "student_performance_linear.bundle")
+# Incremental training publishes versions/<version>/ and names the live one in CURRENT
+VERSIONS_DIR = os.path.join(MODEL_DIR, "versions")
+CURRENT_PATH = os.path.join(MODEL_DIR, "CURRENT")
+# The bundle format and NumPy engine are defined next to the predictor that reads them (Task 3)
+PREDICT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Task 3")
+if PREDICT_DIR not in sys.path:
+    sys.path.append(PREDICT_DIR)
+
+from model_bundle import save_model_bundle
+from numpy_engine import NumpyMLP
+import training_data
+import preprocessing_cache
+
 RANDOM_STATE = 42
 TEST_SIZE = 0.2
 EPOCHS = 100
 BATCH_SIZE = 32
+HIDDEN_UNITS = (64, 32, 16)
+DROPOUT = 0.2
+LEARNING_RATE = 0.001
+EARLY_STOPPING_PATIENCE = 10
+# Streaming mode: batch size for passes that only read the data (validation, linear fit)
+EVAL_BATCH_SIZE = 4096
 
-def load_and_preprocess_data():
+def load_and_preprocess_data(data_path=DATA_PATH):
     """Load and preprocess the dataset"""
     logger.info("Loading dataset")
-    df = pd.read_csv(DATA_PATH)
+    df = pd.read_csv(data_path)
     
     # Define features and target
-    categorical_features = ['gender', 'race/ethnicity', 'parental level of education', 'lunch', 'test preparation course']
-    numerical_features = ['math score', 'reading score', 'writing score']
+    categorical_features = training_data.CATEGORICAL_FEATURES
+    numerical_features = training_data.NUMERICAL_FEATURES
     
     # Create target (average score)
     df['average_score'] = df[['math score', 'reading score', 'writing score']].mean(axis=1)
@@ -67,90 +93,318 @@ def create_preprocessor(categorical_features, numerical_features):
     
     return preprocessor
 
-def build_model(input_shape):
-    """Build neural network model"""
-    logger.info("Building neural network model")
-    
-    model = Sequential([
-        Dense(64, activation='relu', input_shape=(input_shape,)),
-        Dropout(0.2),
-        Dense(32, activation='relu'),
-        Dropout(0.2),
-        Dense(16, activation='relu'),
-        Dense(1)  # Regression output
-    ])
+def build_model(input_shape, units=HIDDEN_UNITS, dropout=DROPOUT, learning_rate=LEARNING_RATE):
+    """Build neural network model: ReLU layers of `units`, with Dropout between them"""
+    logger.info(f"Building neural network model {list(units)}, dropout {dropout}, learning rate {learning_rate}")
+    
+    layers = [Dense(units[0], activation='relu', input_shape=(input_shape,))]
+    for width in units[1:]:
+        layers += [Dropout(dropout), Dense(width, activation='relu')]
+    layers.append(Dense(1))  # Regression output
+    model = Sequential(layers)
     
     model.compile(
-        optimizer=Adam(learning_rate=0.001),
+        optimizer=Adam(learning_rate=learning_rate),
         loss='mse',
         metrics=['mae']
     )
     
     return model
 
-def save_artifacts(model, preprocessor, X_train):
+def fit_linear_model(X_train_preprocessed, y_train):
+    """Fit the closed-form linear backend by least squares on the preprocessed matrix"""
+    logger.info("Fitting linear model")
+    return NumpyMLP.fit_linear(X_train_preprocessed, np.asarray(y_train))
+
+def evaluate_models(models, batches):
+    """Log MAE, RMSE and max absolute error of each model over (features, target) test batches"""
+    totals = {name: [0, 0.0, 0.0, 0.0] for name in models}  # rows, sum |e|, sum e^2, max |e|
+    for features, targets in batches:
+        y_true = np.asarray(targets, dtype=np.float64).reshape(-1)
+        for name, model in models.items():
+            errors = np.asarray(model.predict(features, verbose=0), dtype=np.float64).reshape(-1) - y_true
+            total = totals[name]
+            total[0] += len(errors)
+            total[1] += np.sum(np.abs(errors))
+            total[2] += np.sum(errors ** 2)
+            total[3] = max(total[3], np.max(np.abs(errors), initial=0.0))
+    for name, (rows, abs_sum, sq_sum, max_error) in totals.items():
+        if rows:
+            logger.info(
+                f"{name} test MAE {abs_sum / rows:.4f}, RMSE {np.sqrt(sq_sum / rows):.4f}, "
+                f"max abs error {max_error:.4f}"
+            )
+
+def fitted_transformers(preprocessor):
+    """The fitted StandardScaler and OneHotEncoder inside the ColumnTransformer"""
+    return (
+        preprocessor.named_transformers_['num'].named_steps['scaler'],
+        preprocessor.named_transformers_['cat'].named_steps['onehot']
+    )
+
+def artifact_path(path, model_dir=MODEL_DIR):
+    """One of the *_PATH artifacts, placed in `model_dir`"""
+    return os.path.join(model_dir, os.path.basename(path))
+
+def save_artifacts(model, linear_model, scaler, encoder, feature_names, categorical_features, numerical_features,
+                   model_dir=MODEL_DIR):
     """Save model and preprocessing artifacts"""
-    logger.info("Saving model and preprocessing artifacts")
+    logger.info(f"Saving model and preprocessing artifacts to {model_dir}")
     
-    os.makedirs(MODEL_DIR, exist_ok=True)
+    os.makedirs(model_dir, exist_ok=True)
     
     # Save neural network model
-    model.save(MODEL_PATH)
+    model.save(artifact_path(MODEL_PATH, model_dir))
+    
+    # Save Dense weights as plain arrays for the NumPy inference engine (Task 3/numpy_engine.py)
+    dense_layers = [layer for layer in model.layers if isinstance(layer, Dense)]
+    weights = {"activations": np.array([layer.get_config()["activation"] for layer in dense_layers])}
+    for i, layer in enumerate(dense_layers):
+        weights[f"kernel_{i}"], weights[f"bias_{i}"] = layer.get_weights()
+    np.savez(artifact_path(NUMPY_WEIGHTS_PATH, model_dir), **weights)
     
     # Save scaler for numerical features
-    scaler = preprocessor.named_transformers_['num'].named_steps['scaler']
-    joblib.dump(scaler, SCALER_PATH)
+    joblib.dump(scaler, artifact_path(SCALER_PATH, model_dir))
     
     # Save encoder for categorical features
-    encoder = preprocessor.named_transformers_['cat'].named_steps['onehot']
-    joblib.dump(encoder, ENCODER_PATH)
+    joblib.dump(encoder, artifact_path(ENCODER_PATH, model_dir))
     
     # Save feature names for reference
-    joblib.dump(list(X_train.columns), os.path.join(MODEL_DIR, "feature_names.pkl"))
+    joblib.dump(list(feature_names), artifact_path(FEATURE_NAMES_PATH, model_dir))
+    
+    # Save everything the predictor needs as one checksummed, memory-mappable bundle
+    layers = [
+        (weights[f"kernel_{i}"], weights[f"bias_{i}"], str(activation))
+        for i, activation in enumerate(weights["activations"])
+    ]
+    bundle_path = artifact_path(BUNDLE_PATH, model_dir)
+    model_version = save_model_bundle(
+        bundle_path, layers, scaler, encoder,
+        numerical_features, categorical_features, list(feature_names)
+    )
+    logger.info(f"Saved model bundle {model_version} to {bundle_path}")
+    
+    # The linear backend shares the preprocessing, so it gets the same two formats
+    linear_model.save(artifact_path(LINEAR_WEIGHTS_PATH, model_dir))
+    linear_bundle_path = artifact_path(LINEAR_BUNDLE_PATH, model_dir)
+    linear_version = save_model_bundle(
+        linear_bundle_path, linear_model.layers, scaler, encoder,
+        numerical_features, categorical_features, list(feature_names)
+    )
+    logger.info(f"Saved linear model bundle {linear_version} to {linear_bundle_path}")
+
+def preprocess_splits(data_path=DATA_PATH, use_cache=True):
+    """Load the CSV, split it and preprocess both splits into dense matrices.
+
+    Returns (X_train_preprocessed, X_test_preprocessed, y_train, y_test, preprocessor,
+    feature_names, categorical_features, numerical_features); the targets are float arrays.
+    With use_cache, an unchanged CSV and configuration load memory-mapped matrices
+    from the preprocessing cache instead.
+    """
+    if use_cache:
+        key, inputs = preprocessing_cache.cache_key(
+            data_path, training_data.CATEGORICAL_FEATURES, training_data.NUMERICAL_FEATURES,
+            TEST_SIZE, RANDOM_STATE
+        )
+        cached = preprocessing_cache.load(key)
+        if cached is not None:
+            logger.info(f"Loaded preprocessed matrices from cache entry {key}")
+            return cached
+    
+    # Load and preprocess data
+    X, y, categorical_features, numerical_features = load_and_preprocess_data(data_path)
+    
+    # Create preprocessing pipeline
+    preprocessor = create_preprocessor(categorical_features, numerical_features)
+    
+    # Split data
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE
+    )
+    
+    # Preprocess data
+    X_train_preprocessed = preprocessor.fit_transform(X_train)
+    X_test_preprocessed = preprocessor.transform(X_test)
+    
+    # Convert sparse matrix to dense if needed
+    if hasattr(X_train_preprocessed, 'toarray'):
+        X_train_preprocessed = X_train_preprocessed.toarray()
+        X_test_preprocessed = X_test_preprocessed.toarray()
+    
+    result = (
+        X_train_preprocessed, X_test_preprocessed, np.asarray(y_train, dtype=np.float64),
+        np.asarray(y_test, dtype=np.float64), preprocessor, list(X_train.columns),
+        categorical_features, numerical_features
+    )
+    if use_cache:
+        preprocessing_cache.store(key, inputs, result)
+    return result
+
+def train_in_memory(data_path=DATA_PATH, use_cache=True):
+    """Load the whole CSV, preprocess it into dense matrices and train on them"""
+    (X_train_preprocessed, X_test_preprocessed, y_train, y_test, preprocessor,
+     feature_names, categorical_features, numerical_features) = preprocess_splits(data_path, use_cache)
+    
+    # Build and train model
+    model = build_model(X_train_preprocessed.shape[1])
+    
+    early_stopping = EarlyStopping(
+        monitor='val_loss',
+        patience=EARLY_STOPPING_PATIENCE,
+        restore_best_weights=True
+    )
+    
+    logger.info("Training model")
+    history = model.fit(
+        X_train_preprocessed, y_train,
+        validation_data=(X_test_preprocessed, y_test),
+        epochs=EPOCHS,
+        batch_size=BATCH_SIZE,
+        callbacks=[early_stopping],
+        verbose=1
+    )
+    
+    linear_model = fit_linear_model(X_train_preprocessed, y_train)
+    evaluate_models({"mlp": model, "linear": linear_model}, [(X_test_preprocessed, y_test)])
+    
+    # Save artifacts
+    scaler, encoder = fitted_transformers(preprocessor)
+    save_artifacts(model, linear_model, scaler, encoder, feature_names, categorical_features, numerical_features)
+
+def train_streaming(source, data_path=DATA_PATH, chunk_size=training_data.CHUNK_SIZE):
+    """Train from CSV shards or the database without holding the dataset in memory.
+
+    Peak memory is bounded by the chunk size, the shuffle buffer and the batch
+    size. The data is read three times: once for the scaler/encoder statistics,
+    once for the linear model and once per training epoch.
+    """
+    categorical_features = training_data.CATEGORICAL_FEATURES
+    numerical_features = training_data.NUMERICAL_FEATURES
+    validation_every = round(1 / TEST_SIZE)
+    
+    def chunks():
+        if source == "db":
+            return training_data.iter_db_chunks(chunk_size)
+        return training_data.iter_csv_chunks(data_path, chunk_size)
+    
+    def records():
+        if source == "db":
+            return training_data.db_records(chunk_size)
+        return training_data.csv_records(data_path)
+    
+    logger.info(f"Fitting scaler and encoder statistics over {source} chunks")
+    scaler, encoder, train_rows = training_data.fit_preprocessors(chunks(), validation_every)
+    logger.info(f"Fitted preprocessing on {train_rows} training rows")
+    
+    train = training_data.make_dataset(
+        records(), scaler, encoder, "train", BATCH_SIZE, validation_every, seed=RANDOM_STATE
+    )
+    validation = training_data.make_dataset(
+        records(), scaler, encoder, "validation", EVAL_BATCH_SIZE, validation_every
+    )
+    
+    logger.info("Fitting linear model")
+    accumulator = training_data.LinearAccumulator()
+    linear_pass = training_data.make_dataset(
+        records(), scaler, encoder, "train", EVAL_BATCH_SIZE, validation_every, shuffle_buffer=1
+    )
+    for features, targets in linear_pass.as_numpy_iterator():
+        accumulator.update(features, targets)
+    linear_model = NumpyMLP([(*accumulator.solve(), "linear")])
+    
+    input_shape = len(numerical_features) + sum(len(values) for values in encoder.categories_)
+    model = build_model(input_shape)
+    
+    early_stopping = EarlyStopping(
+        monitor='val_loss',
+        patience=EARLY_STOPPING_PATIENCE,
+        restore_best_weights=True
+    )
+    
+    logger.info("Training model")
+    model.fit(
+        train,
+        validation_data=validation,
+        epochs=EPOCHS,
+        callbacks=[early_stopping],
+        verbose=1
+    )
+    
+    evaluate_models({"mlp": model, "linear": linear_model}, validation.as_numpy_iterator())
+    save_artifacts(model, linear_model, scaler, encoder, training_data.FEATURES,
+                   categorical_features, numerical_features)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the student performance models")
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Train out of core: fit preprocessing over chunks and feed tf.data mini-batches"
+    )
+    parser.add_argument(
+        "--source", choices=["csv", "db"], default="csv",
+        help="Streaming mode: read CSV files (--data) or the API database (DATABASE_URL)"
+    )
+    parser.add_argument(
+        "--data", default=DATA_PATH,
+        help="Training CSV; in streaming mode a glob of CSV shards is also accepted"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=training_data.CHUNK_SIZE,
+        help="Streaming mode: rows per chunk in the statistics pass and per database fetch"
+    )
+    parser.add_argument(
+        "--search", choices=["grid", "random"],
+        help="Train many build_model configurations in parallel and keep the best (hyperparameter_search.py)"
+    )
+    parser.add_argument(
+        "--no-preprocess-cache", dest="preprocess_cache", action="store_false",
+        help="Always re-run preprocessing instead of loading cached matrices (preprocessing_cache.py)"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Fine-tune the published model on database rows added since its watermark (incremental_training.py)"
+    )
+    parser.add_argument("--trials", type=int, default=20, help="Random search: configurations to try")
+    parser.add_argument(
+        "--workers", type=int,
+        help="Search: worker processes (default: cores / threads per worker)"
+    )
+    parser.add_argument(
+        "--threads-per-worker", type=int, default=1,
+        help="Search: TensorFlow threads per worker process"
+    )
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     try:
-        # Load and preprocess data
-        X, y, categorical_features, numerical_features = load_and_preprocess_data()
+        import incremental_training
+        if args.incremental:
+            incremental_training.run_incremental(args.chunk_size)
+            return
         
-        # Create preprocessing pipeline
-        preprocessor = create_preprocessor(categorical_features, numerical_features)
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE
-        )
-        
-        # Preprocess data
-        X_train_preprocessed = preprocessor.fit_transform(X_train)
-        X_test_preprocessed = preprocessor.transform(X_test)
-        
-        # Convert sparse matrix to dense if needed
-        if hasattr(X_train_preprocessed, 'toarray'):
-            X_train_preprocessed = X_train_preprocessed.toarray()
-            X_test_preprocessed = X_test_preprocessed.toarray()
-        
-        # Build and train model
-        model = build_model(X_train_preprocessed.shape[1])
-        
-        early_stopping = EarlyStopping(
-            monitor='val_loss',
-            patience=10,
-            restore_best_weights=True
-        )
-        
-        logger.info("Training model")
-        history = model.fit(
-            X_train_preprocessed, y_train,
-            validation_data=(X_test_preprocessed, y_test),
-            epochs=EPOCHS,
-            batch_size=BATCH_SIZE,
-            callbacks=[early_stopping],
-            verbose=1
-        )
+        # Read before training, so rows added while it runs are left for the next incremental run
+        watermark = incremental_training.database_watermark()
+
+        if args.search:
+            import hyperparameter_search
+            configs = (
+                hyperparameter_search.grid_configs() if args.search == "grid"
+                else hyperparameter_search.random_configs(args.trials)
+            )
+            hyperparameter_search.run_search(
+                configs, args.data, args.workers, args.threads_per_worker, use_cache=args.preprocess_cache
+            )
+        elif args.stream:
+            train_streaming(args.source, args.data, args.chunk_size)
+        else:
+            train_in_memory(args.data, args.preprocess_cache)
         
-        # Save artifacts
-        save_artifacts(model, preprocessor, X_train)
+        # The flat artifacts just written supersede any incrementally published version
+        if os.path.exists(CURRENT_PATH):
+            os.remove(CURRENT_PATH)
+            logger.info(f"Removed {CURRENT_PATH}; the predictor now loads {MODEL_DIR}")
+        incremental_training.record_full_retrain(watermark)
         
         logger.info(f"Model training complete. Artifacts saved to {MODEL_DIR}")
         
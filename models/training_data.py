@@ -0,0 +1,283 @@
+"""Out-of-core training data for train_model.py.
+
+Rows come from StudentsPerformance-format CSV files or straight from the API's
+database (students joined with exams and test preparation), so the training
+set never has to fit in memory:
+
+- fit_preprocessors makes one pass over pandas chunks. It fits the
+  StandardScaler with partial_fit and collects each categorical column's
+  vocabulary for the OneHotEncoder.
+- make_dataset builds a tf.data pipeline of preprocessed mini-batches. CSV
+  shards are parsed in parallel, batches are encoded in parallel with TF ops
+  equivalent to the fitted scaler/encoder, and batches are prefetched while
+  the model trains.
+
+Every row with index % validation_every == 0 within its file (or within the
+query, for the database) is held out for validation, in both passes.
+"""
+import csv
+import glob
+import os
+import sys
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+# Rows per pandas chunk in the statistics pass and per database fetch
+CHUNK_SIZE = int(os.getenv("TRAIN_CHUNK_SIZE", "100000"))
+# Training rows held in the shuffle buffer
+SHUFFLE_BUFFER = 10000
+
+CATEGORICAL_FEATURES = ['gender', 'race/ethnicity', 'parental level of education', 'lunch', 'test preparation course']
+NUMERICAL_FEATURES = ['math score', 'reading score', 'writing score']
+FEATURES = CATEGORICAL_FEATURES + NUMERICAL_FEATURES
+# Missing values get the same defaults as the predictor's feature_row
+DEFAULTS = {
+    'gender': 'unknown',
+    'race/ethnicity': 'unknown',
+    'parental level of education': 'unknown',
+    'lunch': 'standard',
+    'test preparation course': 'none',
+    'math score': 0.0,
+    'reading score': 0.0,
+    'writing score': 0.0
+}
+
+# The SQLAlchemy models and engine live with the API (Task 2)
+API_DIR = os.getenv(
+    "API_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Task 2")
+)
+
+def csv_files(pattern: str) -> List[str]:
+    """The CSV shards matching `pattern` (a path or glob), in a fixed order"""
+    files = sorted(glob.glob(pattern))
+    if not files:
+        raise FileNotFoundError(f"No CSV files match {pattern}")
+    return files
+
+def prepare_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Feature columns with defaults filled in and scores as float32"""
+    chunk = chunk[FEATURES].fillna(DEFAULTS)
+    return chunk.astype({column: np.float32 for column in NUMERICAL_FEATURES})
+
+def iter_csv_chunks(pattern: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[int, pd.DataFrame]]:
+    """Yield (first row index within its file, chunk) for every CSV shard"""
+    for path in csv_files(pattern):
+        start = 0
+        for chunk in pd.read_csv(path, chunksize=chunk_size, dtype={c: str for c in CATEGORICAL_FEATURES}):
+            yield start, prepare_chunk(chunk)
+            start += len(chunk)
+
+def training_rows_query(after_exam_id: int = 0):
+    """One row per exam, with the student's attributes, in exam_id order"""
+    if API_DIR not in sys.path:
+        sys.path.append(API_DIR)
+    from sqlalchemy import func, select
+    from models import Student, TestPreparation, Exam
+
+    return (
+        select(
+            Exam.exam_id,
+            Student.gender.label('gender'),
+            Student.race_ethnicity.label('race/ethnicity'),
+            Student.parental_level_of_education.label('parental level of education'),
+            Student.lunch.label('lunch'),
+            func.coalesce(TestPreparation.status, 'none').label('test preparation course'),
+            Exam.math_score.label('math score'),
+            Exam.reading_score.label('reading score'),
+            Exam.writing_score.label('writing score')
+        )
+        .join(Exam, Exam.student_id == Student.student_id)
+        .outerjoin(TestPreparation, TestPreparation.student_id == Student.student_id)
+        .where(Exam.exam_id > after_exam_id)
+        .order_by(Exam.exam_id)
+    )
+
+def iter_db_chunks(chunk_size: int = CHUNK_SIZE, after_exam_id: int = 0) -> Iterator[Tuple[int, pd.DataFrame]]:
+    """Yield (first row index, chunk) of exam rows after `after_exam_id`, streamed through a server-side cursor.
+
+    Chunks keep the exam_id column next to the features.
+    """
+    if API_DIR not in sys.path:
+        sys.path.append(API_DIR)
+    from database import engine
+
+    start = 0
+    with engine.connect().execution_options(stream_results=True) as connection:
+        for chunk in pd.read_sql(training_rows_query(after_exam_id), connection, chunksize=chunk_size):
+            prepared = prepare_chunk(chunk)
+            prepared['exam_id'] = chunk['exam_id'].to_numpy()
+            yield start, prepared
+            start += len(chunk)
+
+def max_exam_id() -> int:
+    """The highest exam_id in the database, 0 if there are no exams"""
+    if API_DIR not in sys.path:
+        sys.path.append(API_DIR)
+    from sqlalchemy import func, select
+    from database import engine
+    from models import Exam
+
+    with engine.connect() as connection:
+        return connection.execute(select(func.max(Exam.exam_id))).scalar() or 0
+
+def is_training_row(start: int, length: int, validation_every: int) -> np.ndarray:
+    """Mask of training rows in a chunk whose first row has index `start`"""
+    return (np.arange(start, start + length) % validation_every) != 0
+
+def encoder_from_categories(categories: Sequence[Sequence[str]],
+                            categorical_features: Sequence[str] = CATEGORICAL_FEATURES) -> OneHotEncoder:
+    """A fitted OneHotEncoder with exactly these vocabularies, as fit_transform would have produced"""
+    encoder = OneHotEncoder(categories=[list(values) for values in categories], handle_unknown='ignore')
+    # fit only checks the values against the given categories; any frame covering them will do
+    longest = max(len(values) for values in categories)
+    frame = pd.DataFrame({
+        name: [values[i % len(values)] for i in range(longest)]
+        for name, values in zip(categorical_features, categories)
+    })
+    return encoder.fit(frame)
+
+def fit_preprocessors(chunks: Iterator[Tuple[int, pd.DataFrame]], validation_every: int):
+    """Fit the scaler and collect vocabularies over the training rows of `chunks`, one chunk in memory at a time.
+
+    Returns (scaler, encoder, training row count).
+    """
+    scaler = StandardScaler()
+    seen = [set() for _ in CATEGORICAL_FEATURES]
+    rows = 0
+    for start, chunk in chunks:
+        chunk = chunk[is_training_row(start, len(chunk), validation_every)]
+        if chunk.empty:
+            continue
+        scaler.partial_fit(chunk[NUMERICAL_FEATURES])
+        for values, column in zip(seen, CATEGORICAL_FEATURES):
+            values.update(chunk[column].unique())
+        rows += len(chunk)
+    if rows == 0:
+        raise ValueError("No training rows found")
+    return scaler, encoder_from_categories([sorted(values) for values in seen]), rows
+
+def shard_header(files: List[str]) -> List[str]:
+    """The header every CSV shard shares; raises ValueError if one differs or lacks a feature column.
+
+    csv_records selects columns by position, so all shards need the same layout.
+    """
+    header = None
+    for path in files:
+        with open(path, newline="") as f:
+            columns = next(csv.reader(f), [])
+        if header is None:
+            missing = [column for column in FEATURES if column not in columns]
+            if missing:
+                raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+            header = columns
+        elif columns != header:
+            raise ValueError(f"{path} header {columns} differs from {files[0]} header {header}")
+    return header
+
+def csv_records(pattern: str):
+    """tf.data of (row index within file, {column: value}) parsed from CSV shards in parallel"""
+    import tensorflow as tf
+
+    files = csv_files(pattern)
+    header = shard_header(files)
+    # CsvDataset returns selected columns in file order
+    selected = sorted(header.index(column) for column in FEATURES)
+    names = [header[i] for i in selected]
+    defaults = [
+        tf.constant(DEFAULTS[name], dtype=tf.float32 if name in NUMERICAL_FEATURES else tf.string)
+        for name in names
+    ]
+
+    def read_file(path):
+        rows = tf.data.experimental.CsvDataset(path, defaults, header=True, select_cols=selected)
+        return rows.map(lambda *values: dict(zip(names, values))).enumerate()
+
+    # deterministic keeps the row order (and so the shuffle) reproducible
+    return tf.data.Dataset.from_tensor_slices(files).interleave(
+        read_file, cycle_length=min(len(files), 8), num_parallel_calls=tf.data.AUTOTUNE, deterministic=True
+    )
+
+def db_records(chunk_size: int = CHUNK_SIZE, after_exam_id: int = 0):
+    """tf.data of (row index, {column: value}) streamed from the database in chunks"""
+    import tensorflow as tf
+
+    def chunks():
+        for _, chunk in iter_db_chunks(chunk_size, after_exam_id):
+            yield {column: chunk[column].to_numpy() for column in FEATURES}
+
+    signature = {
+        column: tf.TensorSpec(shape=(None,), dtype=tf.float32 if column in NUMERICAL_FEATURES else tf.string)
+        for column in FEATURES
+    }
+    return tf.data.Dataset.from_generator(chunks, output_signature=signature).unbatch().enumerate()
+
+def batch_encoder(scaler: StandardScaler, encoder: OneHotEncoder):
+    """TF function mapping a batch {column: values} to (features, target) like the fitted ColumnTransformer.
+
+    Numerical columns are standardized, then each categorical column is one-hot
+    encoded in the encoder's category order; unknown values encode to all zeros
+    (handle_unknown='ignore'). The target is the average of the three scores.
+    """
+    import tensorflow as tf
+
+    mean = tf.constant(scaler.mean_, dtype=tf.float32)
+    scale = tf.constant(scaler.scale_, dtype=tf.float32)
+    tables = [
+        tf.lookup.StaticHashTable(
+            tf.lookup.KeyValueTensorInitializer(
+                tf.constant([str(value) for value in values]), tf.range(len(values), dtype=tf.int64)
+            ),
+            default_value=-1
+        )
+        for values in encoder.categories_
+    ]
+
+    def encode(batch: Dict[str, "tf.Tensor"]):
+        scores = tf.stack([batch[column] for column in NUMERICAL_FEATURES], axis=1)
+        parts = [(scores - mean) / scale]
+        for table, values, column in zip(tables, encoder.categories_, CATEGORICAL_FEATURES):
+            parts.append(tf.one_hot(table.lookup(batch[column]), len(values), dtype=tf.float32))
+        return tf.concat(parts, axis=1), tf.reduce_mean(scores, axis=1)
+
+    return encode
+
+def make_dataset(records, scaler: StandardScaler, encoder: OneHotEncoder, subset: str, batch_size: int,
+                 validation_every: int, shuffle_buffer: int = SHUFFLE_BUFFER, seed: int = None):
+    """Preprocessed (features, target) mini-batches of the "train" or "validation" rows of `records`"""
+    import tensorflow as tf
+
+    training = subset == "train"
+    held_out = tf.not_equal if training else tf.equal
+    rows = records.filter(lambda index, row: held_out(index % validation_every, 0))
+    rows = rows.map(lambda index, row: row)
+    if training:
+        rows = rows.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    return (
+        rows.batch(batch_size)
+        .map(batch_encoder(scaler, encoder), num_parallel_calls=tf.data.AUTOTUNE)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+
+class LinearAccumulator:
+    """Least squares over batches through the normal equations; memory is one (d+1)^2 matrix"""
+
+    def __init__(self):
+        self.gram = None
+        self.moment = None
+
+    def update(self, features: np.ndarray, targets: np.ndarray):
+        design = np.hstack([np.asarray(features, dtype=np.float64), np.ones((len(features), 1))])
+        if self.gram is None:
+            self.gram = np.zeros((design.shape[1], design.shape[1]))
+            self.moment = np.zeros(design.shape[1])
+        self.gram += design.T @ design
+        self.moment += design.T @ np.asarray(targets, dtype=np.float64).reshape(-1)
+
+    def solve(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(kernel, bias) of the fit; lstsq gives the min-norm solution like NumpyMLP.fit_linear"""
+        coef, *_ = np.linalg.lstsq(self.gram, self.moment, rcond=None)
+        return coef[:-1].reshape(-1, 1), coef[-1:]
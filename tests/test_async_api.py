@@ -0,0 +1,68 @@
+import uuid
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")  # sqlalchemy.ext.asyncio
+
+
+@pytest.fixture(scope="module")
+def async_client(client):
+    """TestClient for async_main.app on the same database as `client`"""
+    from fastapi.testclient import TestClient
+    import async_main
+
+    with TestClient(async_main.app) as async_client:
+        yield async_client
+
+
+@pytest.mark.parametrize("path", [
+    "/students/changes?limit=5",
+    "/students/unscored?limit=5",
+    "/students/export",
+    "/students/export?format=csv",
+])
+def test_async_routes_match_the_sync_ones(client, async_client, create_students, path):
+    create_students(6)
+    expected = client.get(path)
+    response = async_client.get(path)
+
+    assert response.status_code == expected.status_code == 200
+    assert response.text == expected.text
+    assert response.headers.get("x-next-cursor") == expected.headers.get("x-next-cursor")
+
+
+def test_async_bulk_predictions(async_client, create_students):
+    first, second = create_students(2)
+    version = f"v-{uuid.uuid4().hex[:8]}"
+    records = [
+        {"student_id": first, "prediction": 70.0, "model_version": version},
+        {"student_id": second, "prediction": 60.0, "model_version": version},
+        {"student_id": 10 ** 9, "prediction": 50.0, "model_version": version},
+    ]
+    body = async_client.post("/predictions/bulk", json=records).json()
+    assert [result["status"] for result in body["results"]] == ["created", "created", "error"]
+
+    body = async_client.post("/predictions/bulk", params={"upsert": "true"}, json=records[:1]).json()
+    assert (body["created"], body["updated"]) == (0, 1)
+
+
+def test_async_student_reads_fill_the_cache(async_client, create_students):
+    from cache import student_cache, student_key
+
+    (student_id,) = create_students(1)
+    assert async_client.get(f"/students/{student_id}").json()["student_id"] == student_id
+    assert student_cache.get(student_key(student_id))["student_id"] == student_id
+
+    async_client.post("/predictions/bulk", json=[{"student_id": student_id, "prediction": 1.0}])
+    assert student_cache.get(student_key(student_id)) is None
+
+
+def test_async_predict_without_a_model(async_client):
+    response = async_client.post("/predict", json={
+        "gender": "female", "race_ethnicity": "group B", "parental_level_of_education": "high school",
+        "lunch": "standard", "test_preparation_course": "none",
+        "math_score": 70, "reading_score": 70, "writing_score": 70
+    })
+    assert response.status_code == 503
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("numpy")
+
+import async_client
+from async_client import AsyncPredictionClient
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(async_client, "BACKOFF_BASE", 0)
+
+
+def save(handler, predictions, model_version=None, **kwargs):
+    """Run save_predictions against `handler(request) -> httpx.Response`; returns (results, client)"""
+    async def scenario():
+        async with AsyncPredictionClient("http://api", **kwargs) as client:
+            await client._client.aclose()
+            client._client = httpx.AsyncClient(base_url="http://api", transport=httpx.MockTransport(handler))
+            return await client.save_predictions(predictions, model_version=model_version), client
+    return asyncio.run(scenario())
+
+
+def test_server_errors_are_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503 if len(calls) == 1 else 200, json={})
+
+    (result,), client = save(handler, [(7, 55.5)])
+    assert result.ok and result.attempts == 2
+    assert client.latency_summary()["requests"] == 2
+    assert json.loads(calls[-1].content)["student_id"] == 7
+
+
+def test_client_errors_are_not_retried():
+    (result,), _ = save(lambda request: httpx.Response(422, text="bad"), [(7, 55.5)])
+    assert not result.ok
+    assert result.attempts == 1
+    assert result.error == "HTTP 422: bad"
+
+
+def test_network_errors_use_every_attempt():
+    def handler(request):
+        raise httpx.ConnectError("refused")
+
+    (result,), _ = save(handler, [(7, 55.5)], max_retries=3)
+    assert not result.ok and result.attempts == 3
+    assert "refused" in result.error
+
+
+def test_versioned_predictions_are_upserted():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={})
+
+    save(handler, [(1, 50.0)], model_version="v1")
+    save(handler, [(1, 50.0)])
+    assert requests[0].url.params.get("upsert") == "true"
+    assert "upsert" not in requests[1].url.params
+
+
+def test_saves_run_concurrently_up_to_the_limit():
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json={})
+
+    results, _ = save(handler, [(student_id, 50.0) for student_id in range(10)], concurrency=3)
+    assert [result.student_id for result in results] == list(range(10))
+    assert all(result.ok for result in results)
+    assert peak == 3
@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+for module in ("numpy", "pandas", "joblib", "sklearn", "requests", "httpx"):
+    pytest.importorskip(module)
+
+import pandas as pd
+
+import batch_score
+
+CSV_HEADER = ('"gender","race/ethnicity","parental level of education","lunch",'
+              '"test preparation course","math score","reading score","writing score"\n')
+
+
+def write_csv(path, math_scores):
+    with open(path, "w") as f:
+        f.write(CSV_HEADER)
+        for score in math_scores:
+            f.write(f'"female","group B","high school","standard","none",{score},70,70\n')
+    return str(path)
+
+
+class FakePredictor:
+    """Predicts the math score; later chunks finish first to exercise the in-order writer"""
+    fail_at = None
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def predict_rows(self, rows):
+        first = rows[0]["math score"]
+        if first == self.fail_at:
+            raise RuntimeError("model failed")
+        time.sleep(max(0.0, 0.05 - first / 1000))
+        return [row["math score"] for row in rows]
+
+
+class InlinePool(ThreadPoolExecutor):
+    """The process pool's interface on threads, so the test needs no model artifacts in spawned workers"""
+    peak_pending = 0
+
+    def __init__(self, max_workers, mp_context, initializer, initargs):
+        super().__init__(max_workers=max_workers, initializer=initializer, initargs=initargs)
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self.lock:
+            self.pending += 1
+            InlinePool.peak_pending = max(InlinePool.peak_pending, self.pending)
+        future = super().submit(fn, *args)
+        future.add_done_callback(self.done)
+        return future
+
+    def done(self, future):
+        with self.lock:
+            self.pending -= 1
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    monkeypatch.setattr(batch_score, "ProcessPoolExecutor", InlinePool)
+    monkeypatch.setattr(batch_score.predict, "NeuralNetworkPredictor", FakePredictor)
+    monkeypatch.setattr(batch_score, "configure_logging", lambda **kwargs: None)
+    monkeypatch.setattr(InlinePool, "peak_pending", 0)
+    monkeypatch.setattr(FakePredictor, "fail_at", None)
+
+
+def test_rows_are_written_in_input_order(tmp_path, fake_pool):
+    source = write_csv(tmp_path / "in.csv", range(40))
+    output = tmp_path / "out.csv"
+
+    assert batch_score.score_file(source, str(output), "csv", chunk_size=5, workers=2) == 40
+
+    scored = pd.read_csv(output)
+    assert list(scored["math score"]) == list(range(40))
+    assert list(scored[batch_score.PREDICTION_COLUMN]) == list(range(40))
+    assert list(scored.columns[:-1]) == batch_score.MODEL_COLUMNS
+    # Bounded read-ahead: never more than workers * CHUNKS_PER_WORKER chunks queued
+    assert InlinePool.peak_pending <= 2 * batch_score.CHUNKS_PER_WORKER
+
+
+def test_failed_chunk_leaves_no_output(tmp_path, fake_pool):
+    FakePredictor.fail_at = 20
+    source = write_csv(tmp_path / "in.csv", range(40))
+    output = tmp_path / "out.csv"
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        batch_score.score_file(source, str(output), "csv", chunk_size=5, workers=2)
+
+    assert list(tmp_path.iterdir()) == [tmp_path / "in.csv"]
+
+
+def test_read_chunks_defaults_missing_values(tmp_path):
+    source = tmp_path / "in.csv"
+    source.write_text(CSV_HEADER + '"female",,"high school",,"none",50,,70\n')
+
+    (chunk,) = batch_score.read_chunks(str(source), chunk_size=10)
+
+    row = chunk.iloc[0]
+    assert (row["race/ethnicity"], row["lunch"], row["reading score"]) == ("unknown", "standard", 0.0)
+
+
+def test_read_chunks_rejects_missing_columns(tmp_path):
+    source = tmp_path / "in.csv"
+    source.write_text('"gender","math score"\n"female",50\n')
+
+    with pytest.raises(ValueError, match="missing columns: race/ethnicity"):
+        next(batch_score.read_chunks(str(source), chunk_size=10))
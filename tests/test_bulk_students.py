@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import event
+
+from conftest import student_record
+from database import engine
+
+
+@pytest.mark.parametrize("batch_key", [False, True])
+def test_bulk_students_get_their_own_ids(client, monkeypatch, batch_key):
+    if batch_key:
+        # Without RETURNING the ids are read back by batch key, as on MySQL in interleaved lock mode
+        monkeypatch.setattr(engine.dialect, "insert_executemany_returning", False)
+    records = [student_record(math_score=score) for score in (10, 20, 30)]
+    records.insert(1, student_record(math_score=101))
+
+    body = client.post("/students/bulk", json=records).json()
+
+    assert (body["created"], body["failed"]) == (3, 1)
+    assert body["results"][1]["student_id"] is None
+    assert "math_score" in body["results"][1]["error"]
+    for index, score in ((0, 10), (2, 20), (3, 30)):
+        student = client.get(f"/students/{body['results'][index]['student_id']}").json()
+        assert student["exams"][0]["math_score"] == score
+
+
+def test_batch_key_inserts_each_chunk_in_one_statement(client, monkeypatch):
+    monkeypatch.setattr(engine.dialect, "insert_executemany_returning", False)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO STUDENTS"):
+            statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        body = client.post("/students/bulk", json=[student_record(math_score=score) for score in range(50)]).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(statements) == 1
+    ids = [result["student_id"] for result in body["results"]]
+    assert ids == sorted(ids) and len(set(ids)) == 50
+    assert client.get(f"/students/{ids[-1]}").json()["exams"][0]["math_score"] == 49
+
+
+def test_too_many_records(client, monkeypatch):
+    import main
+    monkeypatch.setattr(main, "BULK_MAX_RECORDS", 2)
+    assert client.post("/students/bulk", json=[student_record()] * 3).status_code == 413
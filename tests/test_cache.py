@@ -0,0 +1,107 @@
+import cache
+from cache import LocalRedis, LRUCache, NullCache, SharedCache, create_cache, student_key
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert lru.stats()["evictions"] == 1
+
+
+def test_lru_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    lru = LRUCache(max_entries=10, ttl=5)
+    lru.set("a", 1)
+    now[0] += 6
+    assert lru.get("a") is None
+    assert lru.stats()["expirations"] == 1
+
+
+def test_lru_invalidate_counts_only_present_keys():
+    lru = LRUCache(max_entries=10, ttl=60)
+    lru.set(student_key(1), {"student_id": 1})
+    lru.invalidate(student_key(1), student_key(2))
+    assert lru.get(student_key(1)) is None
+    assert lru.stats()["invalidations"] == 1
+
+
+def test_shared_cache_round_trip_and_invalidate():
+    shared = SharedCache(LocalRedis(), ttl=60)
+    shared.set(student_key(1), {"student_id": 1})
+    assert shared.get(student_key(1)) == {"student_id": 1}
+    shared.invalidate(student_key(1))
+    assert shared.get(student_key(1)) is None
+    stats = shared.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 1, 1)
+
+
+def test_shared_cache_clear_keeps_other_keys(monkeypatch):
+    monkeypatch.setattr(cache, "CLEAR_BATCH_SIZE", 2)
+    client = LocalRedis()
+    client.set("other-service:session", b"keep")
+    shared = SharedCache(client, ttl=60)
+    for student_id in range(5):
+        shared.set(student_key(student_id), student_id)
+
+    shared.clear()
+
+    assert all(shared.get(student_key(student_id)) is None for student_id in range(5))
+    assert client.get("other-service:session") == b"keep"
+    assert client.dbsize() == 1
+
+
+
+def test_shared_cache_counts_only_its_own_entries():
+    client = LocalRedis()
+    client.set("other-service:session", b"keep")
+    shared = SharedCache(client, ttl=60)
+    shared.set(student_key(1), 1)
+    shared.set(student_key(2), 2)
+    assert shared.stats()["entries"] == 2
+
+class FailingClient:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("Redis is down")
+        return fail
+
+
+def test_shared_cache_survives_an_unreachable_server():
+    shared = SharedCache(FailingClient(), ttl=60)
+    shared.set("key", 1)
+    assert shared.get("key") is None
+    shared.invalidate("key")
+    assert shared.stats()["errors"] == 3
+
+
+def test_create_cache_backends():
+    assert isinstance(create_cache("memory"), LRUCache)
+    assert isinstance(create_cache("redis-local"), SharedCache)
+    assert isinstance(create_cache("none"), NullCache)
+
+
+def test_new_prediction_invalidates_the_cached_student(client, create_students):
+    (student_id,) = create_students(1)
+    client.get(f"/students/{student_id}")
+    assert cache.student_cache.get(student_key(student_id)) is not None
+
+    response = client.post("/predictions/", json={
+        "student_id": student_id, "prediction": 80.0, "prediction_date": "2024-05-01T12:00:00"
+    })
+    assert response.status_code == 200
+
+    assert cache.student_cache.get(student_key(student_id)) is None
+
+
+def test_deleting_a_student_invalidates_the_cache(client, create_students):
+    (student_id,) = create_students(1)
+    assert client.get(f"/students/{student_id}").status_code == 200
+    assert client.delete(f"/students/{student_id}").status_code == 200
+    assert client.get(f"/students/{student_id}").status_code == 404
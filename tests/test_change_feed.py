@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic")
+
+from crud import decode_watermark, encode_cursor, encode_watermark, get_student
+from database import SessionLocal
+
+
+@pytest.mark.parametrize("updated_at", [
+    datetime(2024, 5, 1, 12, 30, 0, 123456),
+    datetime(2024, 5, 1, 12, 30, 0, tzinfo=timezone.utc),
+])
+def test_watermark_round_trip(updated_at):
+    assert decode_watermark(encode_watermark(updated_at, 17)) == (updated_at, 17)
+
+
+def test_plain_timestamp_is_a_watermark_without_student_id():
+    assert decode_watermark("2024-05-01T12:30:00") == (datetime(2024, 5, 1, 12, 30), None)
+
+
+@pytest.mark.parametrize("since", ["yesterday", encode_cursor(5), "MjAyNC0wNS0wMXx4"])
+def test_decode_watermark_rejects_malformed_input(since):
+    # MjAyNC0wNS0wMXx4 is "2024-05-01|x"
+    with pytest.raises(ValueError):
+        decode_watermark(since)
+
+
+def test_change_feed_pages_by_watermark(client, create_students):
+    created = create_students(3)
+    with SessionLocal() as db:
+        first = get_student(db, created[0])
+        since = encode_watermark(first.updated_at, first.student_id - 1)
+
+    seen = []
+    while True:
+        body = client.get("/students/changes", params={"since": since, "limit": 2}).json()
+        seen.extend(item["student_id"] for item in body["items"])
+        since = body["next_watermark"]
+        if not body["has_more"]:
+            break
+    assert seen[:3] == created
+    assert len(seen) == len(set(seen))
+
+    # A finished feed hands back the same watermark
+    body = client.get("/students/changes", params={"since": since}).json()
+    assert body["items"] == [] and body["next_watermark"] == since
+
+
+def test_invalid_watermark_is_a_bad_request(client):
+    assert client.get("/students/changes", params={"since": "yesterday"}).status_code == 400
@@ -0,0 +1,41 @@
+import uuid
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy.exc import IntegrityError
+
+from conftest import student_record
+from direct_db import DatabaseStore
+
+
+def test_pages_can_be_saved_while_iterating(client):
+    response = client.post("/students/bulk", json=[student_record(math_score=i % 101) for i in range(250)])
+    ids = {result["student_id"] for result in response.json()["results"]}
+    store = DatabaseStore()
+    version = f"v-{uuid.uuid4().hex[:8]}"
+
+    seen = []
+    for page in store.iter_unscored_pages(limit=100):
+        assert 0 < len(page) <= 100
+        assert all(student["exams"]["math_score"] is not None for student in page)
+        seen.extend(student["student_id"] for student in page)
+        # Saving before the next page is fetched must not hit a lock held by the read
+        assert store.save_predictions_bulk([(student["student_id"], 50.0) for student in page],
+                                           model_version=version, upsert=True) == len(page)
+
+    assert len(seen) == len(set(seen))
+    assert ids <= set(seen)
+    assert list(store.iter_unscored_pages(limit=100)) == []
+
+
+def test_failed_save_raises(client, create_students):
+    (student_id,) = create_students(1)
+    store = DatabaseStore()
+    version = f"v-{uuid.uuid4().hex[:8]}"
+    store.save_predictions_bulk([(student_id, 50.0)], model_version=version)
+
+    # Without upsert the unique (student_id, model_version) index rejects the second row
+    with pytest.raises(IntegrityError):
+        store.save_predictions_bulk([(student_id, 60.0)], model_version=version)
@@ -0,0 +1,47 @@
+import csv
+import io
+import json
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import func, select
+
+from crud import EXPORT_COLUMNS, iter_student_export
+from database import SessionLocal
+from models import Student
+
+
+def test_ndjson_export_has_one_line_per_exam(client, create_students):
+    created = create_students(3)
+    response = client.get("/students/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    by_id = {row["student_id"]: row for row in rows}
+    assert all(list(row) == EXPORT_COLUMNS for row in rows)
+    assert [by_id[student_id]["math_score"] for student_id in created] == [0, 1, 2]
+    assert by_id[created[0]]["test_preparation"] == "none"
+
+
+def test_csv_export_matches_ndjson(client, create_students):
+    create_students(2)
+    ndjson = [json.loads(line) for line in client.get("/students/export").text.splitlines()]
+    response = client.get("/students/export", params={"format": "csv"})
+    assert response.headers["content-disposition"] == "attachment; filename=students.csv"
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == len(ndjson)
+    assert [int(row["student_id"]) for row in rows] == [row["student_id"] for row in ndjson]
+
+
+def test_export_is_read_in_chunks(create_students):
+    create_students(5)
+    with SessionLocal() as db:
+        chunks = [list(chunk) for chunk in iter_student_export(db, chunk_size=2)]
+        # Every student in these tests has exactly one exam, so one row each
+        total = db.execute(select(func.count()).select_from(Student)).scalar()
+    assert all(len(chunk) <= 2 for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) == total
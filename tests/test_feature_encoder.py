@@ -0,0 +1,58 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from feature_encoder import CompiledFeatureEncoder, probe_rows, verify_against_sklearn
+
+NUMERICAL = ["math score", "reading score", "writing score"]
+CATEGORICAL = ["gender", "race/ethnicity", "lunch"]
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        "gender": rng.choice(["female", "male"], 200),
+        "race/ethnicity": rng.choice(["group A", "group B", "group C"], 200),
+        "lunch": rng.choice(["standard", "free/reduced"], 200),
+        **{name: rng.integers(0, 101, 200).astype(float) for name in NUMERICAL},
+    })
+    scaler = StandardScaler().fit(frame[NUMERICAL])
+    encoder = OneHotEncoder(handle_unknown="ignore").fit(frame[CATEGORICAL])
+    return scaler, encoder, CompiledFeatureEncoder.from_sklearn(scaler, encoder, NUMERICAL, CATEGORICAL)
+
+
+def test_matches_sklearn_on_probe_rows(fitted):
+    scaler, encoder, compiled = fitted
+    assert verify_against_sklearn(compiled, scaler, encoder)
+
+
+def test_unknown_category_encodes_to_zeros(fitted):
+    _, _, compiled = fitted
+    row = {"gender": "unknown", "race/ethnicity": "group B", "lunch": "standard",
+           "math score": 50.0, "reading score": 60.0, "writing score": 70.0}
+    encoded = compiled.encode_row(row)[0]
+    gender = slice(compiled.offsets[0], compiled.offsets[1])
+    assert not encoded[gender].any()
+    assert encoded[compiled.lookups[1]["group B"]] == 1.0
+    assert encoded[len(NUMERICAL):].sum() == 2.0
+
+
+def test_rows_and_frame_agree(fitted):
+    _, _, compiled = fitted
+    rows = probe_rows(compiled)
+    assert np.array_equal(compiled.encode_rows(rows), compiled.encode_frame(pd.DataFrame(rows)))
+
+
+def test_output_buffer_is_reused(fitted):
+    _, _, compiled = fitted
+    rows = probe_rows(compiled)[:8]
+    out = np.full((8, compiled.n_features), 9.0, dtype=np.float32)
+    assert compiled.encode_rows(rows, out=out) is out
+    assert np.array_equal(out, compiled.encode_rows(rows))
+    with pytest.raises(ValueError):
+        compiled.encode_rows(rows, out=np.zeros((8, compiled.n_features)))
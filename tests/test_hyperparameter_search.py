@@ -0,0 +1,89 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("tensorflow")
+
+import hyperparameter_search
+from hyperparameter_search import grid_configs, random_configs, run_search
+
+SPACE = {"units": [(8,), (8, 4)], "dropout": [0.0, 0.1], "learning_rate": [1e-3], "batch_size": [16, 32]}
+
+
+def test_grid_covers_every_combination():
+    configs = grid_configs(SPACE)
+    assert len(configs) == 8
+    assert configs[0] == {"units": (8,), "dropout": 0.0, "learning_rate": 1e-3, "batch_size": 16}
+    assert len({tuple(config.values()) for config in configs}) == 8
+
+
+def test_random_configs_are_distinct_reproducible_and_capped():
+    drawn = random_configs(5, SPACE, seed=1)
+    assert len({tuple(config.values()) for config in drawn}) == 5
+    assert drawn == random_configs(5, SPACE, seed=1)
+    assert len(random_configs(100, SPACE)) == 8
+
+
+class ThreadPool(ThreadPoolExecutor):
+    """The process pool's interface on threads, so trials can be faked in-process"""
+
+    def __init__(self, max_workers, mp_context, initializer, initargs):
+        super().__init__(max_workers=max_workers, initializer=initializer, initargs=initargs)
+
+
+@pytest.fixture
+def fake_search(monkeypatch):
+    """Fake the data, the trials and the artifact saving; returns the calls seen"""
+    seen = {"work_dirs": [], "saved": []}
+    X = np.arange(20, dtype=np.float32).reshape(10, 2)
+    y = X.sum(axis=1)
+    monkeypatch.setattr(hyperparameter_search.train_model, "preprocess_splits",
+                        lambda data_path, use_cache: (X, X, y, y, None, ["a", "b"], [], ["a", "b"]))
+    monkeypatch.setattr(hyperparameter_search.train_model, "fitted_transformers", lambda preprocessor: (None, None))
+    monkeypatch.setattr(hyperparameter_search.train_model, "save_artifacts",
+                        lambda model, *args: seen["saved"].append(model))
+    monkeypatch.setattr(hyperparameter_search, "load_keras_model", lambda path: f"loaded {os.path.basename(path)}")
+    monkeypatch.setattr(hyperparameter_search, "ProcessPoolExecutor", ThreadPool)
+    monkeypatch.setattr(hyperparameter_search, "init_worker",
+                        lambda data_dir, threads: seen["work_dirs"].append(data_dir))
+
+    def train_trial(trial, config, output_dir):
+        if config["dropout"] == 0.1:
+            raise RuntimeError("diverged")
+        assert np.load(os.path.join(output_dir, "X_train.npy")).shape == (10, 2)
+        return {"trial": trial, "val_loss": 1.0 / config["batch_size"], "val_mae": 0.5, "epochs": 3, "seconds": 0.1,
+                "units": "-".join(map(str, config["units"])), "dropout": config["dropout"],
+                "learning_rate": config["learning_rate"], "batch_size": config["batch_size"],
+                "model_path": os.path.join(output_dir, f"trial_{trial}.h5")}
+    monkeypatch.setattr(hyperparameter_search, "train_trial", train_trial)
+    return seen
+
+
+def test_search_ranks_trials_and_saves_the_best(tmp_path, fake_search):
+    leaderboard_path = str(tmp_path / "leaderboard.csv")
+    configs = grid_configs(SPACE)
+
+    best = run_search(configs, workers=2, leaderboard_path=leaderboard_path)
+
+    leaderboard = pd.read_csv(leaderboard_path)
+    # Failed trials are left out; the rest are ranked by validation loss
+    assert len(leaderboard) == 4
+    assert leaderboard["rank"].tolist() == [1, 2, 3, 4]
+    assert leaderboard["val_loss"].is_monotonic_increasing
+    assert "model_path" not in leaderboard.columns
+    assert best["batch_size"] == 32
+    assert fake_search["saved"] == [f"loaded trial_{best['trial']}.h5"]
+    assert not any(os.path.exists(work_dir) for work_dir in fake_search["work_dirs"])
+
+
+def test_search_fails_when_every_trial_fails(tmp_path, fake_search):
+    configs = [config for config in grid_configs(SPACE) if config["dropout"] == 0.1]
+
+    with pytest.raises(RuntimeError, match="Every trial failed"):
+        run_search(configs, workers=2, leaderboard_path=str(tmp_path / "leaderboard.csv"))
+
+    assert fake_search["saved"] == []
+    assert fake_search["work_dirs"] and not any(os.path.exists(work_dir) for work_dir in fake_search["work_dirs"])
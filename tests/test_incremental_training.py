@@ -0,0 +1,70 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("tensorflow")
+
+import incremental_training
+from incremental_training import new_version, update_reservoir
+from training_data import FEATURES
+
+
+def rows(start, count):
+    return pd.DataFrame({
+        column: [f"{column}-{i}" for i in range(start, start + count)] for column in FEATURES
+    })
+
+
+def test_reservoir_fills_then_stays_bounded(monkeypatch):
+    monkeypatch.setattr(incremental_training, "REPLAY_SIZE", 10)
+    rng = np.random.default_rng(0)
+    replay = update_reservoir(pd.DataFrame(columns=FEATURES), rows(0, 6), 0, rng)
+    assert replay['gender'].tolist() == [f"gender-{i}" for i in range(6)]
+
+    replay = update_reservoir(replay, rows(6, 1000), 6, rng)
+    assert len(replay) == 10
+    assert replay['gender'].is_unique
+    # Rows stay whole when they replace a slot
+    assert (replay['gender'].str.split('-').str[1] == replay['lunch'].str.split('-').str[1]).all()
+    # Almost every slot has been replaced by a later row
+    assert (replay['gender'].str.split('-').str[1].astype(int) >= 6).sum() >= 8
+
+
+def test_versions_are_unique_and_sortable():
+    versions = [new_version() for _ in range(100)]
+    assert len(set(versions)) == 100
+    assert [version.split('-')[0] for version in versions] == sorted(version.split('-')[0] for version in versions)
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(incremental_training.train_model, "MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(incremental_training.train_model, "CURRENT_PATH", str(tmp_path / "CURRENT"))
+    return tmp_path
+
+
+def test_full_retrain_records_the_watermark(model_dir):
+    incremental_training.record_full_retrain(42)
+
+    state = incremental_training.load_state(incremental_training.current_version_dir())
+    assert state["watermark_exam_id"] == 42
+    assert (state["version"], state["rows_seen"]) == (None, 0)
+
+
+def test_full_retrain_without_a_watermark_drops_the_old_state(model_dir):
+    incremental_training.record_full_retrain(42)
+    incremental_training.record_full_retrain(None)
+
+    assert not (model_dir / incremental_training.STATE_FILE).exists()
+    assert incremental_training.load_state(str(model_dir))["watermark_exam_id"] == 0
+
+
+def test_database_watermark_is_the_max_exam_id(client, create_students):
+    from database import SessionLocal
+    from models import Exam
+
+    create_students(2)
+    with SessionLocal() as db:
+        expected = max(exam.exam_id for exam in db.query(Exam))
+
+    assert incremental_training.database_watermark() == expected
@@ -0,0 +1,97 @@
+import asyncio
+
+from inference import MicroBatcher
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def record(math_score):
+    """A student record shaped like PredictRequest.to_student_record's"""
+    return {"exams": [{"math_score": math_score, "reading_score": 0, "writing_score": 0}]}
+
+
+class Model:
+    """predict_batch stand-in that doubles the math score and remembers its batch sizes"""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, records):
+        self.batches.append(len(records))
+        if self.fail:
+            raise RuntimeError("model exploded")
+        return [student["exams"][0]["math_score"] * 2 for student in records]
+
+
+def test_concurrent_requests_share_forward_passes():
+    model = Model()
+
+    async def scenario():
+        batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=50)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(record(i)) for i in range(10))), batcher.stats()
+        finally:
+            await batcher.stop()
+
+    results, stats = run(scenario())
+    assert [prediction for prediction, _ in results] == [2.0 * i for i in range(10)]
+    assert model.batches == [4, 4, 2]
+    assert [batch_size for _, batch_size in results] == [4] * 8 + [2] * 2
+    assert (stats["requests"], stats["batches"], stats["max_seen_batch_size"]) == (10, 3, 4)
+
+
+def test_a_lone_request_waits_at_most_max_wait():
+    model = Model()
+
+    async def scenario():
+        batcher = MicroBatcher(model, max_batch_size=64, max_wait_ms=5)
+        batcher.start()
+        try:
+            return await asyncio.wait_for(batcher.submit(record(3)), timeout=1)
+        finally:
+            await batcher.stop()
+
+    assert run(scenario()) == (6.0, 1)
+
+
+def test_a_failed_batch_fails_each_of_its_requests():
+    model = Model(fail=True)
+
+    async def scenario():
+        batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=20)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(record(i)) for i in range(3)),
+                                        return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    results = run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+PREDICT_REQUEST = {
+    "gender": "female", "race_ethnicity": "group B", "parental_level_of_education": "bachelor's degree",
+    "lunch": "standard", "test_preparation_course": "none",
+    "math_score": 72, "reading_score": 72, "writing_score": 74,
+}
+
+
+def test_predict_without_a_model_is_unavailable(client):
+    assert client.post("/predict", json=PREDICT_REQUEST).status_code == 503
+
+
+def test_predict_runs_through_the_batcher(client, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    monkeypatch.setattr(main, "batcher", None)
+    monkeypatch.setattr(main, "create_batcher", lambda: MicroBatcher(Model(), max_wait_ms=1))
+    with TestClient(main.app) as app_client:
+        response = app_client.post("/predict", json=PREDICT_REQUEST)
+    assert response.status_code == 200
+    assert response.json() == {"prediction": 144.0, "batch_size": 1}
@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import model_bundle
+from model_bundle import BundleError, ModelBundle, write_bundle
+
+NUMERICAL = ["math score", "reading score", "writing score"]
+CATEGORICAL = ["gender", "lunch"]
+
+
+def bundle_arrays(hidden=4):
+    rng = np.random.default_rng(0)
+    inputs = len(NUMERICAL) + 2 + 2
+    return {
+        "scaler_mean": np.array([66.0, 69.0, 68.0]),
+        "scaler_scale": np.array([15.0, 14.6, 15.2]),
+        "categories_0": np.array(["female", "male"]),
+        "categories_1": np.array(["free/reduced", "standard"]),
+        "kernel_0": rng.standard_normal((inputs, hidden)).astype(np.float32),
+        "bias_0": rng.standard_normal(hidden).astype(np.float32),
+        "kernel_1": rng.standard_normal((hidden, 1)).astype(np.float32),
+        "bias_1": np.zeros(1, dtype=np.float32),
+    }
+
+
+METADATA = {
+    "numerical_features": NUMERICAL,
+    "categorical_features": CATEGORICAL,
+    "feature_names": CATEGORICAL + NUMERICAL,
+    "activations": ["relu", "linear"],
+}
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "model.bundle")
+    arrays = bundle_arrays()
+    version = write_bundle(path, arrays, METADATA)
+
+    bundle = ModelBundle(path, verify=True)
+    assert bundle.model_version == version
+    assert bundle.metadata == METADATA
+    assert bundle.categories == [["female", "male"], ["free/reduced", "standard"]]
+    for name, array in arrays.items():
+        assert np.array_equal(bundle.arrays[name], array)
+        assert bundle.arrays[name].ctypes.data % 64 == 0
+        assert not bundle.arrays[name].flags.writeable
+    assert [activation for _, _, activation in bundle.layers] == ["relu", "linear"]
+    bundle.close()
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_version_follows_the_contents(tmp_path):
+    arrays = bundle_arrays()
+    first = write_bundle(str(tmp_path / "a.bundle"), arrays, METADATA)
+    assert write_bundle(str(tmp_path / "b.bundle"), arrays, METADATA) == first
+    arrays["bias_1"] = np.ones(1, dtype=np.float32)
+    assert write_bundle(str(tmp_path / "c.bundle"), arrays, METADATA) != first
+
+
+def test_corruption_is_caught_only_when_verifying(tmp_path):
+    path = str(tmp_path / "model.bundle")
+    write_bundle(path, bundle_arrays(), METADATA)
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+
+    ModelBundle(path).close()
+    with pytest.raises(BundleError, match="checksum"):
+        ModelBundle(path, verify=True)
+
+
+def test_truncated_bundle_is_rejected(tmp_path):
+    path = str(tmp_path / "model.bundle")
+    write_bundle(path, bundle_arrays(), METADATA)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 8)
+    with pytest.raises(BundleError, match="truncated"):
+        ModelBundle(path)
+
+
+def test_not_a_bundle(tmp_path):
+    path = tmp_path / "model.h5"
+    path.write_bytes(b"\x89HDF\r\n\x1a\n" + b"\0" * 64)
+    with pytest.raises(BundleError, match="not a model bundle"):
+        ModelBundle(str(path))
+
+
+def test_inconsistent_layout_is_rejected(tmp_path):
+    arrays = bundle_arrays()
+    arrays["kernel_0"] = arrays["kernel_0"][:-1]
+    path = str(tmp_path / "model.bundle")
+    write_bundle(path, arrays, METADATA)
+    with pytest.raises(BundleError, match="kernel_0"):
+        ModelBundle(path)
+
+
+def test_failed_write_leaves_no_files(tmp_path, monkeypatch):
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(model_bundle.os, "replace", fail)
+    with pytest.raises(OSError):
+        write_bundle(str(tmp_path / "model.bundle"), bundle_arrays(), METADATA)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,44 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from numpy_engine import NumpyMLP
+
+
+def test_forward_pass_applies_relu_between_layers():
+    model = NumpyMLP([
+        (np.array([[1.0, -1.0]]), np.array([0.0, 0.0]), "relu"),
+        (np.array([[2.0], [3.0]]), np.array([1.0]), "linear"),
+    ])
+    assert model.predict(np.array([[2.0], [-2.0]])).tolist() == [[5.0], [7.0]]
+    assert model.predict(np.array([2.0])).shape == (1, 1)
+
+
+def test_fit_linear_recovers_an_exact_linear_target():
+    rng = np.random.default_rng(0)
+    features = rng.standard_normal((100, 3))
+    targets = features @ np.array([1.5, -2.0, 0.5]) + 4.0
+    model = NumpyMLP.fit_linear(features, targets)
+    np.testing.assert_allclose(model.predict(features)[:, 0], targets, rtol=1e-4, atol=1e-4)
+
+
+def test_fit_linear_handles_one_hot_groups():
+    # Two complete one-hot groups plus the intercept make the design rank-deficient
+    groups = np.array([[1, 0, 1, 0], [1, 0, 0, 1], [0, 1, 1, 0], [0, 1, 0, 1]] * 5, dtype=np.float64)
+    targets = groups @ np.array([10.0, 20.0, 1.0, 3.0])
+    model = NumpyMLP.fit_linear(groups, targets)
+    np.testing.assert_allclose(model.predict(groups)[:, 0], targets, rtol=1e-4, atol=1e-4)
+
+
+def test_save_and_load(tmp_path):
+    model = NumpyMLP([(np.ones((3, 2)), np.zeros(2), "relu"), (np.ones((2, 1)), np.ones(1), "linear")])
+    path = str(tmp_path / "weights.npz")
+    model.save(path)
+    loaded = NumpyMLP.load(path)
+    features = np.arange(6, dtype=np.float32).reshape(2, 3)
+    assert np.array_equal(loaded.predict(features), model.predict(features))
+
+
+def test_unsupported_activation():
+    with pytest.raises(ValueError):
+        NumpyMLP([(np.ones((1, 1)), np.zeros(1), "tanh")])
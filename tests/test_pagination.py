@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic")
+
+from crud import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("student_id", [0, 1, 42, 2 ** 40])
+def test_cursor_round_trip(student_id):
+    cursor = encode_cursor(student_id)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == student_id
+
+
+@pytest.mark.parametrize("cursor", ["", "garbage!", encode_cursor(1)[:-1] + "*", "aWQ6LTE", "eDox"])
+def test_decode_cursor_rejects_malformed_cursors(cursor):
+    # aWQ6LTE is "id:-1", eDox is "x:1"
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_cursor_pagination_visits_every_student_once(client, create_students):
+    created = create_students(5)
+    seen = []
+    cursor = encode_cursor(created[0] - 1)
+    while True:
+        response = client.get("/students/", params={"after_id": cursor, "limit": 2})
+        assert response.status_code == 200
+        seen.extend(student["student_id"] for student in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen[:5] == created
+    assert seen == sorted(set(seen))
+
+
+def test_page_loads_exams_and_test_preparation(client, create_students):
+    (student_id,) = create_students(1)
+    (student,) = client.get("/students/", params={"after_id": encode_cursor(student_id - 1), "limit": 1}).json()
+    assert student["student_id"] == student_id
+    assert student["test_preparation"] == "none"
+    assert len(student["exams"]) == 1
+
+
+def test_invalid_cursor_is_a_bad_request(client):
+    assert client.get("/students/", params={"after_id": "not-a-cursor"}).status_code == 400
@@ -0,0 +1,84 @@
+import json
+import logging
+import queue
+
+import pytest
+
+from pipeline_logging import SAMPLED, JsonFormatter, create_queue_handler
+
+
+@pytest.fixture
+def queued_logger(request):
+    """queued_logger(sample_rate) -> (logger, records): a DEBUG logger whose records land on `records`"""
+    logger = logging.getLogger(f"test_pipeline_logging.{request.node.name}")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    def create(sample_rate=1.0):
+        records = queue.SimpleQueue()
+        logger.addHandler(create_queue_handler(records, sample_rate=sample_rate))
+        return logger, records
+    yield create
+    logger.handlers.clear()
+
+
+def drain(records):
+    drained = []
+    while not records.empty():
+        drained.append(records.get())
+    return drained
+
+
+def test_sampled_records_are_dropped_and_others_kept(queued_logger):
+    logger, records = queued_logger(sample_rate=0.0)
+    for row in range(100):
+        logger.debug("row %s", row, extra=SAMPLED)
+    logger.info("batch done")
+
+    assert [record.getMessage() for record in drain(records)] == ["batch done"]
+
+
+def test_sample_rate_keeps_a_share_of_sampled_records(queued_logger, monkeypatch):
+    draws = iter([0.1, 0.3, 0.2, 0.9])
+    monkeypatch.setattr("pipeline_logging.random.random", lambda: next(draws))
+    logger, records = queued_logger(sample_rate=0.25)
+    for row in range(4):
+        logger.debug("row %s", row, extra=SAMPLED)
+
+    assert [record.getMessage() for record in drain(records)] == ["row 0", "row 2"]
+
+
+def test_arguments_are_resolved_when_logged(queued_logger):
+    logger, records = queued_logger()
+    row = {"math score": 70}
+    logger.debug("row %s", row)
+    row["math score"] = 90
+
+    (record,) = drain(records)
+    assert record.msg == "row {'math score': 70}"
+    assert record.args is None
+
+
+def test_exceptions_are_rendered_before_queueing(queued_logger):
+    logger, records = queued_logger()
+    try:
+        raise ValueError("bad row")
+    except ValueError:
+        logger.exception("scoring failed")
+
+    (record,) = drain(records)
+    assert record.exc_info is None
+    assert "ValueError: bad row" in record.exc_text
+    entry = json.loads(JsonFormatter().format(record))
+    assert "ValueError: bad row" in entry["exception"]
+
+
+def test_json_lines_keep_extra_fields_but_not_the_sampling_flag(queued_logger):
+    logger, records = queued_logger()
+    logger.debug("Prediction for %s", 7, extra={**SAMPLED, "student_id": 7})
+
+    entry = json.loads(JsonFormatter().format(drain(records)[0]))
+    assert entry["message"] == "Prediction for 7"
+    assert entry["level"] == "DEBUG"
+    assert entry["student_id"] == 7
+    assert "sampled" not in entry
@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+for module in ("numpy", "pandas", "joblib", "sklearn", "requests", "httpx"):
+    pytest.importorskip(module)
+
+import predict
+from predict import WatermarkStore, lag_window_start
+
+
+def test_lag_window_start():
+    assert lag_window_start("2024-05-01T12:00:30.250000", 60) == "2024-05-01T11:59:30.250000"
+    assert lag_window_start("2024-05-01T00:00:10+00:00", 30) == "2024-04-30T23:59:40+00:00"
+
+
+def test_watermark_store_round_trip(tmp_path):
+    store = WatermarkStore(str(tmp_path / "watermark.json"))
+    assert store.load() == {}
+    store.save("abc", "2024-05-01T12:00:00", {"7": "2024-05-01T12:00:00"})
+    state = store.load()
+    assert (state["watermark"], state["updated_at"], state["recent"]) == (
+        "abc", "2024-05-01T12:00:00", {"7": "2024-05-01T12:00:00"}
+    )
+    assert not (tmp_path / "watermark.json.tmp").exists()
+
+
+def test_unreadable_watermark_starts_over(tmp_path):
+    path = tmp_path / "watermark.json"
+    path.write_text("{not json")
+    assert WatermarkStore(str(path)).load() == {}
+
+
+class ChangeFeed:
+    """GET /students/changes over a fixed list of (student_id, updated_at), one page per call"""
+
+    def __init__(self, changes, page_size=2):
+        self.changes = changes
+        self.page_size = page_size
+        self.calls = []
+
+    def fetch_changes(self, since=None):
+        self.calls.append(since)
+        if since is None:
+            pending = self.changes
+        elif "|" in since:
+            # A watermark: resume after this (updated_at, student_id)
+            updated_at, student_id = since.rsplit("|", 1)
+            pending = [change for change in self.changes if (change[1], change[0]) > (updated_at, int(student_id))]
+        else:
+            # A plain timestamp: everything updated after it
+            pending = [change for change in self.changes if change[1] > since]
+        page = pending[:self.page_size]
+        return {
+            "items": [{"student_id": student_id, "updated_at": updated_at} for student_id, updated_at in page],
+            "next_watermark": f"{page[-1][1]}|{page[-1][0]}" if page else since,
+            "has_more": len(page) == self.page_size,
+        }
+
+
+class Predictor:
+    model_version = "test"
+
+    def __init__(self):
+        self.scored = []
+
+    def predict_records(self, students):
+        self.scored.extend(student["student_id"] for student in students)
+        return [50.0] * len(students)
+
+
+class Saver:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def save_predictions(self, predictions, model_version=None):
+        return [SimpleNamespace(ok=True) for _ in predictions]
+
+    def latency_summary(self):
+        return {}
+
+
+def test_change_feed_rereads_the_lag_window_without_rescoring(tmp_path, monkeypatch):
+    monkeypatch.setattr(predict, "AsyncPredictionClient", Saver)
+    store = WatermarkStore(str(tmp_path / "watermark.json"))
+    feed = ChangeFeed([(1, "2024-05-01T12:00:00"), (2, "2024-05-01T12:00:10"), (3, "2024-05-01T12:00:20")])
+    predictor = Predictor()
+
+    asyncio.run(predict.run_changes_async(feed, predictor, store, save_concurrency=1, lag=15))
+    assert predictor.scored == [1, 2, 3]
+    state = store.load()
+    assert state["updated_at"] == "2024-05-01T12:00:20"
+    # Only the changes inside the lag window are remembered
+    assert state["recent"] == {"2": "2024-05-01T12:00:10", "3": "2024-05-01T12:00:20"}
+
+    # Student 4 committed late, behind the position already passed; student 2 changed again
+    feed.changes = [
+        (1, "2024-05-01T12:00:00"), (4, "2024-05-01T12:00:15"), (3, "2024-05-01T12:00:20"), (2, "2024-05-01T12:00:30")
+    ]
+    predictor.scored = []
+
+    asyncio.run(predict.run_changes_async(feed, predictor, store, save_concurrency=1, lag=15))
+    assert feed.calls[-2] == "2024-05-01T12:00:05"
+    assert predictor.scored == [4, 2]
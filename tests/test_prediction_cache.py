@@ -0,0 +1,55 @@
+import pytest
+
+for module in ("numpy", "pandas", "joblib", "sklearn", "requests", "httpx"):
+    pytest.importorskip(module)
+
+from predict import PredictionCache
+
+NUMERICAL = ["math score", "reading score"]
+CATEGORICAL = ["gender", "lunch"]
+CATEGORIES = [["female", "male"], ["free/reduced", "standard"]]
+
+
+def bound_cache(max_entries=10, version="v1"):
+    cache = PredictionCache(max_entries)
+    cache.bind(version, CATEGORIES, NUMERICAL, CATEGORICAL)
+    return cache
+
+
+def row(gender="female", lunch="standard", math=70, reading=80):
+    return {"gender": gender, "lunch": lunch, "math score": math, "reading score": reading}
+
+
+def test_equal_inputs_share_a_key():
+    cache = bound_cache()
+    assert cache.key(row(math=70)) == cache.key(row(math=70.0))
+    assert cache.key(row(math=70)) != cache.key(row(math=71))
+    assert cache.key(row(gender="male")) != cache.key(row(gender="female"))
+    # Every unknown value encodes to zeros, so they share an entry
+    assert cache.key(row(gender="unknown")) == cache.key(row(gender="other"))
+
+
+@pytest.mark.parametrize("math", [70.5, -1, 101])
+def test_scores_outside_the_integer_range_are_not_cached(math):
+    assert bound_cache().key(row(math=math)) is None
+
+
+def test_hits_misses_and_eviction():
+    cache = bound_cache(max_entries=2)
+    keys = [cache.key(row(math=score)) for score in (1, 2, 3)]
+    cache.set_many([(keys[0], 10.0), (keys[1], 20.0)])
+    assert cache.get_many(keys[:2]) == [10.0, 20.0]
+    cache.set_many([(keys[2], 30.0)])
+    assert cache.get_many(keys + [None]) == [None, 20.0, 30.0, None]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["uncacheable"]) == (4, 1, 1, 1)
+
+
+def test_binding_another_model_version_empties_the_cache():
+    cache = bound_cache()
+    key = cache.key(row())
+    cache.set_many([(key, 50.0)])
+    cache.bind("v1", CATEGORIES, NUMERICAL, CATEGORICAL)
+    assert cache.get_many([key]) == [50.0]
+    cache.bind("v2", CATEGORIES, NUMERICAL, CATEGORICAL)
+    assert cache.get_many([key]) == [None]
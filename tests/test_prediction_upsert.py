@@ -0,0 +1,84 @@
+import uuid
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+import crud
+import main
+from database import SessionLocal
+from models import Prediction
+
+
+def new_version():
+    return f"v-{uuid.uuid4().hex[:8]}"
+
+
+def stored_predictions(version):
+    with SessionLocal() as db:
+        return {
+            (row.student_id, row.prediction)
+            for row in db.query(Prediction).filter(Prediction.model_version == version)
+        }
+
+
+def test_bulk_prediction_statuses(client, create_students):
+    first, second = create_students(2)
+    version = new_version()
+    response = client.post("/predictions/bulk", json=[{"student_id": first, "prediction": 70.0, "model_version": version}])
+    assert response.json()["results"] == [{"index": 0, "status": "created", "error": None}]
+
+    records = [
+        {"student_id": first, "prediction": 71.0, "model_version": version},
+        {"student_id": second, "prediction": 60.0, "model_version": version},
+        {"student_id": second, "prediction": 61.0, "model_version": version},
+        {"student_id": 10 ** 9, "prediction": 50.0, "model_version": version},
+        {"student_id": second, "prediction": 62.0},
+        {"student_id": second},
+    ]
+    body = client.post("/predictions/bulk", params={"upsert": "true"}, json=records).json()
+
+    statuses = [result["status"] for result in body["results"]]
+    assert statuses == ["updated", "superseded", "created", "error", "error", "error"]
+    assert (body["created"], body["updated"], body["failed"]) == (1, 1, 3)
+    assert "not found" in body["results"][3]["error"]
+    assert "model_version is required" in body["results"][4]["error"]
+    assert stored_predictions(version) == {(first, 71.0), (second, 61.0)}
+
+
+def test_bulk_prediction_without_upsert_rejects_stored_and_repeated_pairs(client, create_students):
+    (student_id,) = create_students(1)
+    version = new_version()
+    record = {"student_id": student_id, "prediction": 70.0, "model_version": version}
+    client.post("/predictions/bulk", json=[record])
+
+    body = client.post("/predictions/bulk", json=[record, {**record, "model_version": version + "b"},
+                                                  {**record, "model_version": version + "b"}]).json()
+
+    assert [result["status"] for result in body["results"]] == ["error", "created", "error"]
+    assert "upsert=true" in body["results"][0]["error"]
+    assert "Duplicate" in body["results"][2]["error"]
+
+
+def test_single_prediction_upsert_replaces_the_stored_row(client, create_students):
+    (student_id,) = create_students(1)
+    version = new_version()
+    for prediction in (70.0, 75.0):
+        response = client.post("/predictions/", params={"upsert": "true"},
+                               json={"student_id": student_id, "prediction": prediction, "model_version": version,
+                                     "prediction_date": "2024-01-01T00:00:00"})
+        assert response.status_code == 200
+
+    assert stored_predictions(version) == {(student_id, 75.0)}
+
+
+def test_unsupported_dialect_is_reported_as_not_implemented(client, create_students, monkeypatch):
+    def unsupported(*args, **kwargs):
+        raise crud.UnsupportedDialectError("upsert is not supported on this database")
+    monkeypatch.setattr(main, "create_predictions_bulk", unsupported)
+
+    (student_id,) = create_students(1)
+    response = client.post("/predictions/bulk", params={"upsert": "true"},
+                           json=[{"student_id": student_id, "prediction": 70.0, "model_version": new_version()}])
+
+    assert response.status_code == 501
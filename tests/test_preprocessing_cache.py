@@ -0,0 +1,50 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+pytest.importorskip("joblib")
+
+from sklearn.preprocessing import StandardScaler
+
+import preprocessing_cache
+
+CATEGORICAL = ['gender']
+NUMERICAL = ['math score']
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / "students.csv"
+    path.write_text("gender,math score\nfemale,70\nmale,65\n")
+    return str(path)
+
+
+def test_key_follows_the_data_and_parameters(data_path):
+    key, inputs = preprocessing_cache.cache_key(data_path, CATEGORICAL, NUMERICAL, 0.2, 42)
+    assert preprocessing_cache.cache_key(data_path, CATEGORICAL, NUMERICAL, 0.2, 42)[0] == key
+    assert preprocessing_cache.cache_key(data_path, CATEGORICAL, NUMERICAL, 0.3, 42)[0] != key
+    with open(data_path, "a") as f:
+        f.write("female,99\n")
+    assert preprocessing_cache.cache_key(data_path, CATEGORICAL, NUMERICAL, 0.2, 42)[0] != key
+    assert inputs["data_sha256"] != preprocessing_cache.file_digest(data_path)
+
+
+def test_store_and_load(data_path, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    key, inputs = preprocessing_cache.cache_key(data_path, CATEGORICAL, NUMERICAL, 0.2, 42)
+    assert preprocessing_cache.load(key, cache_dir) is None
+
+    arrays = [np.arange(6, dtype=np.float32).reshape(3, 2), np.ones((1, 2)), np.arange(3.0), np.zeros(1)]
+    preprocessor = StandardScaler().fit([[1.0], [3.0]])
+    preprocessing_cache.store(key, inputs, (*arrays, preprocessor, ["a", "b"], CATEGORICAL, NUMERICAL), cache_dir)
+    # A second writer of the same key finds the entry already there
+    preprocessing_cache.store(key, inputs, (*arrays, preprocessor, ["a", "b"], CATEGORICAL, NUMERICAL), cache_dir)
+
+    *loaded, loaded_preprocessor, feature_names, categorical, numerical = preprocessing_cache.load(key, cache_dir)
+    for expected, actual in zip(arrays, loaded):
+        assert isinstance(actual, np.memmap)
+        assert np.array_equal(actual, expected)
+    assert loaded_preprocessor.mean_.tolist() == [2.0]
+    assert (feature_names, categorical, numerical) == (["a", "b"], CATEGORICAL, NUMERICAL)
+    assert sorted(p.name for p in (tmp_path / "cache").iterdir()) == [key]
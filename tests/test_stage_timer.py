@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from stage_timer import StageTimings
+
+
+def test_stage_records_rows_set_inside_the_block():
+    timings = StageTimings()
+    with timings.stage("fetch") as stage:
+        stage.rows = 25
+    summary = timings.summary()["fetch"]
+    assert summary["calls"] == 1
+    assert summary["rows"] == 25
+
+
+def test_timed_counts_rows_of_the_result():
+    timings = StageTimings()
+
+    @timings.timed("normalize", rows=len)
+    def normalize(rows):
+        return list(rows)
+
+    assert normalize(range(4)) == [0, 1, 2, 3]
+    normalize(range(6))
+    summary = timings.summary()["normalize"]
+    assert (summary["calls"], summary["rows"]) == (2, 10)
+
+
+def test_summary_merges_every_thread():
+    timings = StageTimings()
+
+    def work():
+        for _ in range(100):
+            timings.record("predict", 0.001, rows=10)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    timings.record("predict", 0.005, rows=10)
+
+    summary = timings.summary()["predict"]
+    assert summary["calls"] == 401
+    assert summary["rows"] == 4010
+    assert summary["total_s"] == pytest.approx(0.405)
+
+
+def test_reset_clears_every_thread():
+    timings = StageTimings()
+    thread = threading.Thread(target=timings.record, args=("save", 0.01))
+    thread.start()
+    thread.join()
+    timings.record("save", 0.01)
+    timings.reset()
+    assert timings.summary() == {}
+
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+import crud
+
+
+def test_ids_filter_returns_only_those_students(client, create_students):
+    created = create_students(4)
+    wanted = [created[3], created[1], 10 ** 9]
+    response = client.get("/students/", params={"ids": wanted, "limit": len(wanted)})
+    assert [student["student_id"] for student in response.json()] == sorted(created[i] for i in (1, 3))
+
+
+def test_too_many_ids(client):
+    too_many = list(range(1, crud.STUDENT_IDS_MAX + 2))
+    assert client.get("/students/", params={"ids": too_many}).status_code == 400
+
+
+def test_predictor_fetches_ids_in_chunks(client, create_students, monkeypatch, caplog):
+    for module in ("numpy", "pandas", "joblib", "sklearn", "requests"):
+        pytest.importorskip(module)
+    import predict
+
+    created = create_students(5)
+    monkeypatch.setattr(predict, "API_BASE_URL", str(client.base_url))
+    api_client = predict.PredictionClient()
+    api_client.session = client
+
+    requested = created + [created[0], 10 ** 9]
+    chunks = list(api_client.iter_students_by_id(requested, chunk_size=2))
+
+    assert [[student["student_id"] for student in chunk] for chunk in chunks] == [
+        created[0:2], created[2:4], [created[4]]
+    ]
+    assert f"Students not found: [{10 ** 9}]" in caplog.text
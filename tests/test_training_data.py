@@ -0,0 +1,115 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+import training_data
+from numpy_engine import NumpyMLP
+from training_data import (
+    CATEGORICAL_FEATURES, NUMERICAL_FEATURES, LinearAccumulator, encoder_from_categories, fit_preprocessors,
+    is_training_row
+)
+
+
+def student_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'gender': rng.choice(['female', 'male'], rows),
+        'race/ethnicity': rng.choice(['group A', 'group B', 'group C', 'group D', 'group E'], rows),
+        'parental level of education': rng.choice(["some college", "high school", "master's degree"], rows),
+        'lunch': rng.choice(['standard', 'free/reduced'], rows),
+        'test preparation course': rng.choice(['none', 'completed'], rows),
+        **{name: rng.integers(0, 101, rows).astype(np.float32) for name in NUMERICAL_FEATURES},
+    })
+
+
+def chunks_of(frame, size):
+    return [(start, frame.iloc[start:start + size]) for start in range(0, len(frame), size)]
+
+
+def test_validation_rows_do_not_depend_on_chunking():
+    assert is_training_row(0, 6, 5).tolist() == [False, True, True, True, True, False]
+    assert is_training_row(3, 4, 5).tolist() == [True, True, False, True]
+
+
+def test_fit_preprocessors_matches_a_full_fit():
+    frame = student_frame(230)
+    scaler, encoder, rows = fit_preprocessors(iter(chunks_of(frame, 50)), validation_every=5)
+
+    training = frame[is_training_row(0, len(frame), 5)]
+    assert rows == len(training)
+    expected_scaler = StandardScaler().fit(training[NUMERICAL_FEATURES])
+    np.testing.assert_allclose(scaler.mean_, expected_scaler.mean_, rtol=1e-6)
+    np.testing.assert_allclose(scaler.scale_, expected_scaler.scale_, rtol=1e-6)
+    expected_encoder = OneHotEncoder(handle_unknown='ignore').fit(training[CATEGORICAL_FEATURES])
+    assert [list(values) for values in encoder.categories_] == [list(values) for values in expected_encoder.categories_]
+
+
+def test_no_training_rows():
+    with pytest.raises(ValueError):
+        fit_preprocessors(iter([]), validation_every=5)
+
+
+def test_encoder_from_categories_keeps_the_vocabulary_order():
+    categories = [['male', 'female'], ['group A'], ['x', 'y', 'z'], ['standard'], ['none', 'completed']]
+    encoder = encoder_from_categories(categories)
+    assert [list(values) for values in encoder.categories_] == categories
+    row = pd.DataFrame([['female', 'group A', 'y', 'standard', 'unseen']], columns=CATEGORICAL_FEATURES)
+    assert encoder.transform(row).toarray().tolist() == [[0, 1, 1, 0, 1, 0, 1, 0, 0]]
+
+
+def test_linear_accumulator_matches_the_in_memory_fit():
+    rng = np.random.default_rng(0)
+    features = rng.standard_normal((300, 4))
+    # A duplicated column makes the system rank-deficient, like the one-hot groups
+    features = np.hstack([features, features[:, :1]])
+    targets = features @ np.array([1.0, -2.0, 0.5, 3.0, 1.0]) + 7.0 + rng.normal(0, 0.1, 300)
+
+    accumulator = LinearAccumulator()
+    for start in range(0, len(features), 64):
+        accumulator.update(features[start:start + 64], targets[start:start + 64])
+    kernel, bias = accumulator.solve()
+
+    batched = NumpyMLP([(kernel, bias, "linear")])
+    in_memory = NumpyMLP.fit_linear(features, targets)
+    np.testing.assert_allclose(batched.predict(features), in_memory.predict(features), rtol=1e-4, atol=1e-3)
+
+
+def test_prepare_chunk_fills_defaults():
+    frame = student_frame(3)
+    frame.loc[0, 'lunch'] = None
+    frame.loc[1, 'math score'] = None
+    prepared = training_data.prepare_chunk(frame)
+    assert prepared.loc[0, 'lunch'] == 'standard'
+    assert prepared.loc[1, 'math score'] == 0.0
+    assert prepared['math score'].dtype == np.float32
+
+
+def write_shard(path, header, rows=1):
+    path.write_text(",".join(header) + "\n" + "\n".join(",".join(["1"] * len(header)) for _ in range(rows)) + "\n")
+    return str(path)
+
+
+def test_shard_header_is_shared_by_every_shard(tmp_path):
+    header = CATEGORICAL_FEATURES + NUMERICAL_FEATURES
+    files = [write_shard(tmp_path / f"part-{i}.csv", header) for i in range(3)]
+    assert training_data.shard_header(files) == header
+
+
+def test_shard_header_rejects_a_reordered_shard(tmp_path):
+    header = CATEGORICAL_FEATURES + NUMERICAL_FEATURES
+    files = [
+        write_shard(tmp_path / "part-0.csv", header),
+        write_shard(tmp_path / "part-1.csv", header[::-1]),
+    ]
+    with pytest.raises(ValueError, match="part-1.csv header"):
+        training_data.shard_header(files)
+
+
+def test_shard_header_rejects_missing_columns(tmp_path):
+    files = [write_shard(tmp_path / "part-0.csv", CATEGORICAL_FEATURES)]
+    with pytest.raises(ValueError, match="missing columns: math score"):
+        training_data.shard_header(files)
@@ -0,0 +1,176 @@
+import pytest
+
+for module in ("numpy", "pandas", "joblib", "sklearn", "requests", "httpx"):
+    pytest.importorskip(module)
+
+import predict
+
+
+class API:
+    """GET /students/unscored over a set of students, one page; saves go through save_predictions_bulk"""
+
+    def __init__(self, student_ids, rejected=()):
+        self.unscored = set(student_ids)
+        self.rejected = set(rejected)
+        self.saves = 0
+        self.versions = []
+
+    def iter_unscored_pages(self, page_size):
+        if self.unscored:
+            yield [{"student_id": student_id} for student_id in sorted(self.unscored)]
+
+    def save_predictions_bulk(self, predictions, model_version=None, upsert=False, failed_ids=None):
+        self.saves += 1
+        self.versions.append(model_version)
+        for student_id, _ in predictions:
+            if student_id in self.rejected:
+                failed_ids.append(student_id)
+            else:
+                self.unscored.discard(student_id)
+        return len(predictions) - len(failed_ids)
+
+
+class Predictor:
+    api_client = None
+    requested_engine = "auto"
+
+    def __init__(self, model_version="test"):
+        self.model_version = model_version
+        # What the next published_model_dir() call reports
+        self.published = None
+
+    def predict_records(self, students):
+        return [50.0] * len(students)
+
+    def published_model_dir(self):
+        published, self.published = self.published, None
+        return published
+
+
+class InlineExecutor:
+    """Runs saves on the calling thread, so each poll's outcome is known when it returns"""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def make_worker(api, monkeypatch, **kwargs):
+    # Each save thread creates its own PredictionClient; point them all at the fake API
+    monkeypatch.setattr(predict, "PredictionClient", lambda: api)
+    worker = predict.PredictionWorker(api, Predictor(), **kwargs)
+    worker._saves = InlineExecutor()
+    return worker
+
+
+def test_student_is_skipped_after_max_save_attempts(monkeypatch):
+    api = API([1, 2, 3], rejected=[2])
+    worker = make_worker(api, monkeypatch, max_save_attempts=3)
+
+    assert [worker.poll_once() for _ in range(4)] == [3, 1, 1, 0]
+    assert api.unscored == {2}
+    assert (worker.saved, worker.failed) == (2, 3)
+    assert worker._skipped == {2}
+
+
+def test_a_later_success_resets_the_attempts(monkeypatch):
+    api = API([1], rejected=[1])
+    worker = make_worker(api, monkeypatch, max_save_attempts=2)
+    worker.poll_once()
+    api.rejected.clear()
+    worker.poll_once()
+    assert api.unscored == set() and worker._skipped == set() and worker._save_failures == {}
+
+
+def run_until(worker, waits):
+    """Run the worker loop until it has waited `waits` times; returns the intervals it waited"""
+    intervals = []
+
+    def wait(interval):
+        intervals.append(round(interval, 6))
+        if len(intervals) >= waits:
+            worker.stop()
+
+    worker._stop.wait = wait
+    worker.run()
+    return intervals
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(predict.random, "uniform", lambda low, high: 1.0)
+
+
+def test_failing_saves_back_off_instead_of_hot_looping(monkeypatch, no_jitter):
+    api = API([1], rejected=[1])
+    worker = make_worker(api, monkeypatch, poll_interval=1, max_poll_interval=4, max_save_attempts=100)
+    assert run_until(worker, 5) == [1, 2, 4, 4, 4]
+    assert worker.polls == 5
+
+
+def test_an_idle_worker_backs_off(monkeypatch, no_jitter):
+    worker = make_worker(API([]), monkeypatch, poll_interval=1, max_poll_interval=8)
+    assert run_until(worker, 4) == [1, 2, 4, 8]
+
+
+def test_progress_resets_the_interval(monkeypatch, no_jitter):
+    api = API([])
+    worker = make_worker(api, monkeypatch, poll_interval=1, max_poll_interval=8)
+    polls = []
+    original = worker.poll_once
+
+    def poll_once():
+        polls.append(len(polls))
+        # New students arrive before the third poll
+        if len(polls) == 3:
+            api.unscored.update({10, 11})
+        return original()
+
+    worker.poll_once = poll_once
+    assert run_until(worker, 4) == [1, 2, 1, 2]
+    assert api.unscored == set()
+
+
+def test_a_published_version_is_loaded_before_the_next_batch(monkeypatch):
+    api = API([1])
+    worker = make_worker(api, monkeypatch)
+    monkeypatch.setattr(predict, "NeuralNetworkPredictor", lambda api_client, engine: Predictor("v2"))
+    worker.poll_once()
+
+    worker.predictor.published = "models/versions/v2"
+    api.unscored.add(2)
+    worker.poll_once()
+
+    assert api.versions == ["test", "v2"]
+    assert worker.predictor.model_version == "v2"
+
+
+def test_a_version_that_fails_to_load_is_not_switched_to(monkeypatch):
+    def broken(api_client, engine):
+        raise FileNotFoundError("scaler.pkl")
+    monkeypatch.setattr(predict, "NeuralNetworkPredictor", broken)
+    api = API([1])
+    worker = make_worker(api, monkeypatch)
+    worker.predictor.published = "models/versions/v2"
+
+    assert worker.poll_once() == 1
+    assert api.versions == ["test"]
+
+
+def test_published_model_dir_follows_current(tmp_path, monkeypatch):
+    monkeypatch.setattr(predict, "MODEL_ROOT", str(tmp_path))
+    # Only the CURRENT bookkeeping is under test; skip loading artifacts
+    predictor = object.__new__(predict.NeuralNetworkPredictor)
+    predictor.current_stamp = predict.current_stamp(str(tmp_path))
+    predictor.model_dir = predict.current_model_dir(str(tmp_path))
+    assert predictor.published_model_dir() is None
+
+    (tmp_path / "CURRENT").write_text("v1")
+    assert predictor.published_model_dir() == str(tmp_path / "versions" / "v1")
+    predictor.model_dir = str(tmp_path / "versions" / "v1")
+    assert predictor.published_model_dir() is None
+
+    (tmp_path / "CURRENT").unlink()
+    assert predictor.published_model_dir() == str(tmp_path)